@@ -0,0 +1,208 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+from dotenv import load_dotenv
+
+# Before the helpers read their storage locations from the environment
+load_dotenv()
+
+from .helpers.as_of import set_cutoff
+from .helpers.evaluation import label_signals, summarize
+from .helpers.utils import CONFIG
+
+# Backtest engine: plans (trade_date, symbol) work units over a date range,
+# runs each trade date's flow in its own worker process with the "as of"
+# cutoff set to that date, checkpoints finished units to progress.jsonl so an
+# interrupted run resumes where it stopped, then scores every signal against
+# the bars that followed it.
+
+
+def plan_units(start_date: str, end_date: str, watchlist: list[str]) -> list[tuple[str, str]]:
+    """Every (trade_date, symbol) pair for the business days in [start_date, end_date]."""
+    dates = pd.bdate_range(start_date, end_date).strftime("%Y-%m-%d")
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in watchlist))
+    return [(trade_date, symbol) for trade_date in dates for symbol in symbols]
+
+
+def load_progress(run_dir: Path) -> dict[str, dict]:
+    """Finished trade dates recorded in run_dir/progress.jsonl, keyed by trade_date."""
+    progress_path = run_dir / "progress.jsonl"
+    done = {}
+    if progress_path.exists():
+        for line in progress_path.read_text().splitlines():
+            # A crash can leave a truncated last line, that date simply runs again
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[record["trade_date"]] = record
+    return done
+
+
+def _append_progress(run_dir: Path, record: dict) -> None:
+    with open(run_dir / "progress.jsonl", "a") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _run_trade_date(trade_date: str, symbols: list[str], analysis_workers: int | None) -> dict:
+    """Worker process body: run the flow for one trade date and return its signals."""
+    from .main import run_multi_symbol
+    from .helpers.trade_signals import parse_portfolio
+
+    started = time.perf_counter()
+    final_report = run_multi_symbol(watchlist=symbols, trade_date=trade_date, workers=analysis_workers)
+    portfolio = parse_portfolio(final_report)
+    return {
+        "trade_date": trade_date,
+        "symbols": symbols,
+        "signals": [trade.model_dump() for trade in portfolio.trades] if portfolio else [],
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def run_backtest(start_date: str, end_date: str, watchlist: list[str], run_dir: str | None = None,
+                 processes: int | None = None, analysis_workers: int | None = None) -> dict:
+    """Run (or resume) a backtest over a date range and watchlist, returning the summary."""
+    timings = {}
+    started = time.perf_counter()
+    run_path = Path(run_dir or Path(CONFIG["results_dir"]) / "backtests" / f"{start_date}_{end_date}")
+    run_path.mkdir(parents=True, exist_ok=True)
+    (run_path / "plan.json").write_text(json.dumps({
+        "start_date": start_date, "end_date": end_date, "watchlist": watchlist}, indent=2))
+
+    # Phase 1: plan the units and drop the ones a previous run already finished
+    units = plan_units(start_date, end_date, watchlist)
+    done = load_progress(run_path)
+    pending: dict[str, list[str]] = {}
+    for trade_date, symbol in units:
+        if symbol not in done.get(trade_date, {}).get("symbols", []):
+            pending.setdefault(trade_date, []).append(symbol)
+    timings["plan"] = time.perf_counter() - started
+    print(f"Backtest {start_date}..{end_date}: {len(units)} units, "
+          f"{sum(map(len, pending.values()))} pending over {len(pending)} trade dates")
+
+    # Phase 2: one trade date per worker process, checkpointed as each one finishes. Past dates
+    # keep their crew memory apart (run_memory_dir), so the order dates run in can not leak
+    phase_started = time.perf_counter()
+    processes = processes or max(1, min(len(pending), os.cpu_count() or 1))
+    if pending:
+        # Spawn, not fork: the flow starts threads and network clients
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+            futures = {pool.submit(_run_trade_date, trade_date, symbols, analysis_workers): trade_date
+                       for trade_date, symbols in sorted(pending.items())}
+            for future in as_completed(futures):
+                trade_date = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    print(f"--- {trade_date} failed: {e} ---")
+                    continue
+                # Merge with units a previous partial run already finished for this date
+                previous = done.get(trade_date)
+                if previous:
+                    record["symbols"] = previous["symbols"] + record["symbols"]
+                    record["signals"] = previous["signals"] + record["signals"]
+                _append_progress(run_path, record)
+                done[trade_date] = record
+                print(f"--- {trade_date} done in {record['seconds']}s ({len(record['signals'])} signals) ---")
+    timings["analyze"] = time.perf_counter() - phase_started
+
+    # Phase 3: evaluate against realized bars, the cutoff is lifted only here
+    phase_started = time.perf_counter()
+    set_cutoff(None)
+    signals = [signal for record in done.values() for signal in record["signals"]]
+    labeled, skipped = label_signals(signals, CONFIG["swing_evaluation_days"])
+    scores = summarize(labeled)
+    timings["evaluate"] = time.perf_counter() - phase_started
+
+    wall = time.perf_counter() - started
+    completed_units = sum(len(record["symbols"]) for record in done.values())
+    summary = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "units": len(units),
+        "completed_units": completed_units,
+        "signals": len(signals),
+        "evaluated_trades": len(labeled),
+        "skipped_signals": skipped,
+        "closed_trades": scores["overall"]["trades"],
+        "open_trades": scores["open"]["trades"],
+        "unfilled_orders": scores["unfilled"],
+        "hit_rate": scores["overall"]["hit_rate"],
+        "expectancy_r": scores["overall"]["expectancy_r"],
+        "by_market_type": scores["by_market_type"],
+        "by_signal": scores["by_signal"],
+        "wall_seconds": {phase: round(seconds, 3) for phase, seconds in timings.items()} | {"total": round(wall, 3)},
+        "units_per_sec": round(completed_units / timings["analyze"], 4) if timings["analyze"] > 0 else None,
+        "trades_per_sec": round(len(labeled) / wall, 4) if wall > 0 else None,
+    }
+    (run_path / "evaluations.json").write_text(labeled.to_json(orient="records", indent=2))
+    (run_path / "summary.json").write_text(json.dumps(summary, indent=2))
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backtest the swing trading flow over a date range.")
+    parser.add_argument("--start", required=True, help="First trade date (YYYY-MM-DD)")
+    parser.add_argument("--end", required=True, help="Last trade date (YYYY-MM-DD)")
+    parser.add_argument("--watchlist", default="AAPL", help="Comma separated symbols")
+    parser.add_argument("--run-dir", default=None, help="Checkpoint directory, reuse it to resume")
+    parser.add_argument("--processes", type=int, default=None, help="Trade dates run in parallel")
+    parser.add_argument("--workers", type=int, default=None, help="Symbols analyzed concurrently per date")
+    return parser.parse_args(argv)
+
+
+def train(argv=None):
+    """Entry point for the backtest CLI."""
+    args = _parse_args(argv)
+    run_backtest(args.start, args.end, [s.strip() for s in args.watchlist.split(",") if s.strip()],
+                 run_dir=args.run_dir, processes=args.processes, analysis_workers=args.workers)
+
+
+def evaluate(argv=None):
+    """Entry point scoring every signal in the signal store against the bars that followed it."""
+    from .helpers.signal_store import SignalStore
+
+    parser = argparse.ArgumentParser(description="Walk-forward evaluation of the stored signal history.")
+    parser.add_argument("--start", default=None, help="First trade date (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="Last trade date (YYYY-MM-DD)")
+    parser.add_argument("--watchlist", default=None, help="Comma separated symbols, default all")
+    parser.add_argument("--signal", default=None, help="Only BUY or SELL")
+    parser.add_argument("--horizon", type=int, default=CONFIG["swing_evaluation_days"], help="Bars per trade")
+    parser.add_argument("--out", default=None, help="Write the labeled signals here (.csv or .json)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    symbols = [s.strip() for s in args.watchlist.split(",") if s.strip()] if args.watchlist else None
+    rows = SignalStore().query(signal=args.signal, start_date=args.start, end_date=args.end, symbols=symbols)
+    labeled, skipped = label_signals(rows, args.horizon)
+    summary = {"signals": len(rows), "horizon": args.horizon, "skipped": skipped, **summarize(labeled),
+               "seconds": round(time.perf_counter() - started, 3)}
+    if args.out:
+        if args.out.endswith(".csv"):
+            labeled.to_csv(args.out, index=False)
+        else:
+            Path(args.out).write_text(labeled.to_json(orient="records", indent=2))
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+def replay_run(run_dir: str, processes: int | None = None, analysis_workers: int | None = None) -> dict:
+    """Resume a backtest from its checkpoint directory, rerunning only unfinished units."""
+    plan = json.loads((Path(run_dir) / "plan.json").read_text())
+    return run_backtest(plan["start_date"], plan["end_date"], plan["watchlist"], run_dir=run_dir,
+                        processes=processes, analysis_workers=analysis_workers)
+
+
+if __name__ == "__main__":
+    train()
@@ -0,0 +1,280 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Benchmarks for the CLI and the hot offline paths. Startup is measured in a
+# fresh interpreter so nothing is already imported, and `-X importtime` shows
+# which modules are to blame when the budget is exceeded (tests/test_startup.py
+# holds every target to STARTUP_BUDGET_SECONDS). The suite adds the
+# indicator engine on a synthetic 1k-symbol panel, report parsing, and the
+# per-stage latency of a flow replayed from a fixture bundle, and can save or
+# compare pytest-benchmark style JSON against benchmarks/baseline.json. The
+# shipped baseline was recorded on Python 3.12 with `bench --suite --fixtures
+# tests/fixtures/replay --save benchmarks/baseline.json`; timings are machine
+# specific, so re-record it on the machine that will run --compare.
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = PROJECT_ROOT / "benchmarks" / "baseline.json"
+# Offline bundle (synthetic bars, news and completions) replayed by --compare and tests/test_replay.py
+REPLAY_FIXTURE = PROJECT_ROOT / "tests" / "fixtures" / "replay"
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", 0.5))
+STARTUP_TARGETS = {
+    "import src.main": "import src.main",
+    "run_crew --help": "import sys; sys.argv = ['run_crew', '--help']\n"
+                       "import src.main\n"
+                       "try:\n    src.main.run()\nexcept SystemExit:\n    pass",
+}
+
+
+def _time_snippet(snippet: str) -> tuple[float, str]:
+    """Wall time of `snippet` in a fresh interpreter, plus its -X importtime log."""
+    code = ("import time\n_started = time.perf_counter()\n" + snippet +
+            "\nimport sys\nprint(time.perf_counter() - _started, file=sys.stdout)")
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=PROJECT_ROOT,
+                               capture_output=True, text=True, check=True)
+    return float(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def slowest_imports(importtime_log: str, top: int = 10) -> list[tuple[str, float]]:
+    """Top-level packages by cumulative import time (seconds) from a -X importtime log."""
+    totals = {}
+    for line in importtime_log.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        # Only first-level entries, nested ones are already part of their parent's cumulative time
+        if name.startswith("  ") or not name.strip():
+            continue
+        module = name.strip().split(".")[0]
+        totals[module] = totals.get(module, 0.0) + int(parts[1]) / 1e6
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+def measure_startup(rounds: int = 5) -> dict:
+    """Median/min/max wall time of each startup target over `rounds` fresh interpreters."""
+    results = {}
+    for name, snippet in STARTUP_TARGETS.items():
+        timings, log = [], ""
+        for _ in range(rounds):
+            seconds, log = _time_snippet(snippet)
+            timings.append(seconds)
+        results[name] = {
+            "median": statistics.median(timings),
+            "min": min(timings),
+            "max": max(timings),
+            "rounds": rounds,
+            "timings": timings,
+            "slowest_imports": slowest_imports(log),
+        }
+    return results
+
+
+def check_startup_budget(budget: float = STARTUP_BUDGET_SECONDS, rounds: int = 5) -> bool:
+    """True when every startup target's median stays within `budget` seconds."""
+    ok = True
+    for name, result in measure_startup(rounds).items():
+        within = result["median"] <= budget
+        ok = ok and within
+        print(f"{'ok  ' if within else 'SLOW'} {name:<20} median {result['median']:.3f}s "
+              f"(min {result['min']:.3f}s, budget {budget:.3f}s)")
+        if not within:
+            for module, seconds in result["slowest_imports"]:
+                print(f"       {module:<30} {seconds:.3f}s")
+    return ok
+
+
+def _stats(timings: list[float]) -> dict:
+    return {
+        "min": min(timings),
+        "max": max(timings),
+        "mean": statistics.fmean(timings),
+        "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "median": statistics.median(timings),
+        "rounds": len(timings),
+    }
+
+
+def _timed(fn, rounds: int, setup=None) -> list[float]:
+    timings = []
+    for _ in range(rounds):
+        args = setup() if setup else ()
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _synthetic_panel(symbols: int, days: int, seed: int = 7):
+    """Random-walk high/low/close panel, (symbols x days)."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.015, (symbols, days)), axis=1))
+    spread = np.abs(rng.normal(0.0, 0.01, (symbols, days))) * close
+    return close + spread, close - spread, close
+
+
+def bench_indicators(rounds: int, symbols: int = 1000, days: int = 300) -> dict[str, list[float]]:
+    from .helpers.indicators import compute_indicators, update_indicators
+
+    names = [f"S{i:04d}" for i in range(symbols)]
+    high, low, close = _synthetic_panel(symbols, days)
+    state = compute_indicators(names, high, low, close)
+    return {
+        f"indicators.compute_{symbols // 1000}k_x{days}": _timed(
+            lambda: compute_indicators(names, high, low, close), rounds),
+        f"indicators.update_{symbols // 1000}k": _timed(
+            lambda: update_indicators(state, high[:, -1:], low[:, -1:], close[:, -1:]), rounds),
+    }
+
+
+_SAMPLE_REPORT = """## SECTION 1: PRICE TIME-SERIES PATTERNS
+- Trend Vector: Upward slope detected in price series
+- Support Level: 182.40
+- Resistance Level: **196.10**
+- Recent Close: 188.25 | Daily Range: 3.10
+## SECTION 4: SENTIMENT SCORE ANALYSIS
+- Aggregate Score: 0.35
+Narrative Theme: Services growth and buybacks offset softer hardware demand into the quarter.
+## SECTION 5: MULTI-FACTOR PATTERN SYNTHESIS
+- Multi-Factor Confluence: High agreement across metrics
+"""
+
+
+def _sample_portfolio(trades: int) -> str:
+    trade = {
+        "symbol": "AAPL", "trade_date": "2025-01-07", "signal": "BUY", "market_type": "Bull Quiet",
+        "trade_setup": {"entry_price": 188.25, "stop_loss": 181.9, "profit_target": 201.0, "r_multiple_target": 2.0},
+        "expectancy_scorecard": {"win_probability": 0.55, "r_ratio": 2.0, "expectancy_value": 0.65},
+        "position_sizing": {"shares": 15, "risk_per_trade": 1.0, "total_account_value": 10000},
+        "rationale": {"bull_case": "Trend and breadth agree.", "bear_case": "Extended above the 50-day."},
+    }
+    body = json.dumps({"trades": [trade] * trades, "total_portfolio_risk_percent": trades * 1.0}, indent=2)
+    return f"Here is the portfolio:\n```json\n{body}\n```"
+
+
+def bench_parsing(rounds: int) -> dict[str, list[float]]:
+    from .helpers.compaction import compact_record
+    from .helpers.trade_signals import parse_portfolio
+
+    raw = _sample_portfolio(50)
+    reports = [_SAMPLE_REPORT.replace("188.25", f"{150 + i * 0.1:.2f}") for i in range(200)]
+    return {
+        "parsing.portfolio_50_trades": _timed(lambda: parse_portfolio(raw), rounds),
+        "parsing.compact_200_reports": _timed(
+            lambda: [compact_record(f"S{i}", report, None, 240) for i, report in enumerate(reports)], rounds),
+    }
+
+
+def bench_replay(bundle_dir: str, rounds: int) -> dict[str, list[float]]:
+    """Per-stage wall time of a full flow replayed offline from a fixture bundle."""
+    snippet = ("import json, os, sys\n"
+               "sys.stdin = open(os.devnull)\n"
+               "from src.main import run\n"
+               f"run(['--replay-fixtures', {str(Path(bundle_dir).resolve())!r}])\n"
+               "from src.helpers.instrumentation import TRACER\n"
+               "print('__STAGES__' + json.dumps({row['name']: row['total_s'] for row in TRACER.summary()"
+               " if row['category'] == 'flow'}))")
+    timings: dict[str, list[float]] = {}
+    for _ in range(rounds):
+        completed = subprocess.run([sys.executable, "-c", snippet], cwd=PROJECT_ROOT,
+                                   capture_output=True, text=True, check=True)
+        line = next(line for line in completed.stdout.splitlines() if line.startswith("__STAGES__"))
+        for stage, seconds in json.loads(line[len("__STAGES__"):]).items():
+            timings.setdefault(f"replay.{stage}", []).append(seconds)
+    return timings
+
+
+def run_suite(rounds: int = 5, fixtures: str | None = None) -> dict:
+    """Every benchmark as pytest-benchmark style JSON."""
+    timings: dict[str, list[float]] = {}
+    for name, result in measure_startup(rounds).items():
+        timings[f"startup.{name}"] = result["timings"]
+    timings.update(bench_indicators(rounds))
+    timings.update(bench_parsing(rounds))
+    if fixtures:
+        timings.update(bench_replay(fixtures, max(1, rounds // 2)))
+    return {
+        "machine_info": {"python_version": platform.python_version(), "machine": platform.machine(),
+                         "system": platform.system(), "cpu_count": os.cpu_count()},
+        "datetime": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "benchmarks": [{"name": name, "group": name.split(".")[0], "stats": _stats(values)}
+                       for name, values in timings.items()],
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Benchmarks whose median is more than `tolerance` (0.5 = 50%) slower than the baseline."""
+    before = {bench["name"]: bench["stats"]["median"] for bench in baseline["benchmarks"]}
+    regressions = []
+    for bench in results["benchmarks"]:
+        name, median = bench["name"], bench["stats"]["median"]
+        if name in before and median > before[name] * (1.0 + tolerance):
+            regressions.append(f"{name}: {median * 1e3:.2f}ms vs baseline {before[name] * 1e3:.2f}ms")
+    return regressions
+
+
+def main(argv=None):
+    """Entry point for the benchmark CLI."""
+    parser = argparse.ArgumentParser(description="Swing trader benchmarks.")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--check-startup", action="store_true",
+                        help=f"Exit non-zero when startup exceeds STARTUP_BUDGET_SECONDS ({STARTUP_BUDGET_SECONDS}s)")
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    parser.add_argument("--suite", action="store_true", help="Run the full suite instead of startup only")
+    parser.add_argument("--fixtures", metavar="DIR",
+                        help="Also replay this fixture bundle for per-stage latency (--compare defaults to "
+                             "tests/fixtures/replay)")
+    parser.add_argument("--save", metavar="PATH", help="Write suite results to PATH")
+    parser.add_argument("--compare", metavar="PATH", nargs="?", const=str(BASELINE_PATH),
+                        help="Exit non-zero on regressions against PATH (default benchmarks/baseline.json)")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown before failing (0.5 = 50%%)")
+    args = parser.parse_args(argv)
+
+    if args.check_startup:
+        sys.exit(0 if check_startup_budget(rounds=args.rounds) else 1)
+    if args.compare and not Path(args.compare).exists():
+        parser.error(f"no baseline at {args.compare}, record one first with --save {args.compare}")
+    if args.compare and not args.fixtures:
+        args.fixtures = str(REPLAY_FIXTURE)  # Same replay stages as the shipped baseline
+    if args.suite or args.fixtures or args.save or args.compare:
+        results = run_suite(args.rounds, args.fixtures)
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            for bench in results["benchmarks"]:
+                stats = bench["stats"]
+                print(f"{bench['name']:<36} median {stats['median'] * 1e3:9.2f}ms  "
+                      f"min {stats['min'] * 1e3:9.2f}ms  rounds {stats['rounds']}")
+        if args.save:
+            Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+            Path(args.save).write_text(json.dumps(results, indent=2))
+        if args.compare:
+            baseline = json.loads(Path(args.compare).read_text())
+            recorded_on = baseline.get("machine_info", {}).get("python_version", "")
+            if recorded_on.rsplit(".", 1)[0] != platform.python_version().rsplit(".", 1)[0]:
+                print(f"--- Baseline was recorded on Python {recorded_on or 'unknown'}, "
+                      f"this is {platform.python_version()}; timings may not be comparable ---")
+            regressions = compare(results, baseline, args.tolerance)
+            for line in regressions:
+                print(f"SLOW {line}")
+            sys.exit(1 if regressions else 0)
+        return
+
+    results = measure_startup(args.rounds)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            print(f"{name:<20} median {result['median']:.3f}s  min {result['min']:.3f}s  max {result['max']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
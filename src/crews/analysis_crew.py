@@ -1,13 +1,15 @@
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-from ..helpers.utils import local_llm_deep, local_embedder
+from ..helpers.utils import local_embedder, crew_memory, stage_llm
 from src.tools.trading_tools import TOOLS
 
 
 @CrewBase
 class AnalysisCrew():
 
-    llm = local_llm_deep
+    llm = stage_llm("analysis")
+    function_calling_llm = stage_llm("tool_calls")  # Tool-call formatting is a cheap step
+    storage_dir = None  # Set per instance to isolate this crew's memory
 
     agents_config = "config/analysis_agents.yaml"  # relative to project root or absolute
     tasks_config = "config/analysis_tasks.yaml"
@@ -26,6 +28,7 @@ class AnalysisCrew():
         return Agent(config=self.agents_config['swing_trade_analyst'],
                      tools=self.agent_tools,
                      llm=self.llm,
+                     function_calling_llm=self.function_calling_llm,
                      memory=True)
 
     @task
@@ -41,5 +44,6 @@ class AnalysisCrew():
             memory=True, # Shared whiteboard for this crew
             embedder=local_embedder,
             share_crew=False,
+            **crew_memory(self.storage_dir),
             verbose=True
         )
\ No newline at end of file
@@ -1,13 +1,15 @@
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-from ..helpers.utils import local_llm_deep, local_embedder
+from ..helpers.utils import local_embedder, crew_memory, stage_llm
 from src.tools.trading_tools import TOOLS
 
 
 @CrewBase
 class MacroCrew():
 
-    llm = local_llm_deep
+    llm = stage_llm("macro")
+    function_calling_llm = stage_llm("tool_calls")  # Tool-call formatting is a cheap step
+    storage_dir = None  # Set per instance to isolate this crew's memory
     agents_config = "config/macro_agents.yaml"  # relative to project root or absolute
     tasks_config = "config/macro_tasks.yaml"
 
@@ -16,7 +18,7 @@ class MacroCrew():
     @agent
     def macro_strategist(self) -> Agent:
         return Agent(config=self.agents_config['macro_strategist'], tools=self.agent_tools,
-                     llm=self.llm, memory=True)
+                     llm=self.llm, function_calling_llm=self.function_calling_llm, memory=True)
 
     @task
     def macro_task(self) -> Task:
@@ -33,6 +35,7 @@ class MacroCrew():
             memory=True, # Shared whiteboard for this crew
             embedder=local_embedder,
             share_crew=False,
+            **crew_memory(self.storage_dir),
             verbose=True
             # MANUALLY override the internal storages with the correct provider
             # This prevents the 'search' error you saw in the traceback
@@ -1,12 +1,13 @@
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-from ..helpers.utils import local_llm_deep, local_embedder
+from ..helpers.utils import local_embedder, crew_memory, stage_llm
 from ..helpers.trade_signals import PortfolioResponse
 
 @CrewBase
 class StrategyCrew():
 
-    llm = local_llm_deep
+    llm = stage_llm("strategy")
+    storage_dir = None  # Set per instance to isolate this crew's memory
 
     agents_config = "config/strategy_agents.yaml"  # relative to project root or absolute
     tasks_config = "config/strategy_tasks.yaml"
@@ -29,4 +30,5 @@ class StrategyCrew():
             memory=True, # Shared whiteboard for this crew
             embedder=local_embedder,
             share_crew=False,
+            **crew_memory(self.storage_dir),
         )
\ No newline at end of file
@@ -0,0 +1,380 @@
+import datetime
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+
+# Suppress the exact prompt
+def no_prompt(*args, **kwargs):
+    return "n"  # auto-answer "no"
+
+try:
+    from crewai.utilities import tracing
+    if hasattr(tracing, "ask_to_view_traces"):
+        tracing.ask_to_view_traces = no_prompt
+    if hasattr(tracing, "prompt_for_traces"):
+        tracing.prompt_for_traces = no_prompt
+except ImportError:
+    pass  # tracing module moved in some versions
+
+from crewai.flow.flow import Flow, listen, start
+from pydantic import BaseModel
+from .crews.macro_crew import MacroCrew
+from .crews.analysis_crew import AnalysisCrew
+from .crews.strategy_crew import StrategyCrew
+from .helpers.utils import CONFIG, run_memory_dir, stage_model
+from .helpers.checkpoint import with_retries
+from .tools.trading_tools import prefetch_news
+from .helpers.instrumentation import span
+from .helpers.compaction import compact_macro, compact_reports, estimate_tokens
+from .helpers.incremental import AnalysisStore, fingerprint_symbols, plan_incremental
+from .helpers.macro_store import get_or_compute
+from .helpers.risk import size_portfolio
+from .helpers.screener import DEFAULT_RULES as SCREENER_RULES, shortlist
+from .helpers.signal_store import SignalStore
+from .helpers.trade_signals import PortfolioResponse, parse_portfolio
+
+# Silence only this exact family of pydantic serialization warnings
+warnings.filterwarnings(
+    "ignore",
+    category=UserWarning,
+    message="Pydantic serializer warnings:",
+    module="pydantic.main",  # or "pydantic" to be broader
+)
+
+# from crewai.utilities.paths import db_storage_path
+# import os
+#
+# print("CREWAI_STORAGE_DIR env var:", os.getenv("CREWAI_STORAGE_DIR"))
+# print("Actual CrewAI base storage path:", db_storage_path())
+#
+# # Optional: list contents to see subdirs
+# base = db_storage_path()
+# if os.path.exists(base):
+#     print("Contents:")
+#     for item in os.listdir(base):
+#         print("  ", item)
+#
+# sys.exit(0)
+class TradingState(BaseModel):
+    symbol: str = ""
+    trade_date: str = str(datetime.date.today())
+    start_date: str = str(datetime.date.today() - datetime.timedelta(days=20))
+    end_date: str = str(datetime.date.today() - datetime.timedelta(days=1))
+    macro_context: str = ""
+    ticker_data: str = ""
+    watchlist: list[str] = []
+    ticker_analysis_results: dict[str, str] = {}
+    equity: int = os.getenv("EQUITY", 10000)
+    risk: float = os.getenv("RISK_PER_TRADE", 0.01)  # How much percentage of the total equity to risk on single position
+    analysis_workers: int = CONFIG["analysis_workers"]  # How many symbols are analyzed concurrently
+    trade_signals: list[dict] = []  # Validated TradeSignals from the strategy crew
+    universe: list[str] = []  # Watchlist before screening
+    screen_results: list[dict] = []  # Ranked screener records for the whole universe
+    incremental: bool = CONFIG["incremental_enabled"]  # Only re-analyze symbols whose inputs changed
+    reused_symbols: list[str] = []  # Symbols whose previous analysis was carried over
+    completed_stages: list[str] = []  # Stages a resumed run can skip
+    failed_symbols: dict[str, str] = {}  # Symbol -> last error, retried on resume
+    portfolio: dict | None = None  # Sized PortfolioResponse, returned as is when a finished run is resumed
+
+class SwingSentryFlow(Flow[TradingState]):
+    def __init__(self):
+        super().__init__()
+        # Force tracing off at the object level
+        self.tracing = False
+        # Optional callback(symbol, report, reused) fired as each symbol's analysis is ready
+        self.on_symbol_done = None
+        # Optional FlowCheckpoint the state is saved to after every stage and symbol
+        self.checkpoint = None
+        # Prefetched news keys, pinned in the response memo until whoever runs the flow releases them
+        self.news_pins: set = set()
+
+    def _save_checkpoint(self, stage: str) -> None:
+        if self.checkpoint is None:
+            return
+        if stage in ("macro", "screen", "analysis", "strategy") and stage not in self.state.completed_stages:
+            self.state.completed_stages.append(stage)
+        self.checkpoint.save(self.state.model_dump(), stage="done" if stage == "strategy" else stage)
+
+    def _symbol_done(self, symbol: str, report: str, reused: bool) -> None:
+        write_symbol_report(self.state.trade_date, symbol, report)
+        if self.on_symbol_done is not None:
+            self.on_symbol_done(symbol, report, reused)
+
+    @start()
+    def get_global_macro(self):
+        """Runs once per trade_date, shared by all symbols."""
+        if "macro" in self.state.completed_stages:
+            print(f"--- Global Macro for {self.state.trade_date} restored from checkpoint ---")
+            return
+        print(f"--- Running Global Macro for {self.state.trade_date} ---")
+
+        # 1. Run the crew once per date window, reused by every other flow asking for it
+        # 2. Store in state so it persists for all listeners
+        with span("macro", "flow"):
+            self.state.macro_context = get_or_compute(
+                self.state.trade_date, self.state.start_date, self.state.end_date,
+                model=stage_model("macro"), compute=self.run_macro_crew)
+        self._save_checkpoint("macro")
+
+    def run_macro_crew(self) -> str:
+        macro_crew = MacroCrew()
+        macro_crew.storage_dir = run_memory_dir(self.state.trade_date, "global_macro")
+        with span("MacroCrew", "crew"):
+            result = macro_crew.crew().kickoff(inputs={
+                "trade_date": self.state.trade_date,
+                "start_date": self.state.start_date,
+                "end_date": self.state.end_date,
+            })
+        return result.raw
+
+    def analyze_symbol(self, symbol: str) -> str:
+        """Runs the AnalysisCrew for one symbol, safe to call from worker threads."""
+        print(f"--- Analyzing {symbol} using Global Macro context ---")
+        analysis_crew = AnalysisCrew()
+        # ISOLATION: Dynamic path based on symbol prevents memory bleed
+        analysis_crew.storage_dir = run_memory_dir(self.state.trade_date, "analyze", "tickers", symbol)
+
+        # 3. Pass the stored macro_context into the symbol-specific crew
+        with span(f"AnalysisCrew:{symbol}", "crew"):
+            result = analysis_crew.crew().kickoff(inputs={
+                "symbol": symbol,
+                "trade_date": self.state.trade_date,
+                "start_date": self.state.start_date,
+                "end_date": self.state.end_date,
+                "macro_context": self.state.macro_context,
+                "equity": self.state.equity,
+                "risk": str(float(self.state.risk) * 100),
+            })
+        return result.raw
+
+    @listen(get_global_macro)
+    def screen_watchlist(self):
+        """Shrinks the watchlist to the top-N symbols passing the quantitative rules."""
+        if "screen" in self.state.completed_stages:
+            return
+        self.state.universe = list(self.state.watchlist)
+        top_n = {**SCREENER_RULES, **CONFIG["screener_rules"]}["top_n"]
+        if not CONFIG["screener_enabled"] or len(dict.fromkeys(self.state.universe)) <= top_n:
+            # A list that already fits the shortlist is analyzed as given, the screen only ever shrinks
+            self._save_checkpoint("screen")
+            return
+
+        with span("screen", "flow", symbols=len(self.state.universe)) as attrs:
+            candidates, ranked = shortlist(self.state.universe, self.state.start_date, self.state.end_date,
+                                           equity=float(self.state.equity), risk=float(self.state.risk),
+                                           rules=CONFIG["screener_rules"])
+            attrs["candidates"] = len(candidates)
+
+        self.state.screen_results = ranked
+        self.state.watchlist = candidates
+        print(f"--- Screener kept {len(candidates)}/{len(self.state.universe)} symbols: {candidates} ---")
+        self._save_checkpoint("screen")
+
+    @listen(screen_watchlist)
+    def analyze_all_symbols(self):
+        """Triggers for each symbol using the pre-calculated macro."""
+
+        watchlist = list(dict.fromkeys(self.state.watchlist))
+        store = AnalysisStore()
+        # Symbols a resumed run already finished
+        results = {symbol: self.state.ticker_analysis_results[symbol] for symbol in watchlist
+                   if symbol in self.state.ticker_analysis_results}
+        if results:
+            print(f"--- {len(results)} symbols restored from checkpoint: {list(results)} ---")
+        remaining = [symbol for symbol in watchlist if symbol not in results]
+
+        # Company news feeds both the fingerprints and the news tool: one concurrent burst up front,
+        # the fingerprints then read it from the response memo
+        with span("news_prefetch", "flow", symbols=len(remaining), stage="company"):
+            prefetch_news(remaining, self.state.start_date, self.state.end_date, searches=False,
+                          pins=self.news_pins)
+
+        # Fingerprints are recorded on every run, so switching incremental mode on has a baseline
+        with span("fingerprint", "flow", symbols=len(remaining)) as attrs:
+            fingerprints = fingerprint_symbols(remaining, self.state.start_date, self.state.end_date,
+                                               self.state.macro_context) if remaining else {}
+            reusable, dirty = {}, {}
+            if self.state.incremental:
+                reusable, dirty = plan_incremental(store, fingerprints, self.state.trade_date,
+                                                   rules=CONFIG["incremental_rules"])
+            attrs["reused"] = len(reusable)
+        for symbol, reasons in dirty.items():
+            print(f"--- {symbol} changed ({', '.join(reasons)}), re-analyzing ---")
+        self.state.reused_symbols = sorted(set(self.state.reused_symbols) | set(reusable))
+        pending = [symbol for symbol in remaining if symbol not in reusable]
+        workers = max(1, min(int(self.state.analysis_workers), len(pending) or 1))
+
+        for symbol, previous in reusable.items():
+            print(f"--- Reusing {symbol} analysis from {previous['analyzed_on']} ---")
+            results[symbol] = previous["report"]
+            # Keep the fingerprint of the run that made the report, so drift keeps adding up
+            store.record(symbol, self.state.trade_date, previous["report"], previous["fingerprint"],
+                         analyzed_on=previous["analyzed_on"])
+            self._symbol_done(symbol, results[symbol], reused=True)
+            self.state.ticker_analysis_results[symbol] = results[symbol]
+        if reusable:
+            self._save_checkpoint("analysis:reused")
+
+        # One concurrent, rate-limited burst of searches instead of serial handshakes per agent,
+        # only for the symbols that are actually re-analyzed
+        with span("news_prefetch", "flow", symbols=len(pending), stage="search"):
+            prefetch_news(pending, self.state.start_date, self.state.end_date, company=False,
+                          pins=self.news_pins)
+
+        with span("analysis", "flow", symbols=len(pending), workers=workers), \
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis") as pool:
+            # A stalled server or a failing tool costs one symbol, not the run
+            futures = {pool.submit(with_retries, lambda symbol=symbol: self.analyze_symbol(symbol),
+                                   timeout=CONFIG["symbol_timeout_seconds"], retries=CONFIG["symbol_retries"],
+                                   backoff=CONFIG["symbol_retry_backoff_seconds"],
+                                   grace=CONFIG["symbol_cancel_grace_seconds"], label=symbol): symbol
+                       for symbol in pending}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    print(f"--- {symbol} failed: {type(e).__name__}: {e} ---")
+                    self.state.failed_symbols[symbol] = f"{type(e).__name__}: {e}"
+                    self._save_checkpoint(f"analysis:{symbol}")
+                    continue
+                # Persist (and stream) each report as soon as its crew finishes
+                self._symbol_done(symbol, results[symbol], reused=False)
+                store.record(symbol, self.state.trade_date, results[symbol], fingerprints[symbol])
+                self.state.ticker_analysis_results[symbol] = results[symbol]
+                self.state.failed_symbols.pop(symbol, None)
+                self._save_checkpoint(f"analysis:{symbol}")
+
+        failed = [symbol for symbol in watchlist if symbol not in results]
+        if failed and not CONFIG["skip_failed_symbols"]:
+            raise RuntimeError(f"Analysis failed for {failed}, finished symbols are checkpointed; resume to retry them")
+
+        # Collect in watchlist order so the strategy prompt is deterministic and complete
+        self.state.ticker_analysis_results = {symbol: results[symbol] for symbol in watchlist if symbol in results}
+        self._save_checkpoint("analysis")
+
+    # @listen(analyze_all_symbols)
+    # def finalize_plan(self):
+    #     """Triggers for each symbol using the pre-calculated macro."""
+    #
+    #     all_plans = {}
+    #
+    #     for symbol in self.state.watchlist:
+    #         print(f"--- Analyzing {symbol} using Global Macro context ---")
+    #         #     # ISOLATION: Dynamic path based on symbol prevents memory bleed
+    #         os.environ["CREWAI_STORAGE_DIR"] = f"{os.getenv('MEMORY_DB_BASE_DIR')}/strategy/tickers/{symbol}/"
+    #
+    #         result = StrategyCrew().crew().kickoff(inputs={
+    #                     "symbol": symbol,
+    #                     "trade_date": self.state.trade_date,
+    #                     "start_date": self.state.start_date,
+    #                     "end_date": self.state.end_date,
+    #                     "macro_report": self.state.macro_context,
+    #                     "analyst_dossier": self.state.ticker_analysis_results[symbol],
+    #                    "equity": self.state.equity,
+    #                    "risk": str(float(self.state.risk) * 100),
+    #                 })
+    #
+    #         all_plans[symbol] = result
+    #
+    #     return all_plans
+
+    @listen(analyze_all_symbols)
+    def finalize_plan(self):
+        """Triggers for each symbol using the pre-calculated macro."""
+        if "strategy" in self.state.completed_stages and self.state.portfolio is not None:
+            # Finished run resumed: the sized portfolio is already in the checkpoint and the signal store
+            return PortfolioResponse.model_validate(self.state.portfolio)
+        if not self.state.ticker_analysis_results:
+            # Nothing was analyzed (empty watchlist, or every symbol failed), no strategy to ask for
+            print("--- No symbol analyses, skipping the strategy stage ---")
+            portfolio = PortfolioResponse(trades=[], total_portfolio_risk_percent=0.0)
+            self.state.trade_signals = []
+            self.state.portfolio = portfolio.model_dump()
+            self._save_checkpoint("strategy")
+            return portfolio
+
+        strategy_crew = StrategyCrew()
+        strategy_crew.storage_dir = run_memory_dir(self.state.trade_date, "strategy")
+
+        # for symbol in self.state.watchlist:
+        #     print(f"--- Analyzing {symbol} using Global Macro context ---")
+        #     #     # ISOLATION: Dynamic path based on symbol prevents memory bleed
+
+
+        macro_report = self.state.macro_context
+        all_symbol_reports = "\n---\n".join(self.state.ticker_analysis_results.values())
+        if CONFIG["strategy_compaction"]:
+            # Bounded prompt: one ranked record per symbol within the token budget
+            budget = CONFIG["strategy_budget"]
+            with span("compaction", "flow", symbols=len(self.state.ticker_analysis_results)) as attrs:
+                attrs["tokens_before"] = estimate_tokens(all_symbol_reports) + estimate_tokens(macro_report)
+                all_symbol_reports, _ = compact_reports(
+                    self.state.ticker_analysis_results, self.state.start_date, self.state.end_date,
+                    screen_results=self.state.screen_results, budget=budget)
+                macro_report = compact_macro(macro_report, budget["macro_tokens"])
+                attrs["tokens_after"] = estimate_tokens(all_symbol_reports) + estimate_tokens(macro_report)
+
+        with span("strategy", "flow"):
+            result = strategy_crew.crew().kickoff(inputs={
+                    # "symbol": symbol,
+                    "trade_date": self.state.trade_date,
+                    "start_date": self.state.start_date,
+                    "end_date": self.state.end_date,
+                    "macro_report": macro_report,
+                    "all_symbol_reports": all_symbol_reports,
+                    "equity": self.state.equity,
+                    "risk": str(float(self.state.risk) * 100),
+                })
+
+        # Validate the portfolio right away, size it deterministically and stream it into the signal store
+        portfolio = parse_portfolio(result)
+        if portfolio is None:
+            print("--- Strategy output did not match the PortfolioResponse schema ---")
+            return result
+
+        with span("risk", "flow", trades=len(portfolio.trades)):
+            portfolio = size_portfolio(portfolio, equity=float(self.state.equity), risk=float(self.state.risk),
+                                       end_date=self.state.end_date, limits=CONFIG["risk_limits"])
+        # Key the rows on the run's date, not whatever date the LLM wrote into each trade
+        for trade in portfolio.trades:
+            trade.trade_date = self.state.trade_date
+        SignalStore().append(portfolio.trades, source="strategy", trade_dates=[self.state.trade_date])
+        self.state.trade_signals = [trade.model_dump() for trade in portfolio.trades]
+        self.state.portfolio = portfolio.model_dump()
+        self._save_checkpoint("strategy")
+        return portfolio
+
+
+# TODO teach to learn based on future look for swing trading both backtesting and daily runs
+
+
+def _report_dir() -> Path:
+    report_dir = Path(os.getenv("FINAL_REPORT_BASE_DIR", CONFIG["results_dir"]))
+    report_dir.mkdir(parents=True, exist_ok=True)
+    return report_dir
+
+
+def write_symbol_report(trade_date: str, symbol: str, analysis: str) -> Path:
+    """Write one symbol's analysis (Markdown text, not JSON) under FINAL_REPORT_BASE_DIR/<symbol>/."""
+    report_dir = _report_dir() / symbol
+    report_dir.mkdir(parents=True, exist_ok=True)
+    file_path = report_dir / f"{trade_date}_{symbol}_report.md"
+    file_path.write_text(str(analysis))
+    return file_path
+
+
+def write_final_report(trade_date: str, final_report) -> Path:
+    """Write the strategy result as JSON when it validates, raw text otherwise."""
+    portfolio = parse_portfolio(final_report)
+    if portfolio is not None:
+        file_path = _report_dir() / f"{trade_date}_final_report.json"
+        file_path.write_text(portfolio.model_dump_json(indent=2))
+    else:
+        file_path = _report_dir() / f"{trade_date}_final_report.txt"
+        file_path.write_text(str(final_report))
+    return file_path
+
+
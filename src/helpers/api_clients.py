@@ -0,0 +1,219 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .fixtures import through_fixtures
+from .instrumentation import annotate
+
+# Shared client layer for the news providers: one keep-alive session per
+# provider, a token bucket sized to each API quota, retries with exponential
+# backoff on throttling and transient errors, and a short-lived, bounded in-process
+# response memo so a watchlist prefetch and the agents' own tool calls share
+# one request per (provider, query). Prefetched responses are pinned past the
+# TTL until the run that prefetched them releases its pins, so the last
+# symbols of a long run still read them instead of fetching again.
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+RESPONSE_TTL_SECONDS = float(os.getenv("NEWS_CACHE_TTL_SECONDS", 900))
+RESPONSE_MEMO_MAX = int(os.getenv("NEWS_CACHE_MAX_ENTRIES", 2048))  # Bound for a long-running server
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 16))
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate_per_minute` sustained with bursts up to `burst`."""
+
+    def __init__(self, rate_per_minute: float, burst: int | None = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(rate_per_minute // 10)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_limiters = {
+    # Finnhub free tier: 60 calls/minute; Tavily: 100 requests/minute
+    "finnhub": TokenBucket(float(os.getenv("FINNHUB_RATE_PER_MIN", 60))),
+    "tavily": TokenBucket(float(os.getenv("TAVILY_RATE_PER_MIN", 100))),
+}
+
+
+def _status_code(error: Exception) -> int | None:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def call_with_retries(provider: str, fn: Callable, attempts: int = 4, base_delay: float = 1.0):
+    """Run fn() under the provider's rate limit, retrying throttled and transient failures."""
+    for attempt in range(attempts):
+        _limiters[provider].acquire()
+        try:
+            return fn()
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == attempts - 1:
+                raise
+        except Exception as e:
+            if _status_code(e) not in RETRYABLE_STATUS or attempt == attempts - 1:
+                raise
+        # Exponential backoff with jitter so parallel workers do not retry in lockstep
+        time.sleep(base_delay * 2 ** attempt * (1 + random.random() / 2))
+
+
+def _pooled_session(session: requests.Session | None = None) -> requests.Session:
+    session = session or requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_clients: dict[str, object] = {}
+_clients_guard = threading.Lock()
+
+
+def finnhub_client():
+    """Process-wide finnhub.Client whose requests session is reused for every call."""
+    with _clients_guard:
+        if "finnhub" not in _clients:
+            import finnhub
+
+            client = finnhub.Client(api_key=os.environ["FINNHUB_API_KEY"])
+            if isinstance(getattr(client, "_session", None), requests.Session):
+                _pooled_session(client._session)
+            _clients["finnhub"] = client
+        return _clients["finnhub"]
+
+
+def tavily_session() -> requests.Session:
+    with _clients_guard:
+        if "tavily" not in _clients:
+            session = _pooled_session()
+            session.headers.update({"Authorization": f"Bearer {os.environ['TAVILY_API_KEY']}",
+                                    "Content-Type": "application/json"})
+            _clients["tavily"] = session
+        return _clients["tavily"]
+
+
+_memo: dict[tuple, tuple[float, Future]] = {}
+_memo_guard = threading.Lock()
+_pinned: dict[tuple, tuple[Future, set[int]]] = {}  # key -> (response, ids of the pin sets holding it)
+
+
+def _prune_memo(now: float) -> None:
+    """Drop expired entries, then the oldest ones beyond RESPONSE_MEMO_MAX (call under _memo_guard)."""
+    # Every entry gets the same TTL and is (re)inserted at the end, so the dict is in expiry order
+    while _memo:
+        oldest = next(iter(_memo))
+        if _memo[oldest][0] > now and len(_memo) <= RESPONSE_MEMO_MAX:
+            break
+        del _memo[oldest]
+
+
+def _memoized(key: tuple, fn: Callable, pins: set | None = None):
+    """Share one in-flight or recent result per key; failures are not remembered.
+
+    With `pins` (a run's set of pinned keys) the result also outlives the TTL until release_pins(pins).
+    """
+    with _memo_guard:
+        now = time.monotonic()
+        entry = _memo.get(key)
+        if key in _pinned:
+            future, owner = _pinned[key][0], False
+        elif entry and entry[0] > now:
+            future, owner = entry[1], False
+        else:
+            future, owner = Future(), True
+            _memo.pop(key, None)
+            _memo[key] = (now + RESPONSE_TTL_SECONDS, future)
+            _prune_memo(now)
+        if pins is not None:
+            pins.add(key)
+            _pinned.setdefault(key, (future, set()))[1].add(id(pins))
+    annotate(cache_hit=not owner)
+    if owner:
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            with _memo_guard:
+                if _memo.get(key, (None, None))[1] is future:
+                    _memo.pop(key, None)
+                if _pinned.get(key, (None, None))[0] is future:
+                    _pinned.pop(key)
+            future.set_exception(e)
+    return future.result()
+
+
+def release_pins(pins: set) -> None:
+    """Let the responses pinned through `pins` expire normally again (call when the run ends)."""
+    with _memo_guard:
+        for key in pins:
+            holders = _pinned.get(key, (None, set()))[1]
+            holders.discard(id(pins))
+            if not holders:
+                _pinned.pop(key, None)
+        pins.clear()
+
+
+def company_news(symbol: str, start_date: str, end_date: str, pins: set | None = None) -> list[dict]:
+    """Finnhub company news for [start_date, end_date]; `pins` keeps it memoized, see _memoized()."""
+    symbol = symbol.upper()
+
+    def request():
+        news = finnhub_client().company_news(symbol, _from=start_date, to=end_date)
+        # The finnhub client hides the raw response, count the decoded payload instead
+        annotate(bytes=len(json.dumps(news)))
+        return news
+
+    key = ("finnhub", symbol, start_date, end_date)
+    return _memoized(key, lambda: through_fixtures("finnhub", key, lambda: call_with_retries("finnhub", request)),
+                     pins)
+
+
+def tavily_search(query: str, max_results: int, pins: set | None = None) -> dict:
+    """Tavily search over the pooled session; same response shape as TavilySearch.invoke."""
+    def request():
+        response = tavily_session().post(TAVILY_SEARCH_URL, timeout=30,
+                                         json={"query": query, "max_results": max_results})
+        response.raise_for_status()
+        annotate(bytes=len(response.content))
+        return response.json()
+
+    key = ("tavily", query, max_results)
+    return _memoized(key, lambda: through_fixtures("tavily", key, lambda: call_with_retries("tavily", request)),
+                     pins)
+
+
+def run_batch(calls: list[Callable], max_workers: int | None = None) -> list:
+    """Run independent fetches concurrently; each slot holds a result or the raised exception."""
+    if not calls:
+        return []
+    results = [None] * len(calls)
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(calls), POOL_SIZE),
+                            thread_name_prefix="prefetch") as pool:
+        futures = {pool.submit(call): i for i, call in enumerate(calls)}
+        for future, i in futures.items():
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                results[i] = e
+    return results
@@ -0,0 +1,29 @@
+import datetime
+import os
+
+# Process-wide "as of" cutoff. While it is set, every data tool clamps its end
+# date to the day before the cutoff, so an agent replaying a past trade_date
+# can never see bars or news from that day onward, whatever dates it asks for.
+_cutoff: datetime.date | None = None
+
+
+def set_cutoff(trade_date: str | None) -> None:
+    """Set the trade_date being analyzed in this process, or None to lift the cutoff."""
+    global _cutoff
+    _cutoff = datetime.datetime.strptime(trade_date, "%Y-%m-%d").date() if trade_date else None
+
+
+def get_cutoff() -> datetime.date | None:
+    if _cutoff is None and os.getenv("AS_OF_DATE"):
+        return datetime.datetime.strptime(os.environ["AS_OF_DATE"], "%Y-%m-%d").date()
+    return _cutoff
+
+
+def clamp_end_date(end_date: str) -> str:
+    """end_date, moved back to the last day strictly before the cutoff when needed."""
+    cutoff = get_cutoff()
+    if cutoff is None:
+        return end_date
+    last_allowed = cutoff - datetime.timedelta(days=1)
+    requested = datetime.datetime.strptime(str(end_date)[:10], "%Y-%m-%d").date()
+    return min(requested, last_allowed).isoformat()
@@ -0,0 +1,257 @@
+import contextlib
+import datetime
+import fcntl
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .fixtures import replaying
+from .instrumentation import annotate
+
+# Daily OHLCV bars cached on disk as one Parquet file per symbol, with a small
+# JSON sidecar recording the calendar range already fetched. Only the missing
+# gap is ever requested from Yahoo, so replaying the same dates is offline.
+# Coverage only grows over gaps that returned bars, hold no business days, or
+# came back empty but are settled: a later bar already closes them (holidays
+# inside the data, dates before the listing) or they are a few sessions long
+# and over a day old (a holiday at the end of the window). The read-fetch-write
+# cycle runs under a per-symbol flock so backtest worker processes never pair
+# one's data with another's sidecar.
+# Files are written in small row groups so iter_bars() can stream a window in
+# fixed-size chunks, skipping row groups outside it, without loading the file.
+BAR_STORE_DIR = os.getenv("BAR_STORE_DIR", "./data/bars")
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+BAR_ROW_GROUP_SIZE = int(os.getenv("BAR_ROW_GROUP_SIZE", 256))  # ~1 trading year per row group
+BAR_CHUNK_ROWS = int(os.getenv("BAR_CHUNK_ROWS", 256))
+BAR_MEMO_SYMBOLS = int(os.getenv("BAR_MEMO_SYMBOLS", 64))  # Decoded frames kept in memory, LRU
+EMPTY_GAP_MAX_SESSIONS = 4  # Longest market closure an empty fetch is trusted to be
+
+_locks: dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+_memo: OrderedDict[str, tuple[int, pd.DataFrame]] = OrderedDict()
+_memo_guard = threading.Lock()
+
+
+@contextlib.contextmanager
+def _symbol_lock(symbol: str):
+    """Exclusive access to one symbol's files across threads and processes."""
+    with _locks_guard:
+        lock = _locks.setdefault(symbol, threading.Lock())
+    with lock:
+        base = Path(BAR_STORE_DIR)
+        base.mkdir(parents=True, exist_ok=True)
+        with open(base / f"{symbol}.lock", "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _paths(symbol: str) -> tuple[Path, Path]:
+    base = Path(BAR_STORE_DIR)
+    return base / f"{symbol}.parquet", base / f"{symbol}.json"
+
+
+def _to_date(value) -> datetime.date:
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def _read_coverage(symbol: str) -> tuple[datetime.date, datetime.date] | None:
+    _, meta_path = _paths(symbol)
+    if not meta_path.exists():
+        return None
+    meta = json.loads(meta_path.read_text())
+    return _to_date(meta["start"]), _to_date(meta["end"])
+
+
+def _read_bars(symbol: str, memoize: bool = True) -> pd.DataFrame:
+    data_path, _ = _paths(symbol)
+    if not data_path.exists():
+        return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+    mtime = data_path.stat().st_mtime_ns
+    with _memo_guard:
+        cached = _memo.get(symbol)
+        if cached and cached[0] == mtime:
+            _memo.move_to_end(symbol)
+            return cached[1]
+    df = pd.read_parquet(data_path)
+    if memoize:
+        _remember(symbol, mtime, df)
+    return df
+
+
+def _remember(symbol: str, mtime: int, df: pd.DataFrame) -> None:
+    with _memo_guard:
+        _memo[symbol] = (mtime, df)
+        _memo.move_to_end(symbol)
+        while len(_memo) > BAR_MEMO_SYMBOLS:
+            _memo.popitem(last=False)
+
+
+def _write_atomic(path: Path, write) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _fetch(symbol: str, start: datetime.date, end: datetime.date) -> pd.DataFrame:
+    """Download [start, end] from Yahoo Finance as a tz-naive daily frame."""
+    if replaying():
+        # Offline replay: the bundle's bars are all there is
+        return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+    import yfinance as yf
+
+    # yfinance treats `end` as exclusive
+    data = yf.Ticker(symbol).history(start=start.isoformat(),
+                                     end=(end + datetime.timedelta(days=1)).isoformat(),
+                                     auto_adjust=True)
+    if data.empty:
+        return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+    data = data[BAR_COLUMNS].astype("float64")
+    annotate(bytes=int(data.memory_usage(index=True).sum()))
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    data.index = index.normalize().rename("Date")
+    return data
+
+
+def _missing_ranges(coverage, start: datetime.date, end: datetime.date) -> list[tuple[datetime.date, datetime.date]]:
+    if coverage is None:
+        return [(start, end)]
+    covered_start, covered_end = coverage
+    one_day = datetime.timedelta(days=1)
+    gaps = []
+    # Gaps are extended up to the covered range so coverage stays contiguous
+    if start < covered_start:
+        gaps.append((start, covered_start - one_day))
+    if end > covered_end:
+        gaps.append((covered_end + one_day, end))
+    return gaps
+
+
+def _window(start_date, end_date) -> tuple[datetime.date, datetime.date]:
+    # Today's bar is still forming, never persist it
+    return _to_date(start_date), min(_to_date(end_date), datetime.date.today() - datetime.timedelta(days=1))
+
+
+def _ensure_cached(symbol: str, start: datetime.date, end: datetime.date, memoize: bool = True) -> None:
+    """Fetch and persist whatever part of [start, end] the store does not cover yet (call under the lock).
+
+    With memoize=False (the streaming path) the merged frame is written and dropped, not kept in _memo.
+    """
+    coverage = _read_coverage(symbol)
+    gaps = _missing_ranges(coverage, start, end)
+    annotate(cache_hit=not gaps)
+    if not gaps:
+        return
+    frames = [_read_bars(symbol, memoize)]
+    covered, empty = [], []
+    for gap_start, gap_end in gaps:
+        sessions = len(pd.bdate_range(gap_start, gap_end))
+        if not sessions:
+            covered.append((gap_start, gap_end))  # Weekend-only gap, nothing to ask for
+            continue
+        try:
+            fetched = _fetch(symbol, gap_start, gap_end)
+        except Exception as e:
+            print(f"--- Bar fetch for {symbol} {gap_start}..{gap_end} failed: {e} ---")
+            continue
+        if fetched.empty:
+            empty.append((gap_start, gap_end, sessions))
+        else:
+            frames.append(fetched)
+            covered.append((gap_start, gap_end))
+
+    # yfinance also answers throttling and network errors with an empty frame, so an empty gap
+    # only counts as covered once it is settled; anything else is asked for again next time
+    last_bar = max((frame.index.max().date() for frame in frames if not frame.empty), default=None)
+    settled_before = datetime.date.today() - datetime.timedelta(days=1)
+    for gap_start, gap_end, sessions in empty:
+        if (last_bar is not None and last_bar > gap_end) or \
+                (gap_end < settled_before and sessions <= EMPTY_GAP_MAX_SESSIONS):
+            covered.append((gap_start, gap_end))
+    if not covered:
+        return  # Nothing new came back
+    new_start = min([gap_start for gap_start, _ in covered] + ([coverage[0]] if coverage else []))
+    new_end = max([gap_end for _, gap_end in covered] + ([coverage[1]] if coverage else []))
+
+    data_path, meta_path = _paths(symbol)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    if len(frames) > 1:
+        frames = [frame for frame in frames if not frame.empty]
+        bars = pd.concat(frames)
+        bars = bars[~bars.index.duplicated(keep="last")].sort_index()
+        _write_atomic(data_path, lambda p: bars.to_parquet(p, row_group_size=BAR_ROW_GROUP_SIZE))
+        if memoize:
+            _remember(symbol, data_path.stat().st_mtime_ns, bars)
+    # Data first, then the sidecar, so the meta never claims bars that are not on disk
+    _write_atomic(meta_path, lambda p: p.write_text(json.dumps({
+        "start": new_start.isoformat(), "end": new_end.isoformat()})))
+
+
+def load_bars(symbol: str, start_date, end_date) -> pd.DataFrame:
+    """Return daily OHLCV bars for [start_date, end_date] (inclusive), fetching only uncached dates."""
+    symbol = symbol.upper()
+    start, end = _window(start_date, end_date)
+    if end < start:
+        return _read_bars(symbol).iloc[0:0]
+
+    with _symbol_lock(symbol):
+        _ensure_cached(symbol, start, end)
+        bars = _read_bars(symbol)
+
+    return bars.loc[pd.Timestamp(start):pd.Timestamp(end)]
+
+
+def iter_bars(symbol: str, start_date, end_date, chunk_rows: int = BAR_CHUNK_ROWS,
+              columns: tuple[str, ...] = ("High", "Low", "Close")):
+    """Yield [start_date, end_date] in chunks of at most `chunk_rows` bars, oldest first.
+
+    Each chunk is a dict of NumPy arrays: "Date" (datetime64[D]) plus the requested columns.
+    Reads straight from the Parquet file, so memory stays bounded by the chunk size.
+    """
+    import pyarrow.parquet as pq
+
+    symbol = symbol.upper()
+    start, end = _window(start_date, end_date)
+    if end < start:
+        return
+    with _symbol_lock(symbol):
+        # Only a refill reads the whole file, and even then it is not kept around
+        _ensure_cached(symbol, start, end, memoize=False)
+        data_path, _ = _paths(symbol)
+        if not data_path.exists():
+            return
+        # Open under the lock, a concurrent refill replaces the path but not this handle
+        parquet = pq.ParquetFile(data_path)
+
+    first, last = np.datetime64(start, "D"), np.datetime64(end, "D")
+    date_column = parquet.schema_arrow.get_field_index("Date")
+    row_groups = []
+    for i in range(parquet.num_row_groups):
+        stats = parquet.metadata.row_group(i).column(date_column).statistics
+        if stats is not None and stats.has_min_max and (
+                np.datetime64(stats.max, "D") < first or np.datetime64(stats.min, "D") > last):
+            continue
+        row_groups.append(i)
+    if not row_groups:
+        return
+
+    for batch in parquet.iter_batches(batch_size=chunk_rows, row_groups=row_groups, columns=["Date", *columns]):
+        dates = batch.column("Date").to_numpy().astype("datetime64[D]")
+        keep = (dates >= first) & (dates <= last)
+        if not keep.any():
+            continue
+        chunk = {"Date": dates[keep]}
+        for name in columns:
+            chunk[name] = batch.column(name).to_numpy(zero_copy_only=False).astype(np.float64)[keep]
+        yield chunk
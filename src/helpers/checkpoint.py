@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+# Durable TradingState checkpoints for resumable runs. Each run (trade_date +
+# watchlist) owns one JSON file that the flow rewrites after every stage and
+# every finished symbol: written to a temp file, fsync'ed, then os.replace'd,
+# so a crash leaves either the previous snapshot or the new one, never half
+# of each. Resuming loads the snapshot back into the flow state and the
+# stages skip whatever it already holds.
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "./results/checkpoints")
+STAGES = ["macro", "screen", "analysis", "strategy"]
+
+
+class SymbolTimeout(TimeoutError):
+    """Raised when one symbol's analysis exceeds its time budget."""
+
+    def __init__(self, message: str, still_running: bool = False):
+        super().__init__(message)
+        self.still_running = still_running  # The abandoned attempt ignored its cancel event
+
+
+class AttemptCancelled(RuntimeError):
+    """Raised inside a timed-out attempt at its next LLM or tool call."""
+
+
+_attempt = threading.local()
+
+
+def check_cancelled() -> None:
+    """Stop the current attempt if its caller gave up on it; called before every LLM and tool call."""
+    cancel = getattr(_attempt, "cancel", None)
+    if cancel is not None and cancel.is_set():
+        raise AttemptCancelled("attempt timed out")
+
+
+def run_id(trade_date: str, watchlist: list[str]) -> str:
+    symbols = sorted(dict.fromkeys(symbol.upper() for symbol in watchlist))
+    return f"{trade_date}_{hashlib.sha256(','.join(symbols).encode()).hexdigest()[:12]}"
+
+
+class FlowCheckpoint:
+    """Atomic JSON snapshot of one run's flow state."""
+
+    def __init__(self, run: str, base_dir: str | None = None):
+        self.run_id = run
+        self.path = Path(base_dir or CHECKPOINT_DIR) / f"{run}.json"
+        self._lock = threading.Lock()
+
+    def load(self) -> dict | None:
+        """The last snapshot, or None when there is none (or it is unreadable)."""
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def save(self, state: dict, stage: str, **extra) -> None:
+        snapshot = {"run_id": self.run_id, "stage": stage, "updated_at": time.time(), "state": state, **extra}
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+
+def list_checkpoints(base_dir: str | None = None) -> list[dict]:
+    """Summary of every stored run, most recently updated first."""
+    runs = []
+    for path in Path(base_dir or CHECKPOINT_DIR).glob("*.json"):
+        snapshot = FlowCheckpoint(path.stem, base_dir).load()
+        if snapshot is None:
+            continue
+        state = snapshot.get("state", {})
+        runs.append({
+            "run_id": snapshot["run_id"],
+            "stage": snapshot["stage"],
+            "updated_at": snapshot["updated_at"],
+            "trade_date": state.get("trade_date"),
+            "watchlist": state.get("universe") or state.get("watchlist"),
+            "symbols_done": len(state.get("ticker_analysis_results", {})),
+            "failed_symbols": sorted(state.get("failed_symbols", {})),
+        })
+    return sorted(runs, key=lambda run: run["updated_at"], reverse=True)
+
+
+def call_with_timeout(fn: Callable[[], str], timeout: float | None, grace: float = 0.0) -> str:
+    """fn() on a daemon thread, raising SymbolTimeout if it does not finish in time.
+
+    Python cannot kill a thread, so a timed-out attempt is cancelled cooperatively: its next LLM
+    or tool call raises AttemptCancelled. It gets `grace` seconds to unwind; if it is still
+    running after that, the SymbolTimeout says so and the caller must not start another attempt.
+    """
+    if not timeout:
+        return fn()
+    outcome = {}
+    cancel = threading.Event()
+
+    def target():
+        _attempt.cancel = cancel
+        try:
+            outcome["result"] = fn()
+        except BaseException as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=target, name=f"{threading.current_thread().name}-attempt", daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        cancel.set()
+        worker.join(grace)
+        raise SymbolTimeout(f"no result after {timeout:.0f}s", still_running=worker.is_alive())
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def with_retries(fn: Callable[[], str], timeout: float | None, retries: int, backoff: float,
+                 grace: float = 0.0, label: str = "") -> str:
+    """fn() under a per-attempt timeout, retried up to `retries` times with linear backoff.
+
+    Never retries while an earlier attempt is still running, two attempts would share the
+    symbol's memory, stores and report, and double the load on a stalled server.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return call_with_timeout(fn, timeout, grace)
+        except Exception as e:
+            if attempt == retries or getattr(e, "still_running", False):
+                raise
+            print(f"--- {label} attempt {attempt + 1} failed ({type(e).__name__}: {e}), retrying ---")
+            time.sleep(backoff * (attempt + 1))
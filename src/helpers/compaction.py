@@ -0,0 +1,247 @@
+import heapq
+import re
+
+from .indicators import latest_indicators
+
+# Compaction of the per-symbol analyses before they reach the StrategyCrew.
+# Each Markdown report becomes one structured line (a provisional signal,
+# levels on the side of that signal, indicators, a provisional expectancy and
+# a short rationale), numbers taken from the indicator engine rather than the
+# LLM's prose. Reports that do not follow the template keep a cut of their raw
+# text instead. The lines are then ranked and packed into a fixed token
+# budget, so the strategy prompt stays the same size however long the
+# watchlist is.
+DEFAULT_BUDGET = {
+    "tokens": 3000,           # Whole STOCK_DOSSIERS block
+    "macro_tokens": 800,      # MACRO_REPORT block
+    "chunk_size": 16,         # Records scored per ranking chunk
+    "rationale_chars": 240,
+    "raw_chars": 800,         # Report excerpt kept when the template fields can not be parsed
+}
+# Rough win probability per confluence grade for the provisional expectancy, the
+# realized figures come from `evaluate` once the signals have played out
+WIN_RATE = {"high": 0.55, "medium": 0.45, "low": 0.35}
+DEFAULT_WIN_RATE = 0.4
+CHARS_PER_TOKEN = 4  # Good enough for llama-style tokenizers on English prose
+_NUMBER = re.compile(r"-?\d+(?:,\d{3})*(?:\.\d+)?")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _field(report: str, label: str) -> str | None:
+    """Value after `label:` on its line, without Markdown decoration or template brackets."""
+    match = re.search(rf"{re.escape(label)}[^:\n]*:\s*(.+)", report, re.IGNORECASE)
+    if not match:
+        return None
+    value = re.sub(r"[*_`\[\]]", "", match.group(1)).strip()
+    return value or None
+
+
+def _number(value: str | None) -> float | None:
+    match = _NUMBER.search(value or "")
+    return float(match.group().replace(",", "")) if match else None
+
+
+def _first_word(value: str | None) -> str | None:
+    return value.split()[0].strip(".,;/").lower() if value else None
+
+
+def _rationale(report: str, limit: int) -> str:
+    text = _field(report, "Narrative Theme") or _field(report, "Multi-Factor Confluence") or ""
+    if not text:
+        # No template sections, fall back to the first prose line of the report
+        text = next((line.strip() for line in report.splitlines()
+                     if len(line.strip()) > 40 and not line.lstrip().startswith(("#", "-", "|"))), "")
+    text = re.sub(r"\s+", " ", text)
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+def _signal(trend: str | None, momentum: str | None, above_sma_200: bool | None, sentiment: float | None) -> str:
+    """BUY/SELL when trend, MACD momentum, the 200-day average and sentiment lean one way by two votes."""
+    votes = {"upward": 1, "downward": -1}.get(trend or "", 0)
+    momentum = (momentum or "").lower()
+    votes += 1 if "bullish" in momentum else -1 if "bearish" in momentum else 0
+    if above_sma_200 is not None:
+        votes += 1 if above_sma_200 else -1
+    if sentiment is not None and -1.0 <= sentiment <= 1.0 and abs(sentiment) >= 0.2:
+        votes += 1 if sentiment > 0 else -1
+    return "BUY" if votes >= 2 else "SELL" if votes <= -2 else "HOLD"
+
+
+def _levels(signal: str, close, atr, support, resistance) -> tuple[float | None, float | None]:
+    """Stop and target implied by the report's levels on the signal's side, (None, None) for HOLD."""
+    if not close or signal == "HOLD":
+        return None, None
+    pad = 0.25 * atr if atr else 0.0
+    if signal == "BUY":
+        # Stop under support (or 2 ATR), target at resistance
+        stop = support - pad if support and support < close else close - 2 * atr if atr else None
+        target = resistance if resistance and resistance > close else None
+    else:
+        # Mirror image for a short: stop over resistance (or 2 ATR), target at support
+        stop = resistance + pad if resistance and resistance > close else close + 2 * atr if atr else None
+        target = support if support and support < close else None
+    return stop, target
+
+
+def compact_record(symbol: str, report: str, indicators: dict | None, rationale_chars: int,
+                   raw_chars: int = DEFAULT_BUDGET["raw_chars"]) -> dict:
+    """Structured summary of one analysis report."""
+    indicators = indicators or {}
+    parsed_close = _number(_field(report, "Recent Close"))
+    close = indicators.get("close") or parsed_close
+    atr = indicators.get("atr_14")
+    support = _number(_field(report, "Support Level"))
+    resistance = _number(_field(report, "Resistance Level"))
+    trend = _first_word(_field(report, "Trend Vector"))
+    sentiment = _number(_field(report, "Aggregate Score"))
+    confluence = _first_word(_field(report, "Multi-Factor Confluence"))
+    above_sma_200 = (close > indicators["sma_200"]) if close and indicators.get("sma_200") else None
+
+    signal = _signal(trend, _field(report, "MACD Signal"), above_sma_200, sentiment)
+    entry = close
+    stop, target = _levels(signal, close, atr, support, resistance)
+    direction = -1.0 if signal == "SELL" else 1.0
+    risk = direction * (entry - stop) if entry and stop else None
+    r_ratio = round(direction * (target - entry) / risk, 2) if target and risk and risk > 0 else None
+    # Provisional expectancy in R: win at the target with the confluence's win rate, else lose 1R
+    win_rate = WIN_RATE.get(confluence or "", DEFAULT_WIN_RATE)
+    expectancy = round(win_rate * r_ratio - (1 - win_rate), 2) if r_ratio is not None else None
+
+    # Nothing of the template came through, so let the strategy agent read the report itself
+    templated = any(value is not None for value in (parsed_close, support, resistance, trend, sentiment, confluence))
+    raw = None
+    if not templated:
+        raw = re.sub(r"\s+", " ", report).strip()
+        raw = raw if len(raw) <= raw_chars else raw[:raw_chars - 3].rstrip() + "..."
+
+    return {
+        "symbol": symbol,
+        "signal": signal,
+        "close": close,
+        "atr_14": atr,
+        "rsi_14": indicators.get("rsi_14"),
+        "above_sma_200": above_sma_200,
+        "trend": trend,
+        "support": support,
+        "resistance": resistance,
+        "entry": round(entry, 2) if entry and stop else None,
+        "stop": round(stop, 2) if stop else None,
+        "target": round(target, 2) if target else None,
+        "r_ratio": r_ratio,
+        "expectancy_r": expectancy,
+        "sentiment": sentiment,
+        "confluence": confluence,
+        "rationale": _rationale(report, rationale_chars),
+        "raw": raw,
+    }
+
+
+def score_record(record: dict, screen_score: float | None = None) -> float:
+    """Rough setup quality, used only to decide what survives the budget.
+
+    Directional terms are read from the signal's side, so a clean short scores like a clean long.
+    """
+    score = screen_score if screen_score is not None else 0.0
+    side = -1.0 if record["signal"] == "SELL" else 1.0
+    score += side * {"upward": 1.0, "sideways": 0.0, "downward": -1.0}.get(record["trend"] or "", 0.0)
+    score += {"high": 1.0, "medium": 0.3, "low": -0.5}.get(record["confluence"] or "", 0.0)
+    if record["r_ratio"] is not None:
+        score += min(record["r_ratio"], 4.0) / 2
+    if record["rsi_14"] is not None:
+        score -= abs(record["rsi_14"] - (55.0 if side > 0 else 45.0)) / 30.0
+    if record["above_sma_200"] is not None:
+        score += side * (0.5 if record["above_sma_200"] else -0.5)
+    if record["sentiment"] is not None and -1.0 <= record["sentiment"] <= 1.0:
+        score += side * record["sentiment"]
+    if record["signal"] == "HOLD":
+        score -= 1.0
+    return round(score, 4)
+
+
+def _fmt(value) -> str:
+    return "n/a" if value is None else (f"{value:g}" if isinstance(value, float) else str(value))
+
+
+def render_record(record: dict, terse: bool = False) -> str:
+    head = (f"{record['symbol']} | {record['signal']} | score {_fmt(record['score'])} | close {_fmt(record['close'])}"
+            f" | ATR {_fmt(record['atr_14'])} | RSI {_fmt(record['rsi_14'])}")
+    if terse:
+        return head
+    if record["raw"] is not None:
+        return f"{head}\n  {record['raw']}"
+    return (f"{head} | trend {_fmt(record['trend'])} | >SMA200 {_fmt(record['above_sma_200'])}"
+            f" | support {_fmt(record['support'])} | resistance {_fmt(record['resistance'])}"
+            f" | entry {_fmt(record['entry'])} | stop {_fmt(record['stop'])} | target {_fmt(record['target'])}"
+            f" | R {_fmt(record['r_ratio'])} | E[R] {_fmt(record['expectancy_r'])}"
+            f" | sentiment {_fmt(record['sentiment'])} | confluence {_fmt(record['confluence'])}"
+            f"\n  {record['rationale']}")
+
+
+def rank_records(records: list[dict], keep: int, chunk_size: int) -> list[dict]:
+    """Top `keep` records by score, ranked chunk by chunk and then merged.
+
+    Each chunk is sorted and cut to `keep` on its own, so at most chunk_size records are ranked at
+    a time and a single k-way merge produces the final order.
+    """
+    chunks = [sorted(records[i:i + chunk_size], key=lambda r: (-r["score"], r["symbol"]))[:keep]
+              for i in range(0, len(records), chunk_size)]
+    return list(heapq.merge(*chunks, key=lambda r: (-r["score"], r["symbol"])))[:keep]
+
+
+def compact_reports(reports: dict[str, str], start_date: str, end_date: str,
+                    screen_results: list[dict] | None = None, budget: dict | None = None) -> tuple[str, list[dict]]:
+    """Pack the analyses into the token budget.
+
+    The best setups get a full line, the next ones a terse line while budget remains, and the
+    rest are only counted. Returns the text for the prompt and the ranked records.
+    """
+    budget = {**DEFAULT_BUDGET, **(budget or {})}
+    try:
+        indicators = latest_indicators(list(reports), start_date, end_date)
+    except Exception:
+        indicators = {}  # Reports alone still give the levels, just not verified numbers
+    screen_scores = {record["symbol"]: record["score"] for record in screen_results or []}
+
+    records = []
+    for symbol, report in reports.items():
+        record = compact_record(symbol, str(report), indicators.get(symbol.upper()), budget["rationale_chars"],
+                                budget["raw_chars"])
+        record["score"] = score_record(record, screen_scores.get(symbol))
+        records.append(record)
+    # Even terse lines cost over 12 tokens, so nothing past this rank could ever fit
+    ranked = rank_records(records, max(1, budget["tokens"] // 12), budget["chunk_size"])
+
+    lines, used, full = [], 0, True
+    for record in ranked:
+        line = render_record(record, terse=not full)
+        if full and used + estimate_tokens(line) > budget["tokens"]:
+            # Out of room for full records, the remainder only gets the headline numbers
+            full = False
+            line = render_record(record, terse=True)
+        if used + estimate_tokens(line) > budget["tokens"]:
+            break
+        lines.append(line)
+        used += estimate_tokens(line)
+    if len(lines) < len(records):
+        lines.append(f"({len(records) - len(lines)} lower-ranked symbols omitted for the token budget)")
+    return "\n".join(lines), ranked
+
+
+def compact_macro(macro_report: str, max_tokens: int) -> str:
+    """Leading paragraphs of the macro report that fit in max_tokens."""
+    macro_report = str(macro_report)
+    if estimate_tokens(macro_report) <= max_tokens:
+        return macro_report
+    kept, used = [], 0
+    for paragraph in re.split(r"\n\s*\n", macro_report):
+        cost = estimate_tokens(paragraph)
+        if used + cost > max_tokens:
+            break
+        kept.append(paragraph)
+        used += cost
+    if not kept:
+        return macro_report[:max_tokens * CHARS_PER_TOKEN]
+    return "\n\n".join(kept)
@@ -0,0 +1,213 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+import numpy as np
+import requests
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from crewai.rag.embeddings.providers.custom.embedding_callable import CustomEmbeddingFunction
+from requests.adapters import HTTPAdapter
+
+from .fixtures import active as active_fixtures
+from .instrumentation import annotate, span
+
+# Shared embedding service for crew memory. Texts are keyed by a content hash
+# so identical texts (the macro context injected into every symbol, repeated
+# task descriptions) are embedded once per model, in memory and on disk.
+# Misses from all threads are coalesced for a few milliseconds and sent to
+# Ollama's /api/embed as one batched request over a keep-alive session.
+# Vectors are kept as float32 arrays in an LRU capped by bytes, and disk reads
+# happen outside the service lock on a per-thread connection.
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./cache/embeddings.sqlite")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))
+EMBED_BATCH_WAIT_SECONDS = float(os.getenv("EMBED_BATCH_WAIT_MS", 5)) / 1000
+MEMORY_CACHE_BYTES = int(float(os.getenv("EMBED_MEMORY_CACHE_MB", 64)) * 1024 * 1024)
+
+
+def text_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingService:
+    """Content-addressed, batching embedding client shared by every memory store in the process."""
+
+    def __init__(self, model: str = EMBEDDING_MODEL, base_url: str = OLLAMA_BASE_URL,
+                 cache_path: str | None = EMBEDDING_CACHE_PATH):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._pending: dict[str, tuple[str, Future]] = {}
+        self._wakeup = threading.Condition(self._lock)
+        self._worker: threading.Thread | None = None
+        self.cache_path = cache_path
+        self._db = None  # Writer, used by the batcher under the lock
+        self._readers = threading.local()
+        if cache_path:
+            Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(cache_path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._db.commit()
+
+    def _from_disk(self, keys: list[str]) -> dict[str, np.ndarray]:
+        """Stored vectors for keys, read on this thread's own connection without the service lock."""
+        if self._db is None or not keys:
+            return {}
+        reader = getattr(self._readers, "conn", None)
+        if reader is None:
+            reader = self._readers.conn = sqlite3.connect(self.cache_path, timeout=30)
+        found = {}
+        for i in range(0, len(keys), 500):  # Stay under SQLite's bound-parameter limit
+            chunk = keys[i:i + 500]
+            rows = reader.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                                  chunk).fetchall()
+            found.update((key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows)
+        return found
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.nbytes
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes
+        while self._memory_bytes > MEMORY_CACHE_BYTES and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def embed(self, texts: list[str]) -> list[np.ndarray]:
+        """float32 embeddings for texts in order; cached texts are free, the rest join the next batch."""
+        keys = [text_key(self.model, text) for text in texts]
+        results: dict[str, np.ndarray | Future] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[key] = vector
+        on_disk = self._from_disk([key for key in dict.fromkeys(keys) if key not in results])
+        hits = len(results) + len(on_disk)
+
+        with self._lock:
+            for key, vector in on_disk.items():
+                self._remember(key, vector)
+                results[key] = vector
+            for key, text in zip(keys, texts):
+                if key in results:
+                    continue
+                vector = self._memory.get(key)  # Another thread may have filled it meanwhile
+                if vector is not None:
+                    results[key] = vector
+                    hits += 1
+                elif key in self._pending:
+                    # Someone else already asked for this exact text, share their request
+                    results[key] = self._pending[key][1]
+                else:
+                    future = Future()
+                    self._pending[key] = (text, future)
+                    results[key] = future
+            if len(results) > hits:
+                self._ensure_worker()
+                self._wakeup.notify()
+        annotate(cache_hit=hits == len(results), embed_cache_hits=hits, embed_misses=len(results) - hits)
+        return [value.result() if isinstance(value, Future) else value
+                for value in (results[key] for key in keys)]
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._wakeup.wait()
+            # Give concurrent callers a moment to join this batch
+            time.sleep(EMBED_BATCH_WAIT_SECONDS)
+            with self._lock:
+                batch = list(self._pending.items())[:EMBED_BATCH_SIZE]
+            self._embed_batch(batch)
+
+    def _embed_batch(self, batch: list[tuple[str, tuple[str, Future]]]) -> None:
+        texts = [text for _, (text, _) in batch]
+        try:
+            with span("embed.batch", "embedder", texts=len(texts)) as attrs:
+                response = self.session.post(f"{self.base_url}/api/embed", timeout=120,
+                                             json={"model": self.model, "input": texts})
+                response.raise_for_status()
+                attrs["bytes"] = len(response.content)
+                attrs["tokens_in"] = sum(len(text) for text in texts) // 4
+                vectors = response.json()["embeddings"]
+        except Exception as e:
+            with self._lock:
+                for key, (_, future) in batch:
+                    self._pending.pop(key, None)
+                    future.set_exception(e)
+            return
+
+        bundle = active_fixtures()
+        if bundle is not None and bundle.mode == "record":
+            for (key, _), vector in zip(batch, vectors):
+                bundle.record("embed", key, vector)
+
+        vectors = [np.asarray(vector, dtype=np.float32) for vector in vectors]
+        with self._lock:
+            if self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                                     [(key, vector.tobytes()) for (key, _), vector in zip(batch, vectors)])
+                self._db.commit()
+            for (key, (_, future)), vector in zip(batch, vectors):
+                self._remember(key, vector)
+                self._pending.pop(key, None)
+                future.set_result(vector)
+
+
+_services: dict[tuple[str, str], EmbeddingService] = {}
+_services_guard = threading.Lock()
+
+
+def get_embedding_service(model: str = EMBEDDING_MODEL, base_url: str = OLLAMA_BASE_URL) -> EmbeddingService:
+    with _services_guard:
+        key = (model, base_url)
+        if key not in _services:
+            _services[key] = EmbeddingService(model=model, base_url=base_url)
+        return _services[key]
+
+
+class OllamaEmbeddingFunction(CustomEmbeddingFunction, EmbeddingFunction[Documents]):
+    """Chroma embedding function backed by the shared EmbeddingService.
+
+    Crew(embedder=...) checks for chromadb's base class and RAGStorage for crewai's, so it has both.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, base_url: str = OLLAMA_BASE_URL, **kwargs):
+        self.model_name = model_name
+        self.base_url = base_url.rstrip("/")
+
+    def __call__(self, input: Documents) -> Embeddings:
+        texts = list(input)
+        with span("embed", "embedder", texts=len(texts)):
+            return get_embedding_service(self.model_name, self.base_url).embed(texts)
+
+    @staticmethod
+    def name() -> str:
+        return "swing_trader_ollama"
+
+    def get_config(self) -> dict:
+        return {"model_name": self.model_name, "base_url": self.base_url}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "OllamaEmbeddingFunction":
+        return OllamaEmbeddingFunction(**config)
@@ -0,0 +1,185 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import load_bars
+
+# Walk-forward outcome labeling for stored signals. Every BUY/SELL with usable
+# levels is laid out as one row of a (signals x horizon) High/Low matrix built
+# from the cached bars starting at its trade_date; the fill bar, the first bar
+# touching the stop and the first touching the target fall out of an argmax
+# per row, so a whole symbol's history is labeled in a handful of array ops.
+# Fills are conservative: a trade only opens on the first bar whose range
+# holds entry_price (never, if price runs away), its stop counts from that bar
+# and its target from the next one, a stop gapped through fills at the open,
+# and same-bar stop and target counts as a stop. Trades still open at the
+# horizon are marked to the last close in the window. Trades whose horizon has
+# not fully played out yet are reported apart from the realized statistics.
+SIGNAL_FIELDS = ["trade_date", "symbol", "signal", "market_type", "entry_price", "stop_loss", "profit_target"]
+OUTCOMES = np.array(["stop", "target", "time", "unfilled"])
+
+
+def signal_frame(signals: list[dict]) -> pd.DataFrame:
+    """Flat signal table from SignalStore rows or nested TradeSignal dicts."""
+    rows = []
+    for signal in signals:
+        setup = signal.get("trade_setup") or signal
+        rows.append({
+            "trade_date": signal.get("trade_date"),
+            "symbol": str(signal.get("symbol", "")).upper(),
+            "signal": str(signal.get("signal", "")).upper(),
+            "market_type": signal.get("market_type") or "Unknown",
+            "entry_price": setup.get("entry_price"),
+            "stop_loss": setup.get("stop_loss"),
+            "profit_target": setup.get("profit_target"),
+        })
+    return pd.DataFrame(rows, columns=SIGNAL_FIELDS)
+
+
+def _label_symbol(group: pd.DataFrame, bars: pd.DataFrame, horizon: int) -> pd.DataFrame | None:
+    """Outcome, exit and realized R for one symbol's signals against its bars."""
+    if bars.empty:
+        return None
+    dates = bars.index.values.astype("datetime64[D]")
+    open_ = bars["Open"].to_numpy(dtype=np.float64)
+    high = bars["High"].to_numpy(dtype=np.float64)
+    low = bars["Low"].to_numpy(dtype=np.float64)
+    close = bars["Close"].to_numpy(dtype=np.float64)
+
+    # The window starts on the trade_date bar (or the next session when it was a holiday)
+    first = np.searchsorted(dates, group["trade_date"].to_numpy(dtype="datetime64[D]"))
+    has_bars = first < len(dates)
+    group, first = group[has_bars], first[has_bars]
+    if group.empty:
+        return None
+
+    steps = first[:, None] + np.arange(horizon)[None, :]
+    inside = steps < len(dates)
+    steps = np.minimum(steps, len(dates) - 1)
+    window_open = open_[steps]
+    window_high = np.where(inside, high[steps], -np.inf)
+    window_low = np.where(inside, low[steps], np.inf)
+
+    direction = np.where(group["signal"].to_numpy() == "BUY", 1.0, -1.0)
+    entry = group["entry_price"].to_numpy(dtype=np.float64)
+    stop = group["stop_loss"].to_numpy(dtype=np.float64)
+    target = group["profit_target"].to_numpy(dtype=np.float64)
+    is_long = direction[:, None] > 0
+    bar = np.arange(horizon)[None, :]
+    never = horizon  # Sentinel bar index for "not hit"
+
+    # The order fills on the first bar that trades through entry_price
+    entry_hit = (window_low <= entry[:, None]) & (window_high >= entry[:, None])
+    fill_bar = np.where(entry_hit.any(axis=1), entry_hit.argmax(axis=1), never)
+    filled = fill_bar < never
+
+    stop_hit = np.where(is_long, window_low <= stop[:, None], window_high >= stop[:, None]) & (bar >= fill_bar[:, None])
+    # The intrabar order is unknown, so the fill bar can stop a trade out but not reach its target
+    target_hit = (np.where(is_long, window_high >= target[:, None], window_low <= target[:, None])
+                  & (bar > fill_bar[:, None]))
+    stop_bar = np.where(stop_hit.any(axis=1), stop_hit.argmax(axis=1), never)
+    target_bar = np.where(target_hit.any(axis=1), target_hit.argmax(axis=1), never)
+    last_bar = inside.sum(axis=1) - 1
+
+    outcome = np.where(stop_bar <= target_bar, 0, 1)  # Ties (same bar) go to the stop
+    outcome = np.where((stop_bar == never) & (target_bar == never), 2, outcome)
+    outcome = np.where(filled, outcome, 3)
+    exit_bar = np.select([outcome == 0, outcome == 1], [stop_bar, target_bar], last_bar)
+
+    # A stop gapped through after the fill bar fills at that bar's open, not at the stop
+    stop_open = np.take_along_axis(window_open, np.minimum(stop_bar, horizon - 1)[:, None], axis=1)[:, 0]
+    gapped = np.where(direction > 0, np.minimum(stop_open, stop), np.maximum(stop_open, stop))
+    stop_fill = np.where(stop_bar > fill_bar, gapped, stop)
+    exit_price = np.select([outcome == 0, outcome == 1, outcome == 2], [stop_fill, target, close[first + last_bar]],
+                           np.nan)
+
+    risk = direction * (entry - stop)
+    return group.assign(
+        outcome=OUTCOMES[outcome],
+        bars_held=np.where(filled, exit_bar - fill_bar + 1, 0),
+        exit_price=exit_price.round(4),
+        realized_r=(direction * (exit_price - entry) / risk).round(4),
+        # False while the horizon is still unfolding
+        complete=((outcome == 0) | (outcome == 1)) | (last_bar == horizon - 1),
+    )
+
+
+def label_signals(signals: list[dict] | pd.DataFrame, horizon: int) -> tuple[pd.DataFrame, dict[str, int]]:
+    """Label every actionable signal with its outcome, bars held and realized R.
+
+    Returns the labeled frame and counts of the rows left out: HOLDs, unparseable trade dates,
+    unusable levels (missing, or stop/target on the wrong side of the entry) and exact duplicates.
+    """
+    frame = signals if isinstance(signals, pd.DataFrame) else signal_frame(signals)
+    skipped = {}
+    actionable = frame["signal"].isin(["BUY", "SELL"])
+    skipped["hold"] = int((~actionable).sum())
+    frame = frame[actionable]
+
+    # LLM-written dates can be anything, only ISO dates are evaluated
+    dates = pd.to_datetime(frame["trade_date"], format="%Y-%m-%d", errors="coerce")
+    skipped["bad_trade_date"] = int(dates.isna().sum())
+    frame = frame[dates.notna()].assign(trade_date=dates[dates.notna()].dt.strftime("%Y-%m-%d"))
+
+    levels = frame[["entry_price", "stop_loss", "profit_target"]].apply(pd.to_numeric, errors="coerce")
+    frame = frame.assign(**levels)
+    direction = np.where(frame["signal"] == "BUY", 1.0, -1.0)
+    usable = ((direction * (frame["entry_price"] - frame["stop_loss"]) > 0)
+              & (direction * (frame["profit_target"] - frame["entry_price"]) > 0))
+    skipped["bad_levels"] = int((~usable).sum())
+    frame = frame[usable]
+
+    # Stores written before rows were upserted can hold the same trade once per rerun
+    unique = ~frame.duplicated(subset=SIGNAL_FIELDS, keep="last")
+    skipped["duplicate"] = int((~unique).sum())
+    frame = frame[unique]
+
+    labeled, skipped["no_bars"] = [], 0
+    for symbol, group in frame.groupby("symbol", sort=False):
+        group = group.sort_values("trade_date", kind="stable")
+        # One bar read per symbol, padded so `horizon` sessions fit after the last signal
+        last_day = (datetime.datetime.strptime(group["trade_date"].iloc[-1], "%Y-%m-%d")
+                    + datetime.timedelta(days=horizon * 2 + 10))
+        bars = load_bars(symbol, group["trade_date"].iloc[0], last_day.strftime("%Y-%m-%d"))
+        result = _label_symbol(group, bars, horizon)
+        if result is not None:
+            labeled.append(result)
+        skipped["no_bars"] += len(group) - (0 if result is None else len(result))
+    if not labeled:
+        empty = pd.DataFrame(columns=SIGNAL_FIELDS + ["outcome", "bars_held", "exit_price", "realized_r", "complete"])
+        return empty, skipped
+    return pd.concat(labeled).sort_index(), skipped
+
+
+def _stats(frame: pd.DataFrame) -> dict:
+    realized = frame["realized_r"].to_numpy(dtype=np.float64)
+    wins, losses = realized[realized > 0], realized[realized <= 0]
+    return {
+        "trades": int(len(realized)),
+        "hit_rate": round(float(len(wins) / len(realized)), 4) if len(realized) else None,
+        "expectancy_r": round(float(realized.mean()), 4) if len(realized) else None,
+        "total_r": round(float(realized.sum()), 4),
+        "avg_win_r": round(float(wins.mean()), 4) if len(wins) else None,
+        "avg_loss_r": round(float(losses.mean()), 4) if len(losses) else None,
+        "outcomes": {name: int(count) for name, count in frame["outcome"].value_counts().items()},
+    }
+
+
+def summarize(labeled: pd.DataFrame) -> dict:
+    """Hit rate, realized expectancy and outcome counts overall, per market_type and per signal.
+
+    Only filled trades whose outcome is final count; filled trades still inside their horizon are
+    summarized separately under "open", marked to the latest close, and orders that never filled
+    over their whole horizon are only counted under "unfilled".
+    """
+    complete = labeled["complete"].astype(bool)
+    filled = labeled["outcome"] != "unfilled"
+    closed = labeled[complete & filled]
+    return {
+        "overall": _stats(closed),
+        "by_market_type": {name: _stats(group) for name, group in closed.groupby("market_type")},
+        "by_signal": {name: _stats(group) for name, group in closed.groupby("signal")},
+        "open": _stats(labeled[~complete & filled]),
+        "unfilled": int((complete & ~filled).sum()),
+    }
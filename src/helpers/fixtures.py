@@ -0,0 +1,174 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+# Record/replay of everything a flow run pulls from the outside world. In
+# record mode every tool call, LLM completion, Finnhub/Tavily response and
+# embedding of a live run is appended to <bundle>/calls.jsonl, and the bar
+# store is pointed at <bundle>/bars so the Parquet files fetched for the run
+# end up in the bundle too. In replay mode the same keys are answered from the
+# bundle, bars are read from a copy of it with Yahoo disabled, and Ollama is a
+# local stub server (see stub_ollama) serving the recorded embeddings and a
+# canned answer for any completion the bundle lacks. Both modes start from empty memory, macro, analysis and signal
+# stores, so a replay sees exactly the prompts the recording saw.
+CALLS_FILE = "calls.jsonl"
+MANIFEST_FILE = "manifest.json"
+
+# Stores that must start empty in both modes, relative to the run's work dir
+_SANDBOX_ENV = {
+    "MEMORY_DB_BASE_DIR": "memory",
+    "MACRO_STORE_DIR": "macro",
+    "ANALYSIS_STORE_PATH": "analyses.sqlite",
+    "SIGNAL_STORE_PATH": "signals.sqlite",
+    "FINAL_REPORT_BASE_DIR": "results",
+    "EMBEDDING_CACHE_PATH": "embeddings.sqlite",
+    "CHECKPOINT_DIR": "checkpoints",
+    "NEWS_INDEX_PATH": "news_index.sqlite",
+}
+
+
+class MissingFixture(KeyError):
+    """Raised in replay mode for a call the bundle has no recording of."""
+
+
+def fixture_key(*parts) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FixtureBundle:
+    """calls.jsonl of (kind, key, value) records plus hit/miss counters per kind."""
+
+    def __init__(self, path: str, mode: str):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown fixture mode {mode!r}")
+        self.path = Path(path)
+        self.mode = mode
+        self.stats: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._calls: dict[tuple[str, str], object] = {}
+        if mode == "replay":
+            with open(self.path / CALLS_FILE) as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._calls[(record["kind"], record["key"])] = record["value"]
+        else:
+            self.path.mkdir(parents=True, exist_ok=True)
+            (self.path / CALLS_FILE).write_text("")
+
+    def _count(self, kind: str, outcome: str) -> None:
+        counts = self.stats.setdefault(kind, {"recorded": 0, "hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def lookup(self, kind: str, key: str) -> tuple[bool, object]:
+        with self._lock:
+            found = (kind, key) in self._calls
+            self._count(kind, "hits" if found else "misses")
+            return found, self._calls.get((kind, key))
+
+    def values(self, kind: str) -> dict[str, object]:
+        return {key: value for (k, key), value in self._calls.items() if k == kind}
+
+    def record(self, kind: str, key: str, value) -> None:
+        line = json.dumps({"kind": kind, "key": key, "value": value}, default=str, ensure_ascii=False)
+        with self._lock:
+            self._calls[(kind, key)] = value
+            self._count(kind, "recorded")
+            with open(self.path / CALLS_FILE, "a") as f:
+                f.write(line + "\n")
+
+
+_active: FixtureBundle | None = None
+
+
+def active() -> FixtureBundle | None:
+    return _active
+
+
+def replaying() -> bool:
+    return _active is not None and _active.mode == "replay"
+
+
+def through_fixtures(kind: str, key_parts: tuple, fn: Callable):
+    """Run fn() normally, recording its JSON-able result, or answer it from the replay bundle."""
+    bundle = _active
+    if bundle is None:
+        return fn()
+    key = fixture_key(kind, *key_parts)
+    if bundle.mode == "replay":
+        found, value = bundle.lookup(kind, key)
+        if not found:
+            raise MissingFixture(f"No recorded {kind} call for {key_parts!r}"[:300])
+        return value
+    value = fn()
+    bundle.record(kind, key, value)
+    return value
+
+
+def load_manifest(bundle_dir: str) -> dict:
+    return json.loads((Path(bundle_dir) / MANIFEST_FILE).read_text())
+
+
+@contextlib.contextmanager
+def _patched_env(values: dict[str, str]):
+    previous = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@contextlib.contextmanager
+def fixture_session(bundle_dir: str, mode: str, work_dir: str | None = None, **manifest):
+    """Record into, or replay from, bundle_dir for the duration of the block.
+
+    Must be entered before the flow modules are imported: the stores read their paths from the
+    environment at import time. Yields the active FixtureBundle.
+    """
+    global _active
+    bundle_dir = Path(bundle_dir)
+    work_dir = Path(work_dir or tempfile.mkdtemp(prefix=f"swing_{mode}_"))
+    env = {name: str(work_dir / relative) for name, relative in _SANDBOX_ENV.items()}
+    env["LLM_CACHE"] = "0"  # A cache hit would hide the call from the recording
+
+    server = None
+    if mode == "record":
+        env["BAR_STORE_DIR"] = str(bundle_dir / "bars")
+    else:
+        from .stub_ollama import StubOllamaServer
+
+        if (bundle_dir / "bars").exists():
+            shutil.copytree(bundle_dir / "bars", work_dir / "bars", dirs_exist_ok=True)
+        env["BAR_STORE_DIR"] = str(work_dir / "bars")
+
+    bundle = FixtureBundle(bundle_dir, mode)
+    if mode == "replay":
+        server = StubOllamaServer(bundle).start()
+        env["OLLAMA_BASE_URL"] = server.url
+        env["OLLAMA_ENDPOINTS"] = ""
+
+    started = time.time()
+    with _patched_env(env):
+        _active = bundle
+        try:
+            yield bundle
+        finally:
+            _active = None
+            if server is not None:
+                server.stop()
+            if mode == "record":
+                (bundle_dir / MANIFEST_FILE).write_text(json.dumps({
+                    **manifest, "recorded_at": started, "seconds": round(time.time() - started, 3),
+                    "calls": bundle.stats}, indent=2, default=str))
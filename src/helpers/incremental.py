@@ -0,0 +1,142 @@
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .api_clients import company_news
+from .as_of import clamp_end_date
+from .bar_store import load_bars
+from .indicators import INDICATOR_WARMUP_DAYS, bars_to_panel, compute_indicators, indicator_arrays
+
+# Incremental daily mode. Every analyzed symbol gets a fingerprint of its
+# inputs (recent bars, Finnhub news IDs, macro digest) stored next to the
+# report. On the next run a symbol whose price moved less than a fraction of
+# its ATR and has no new headlines reuses that report instead of paying for a
+# full AnalysisCrew run. Reuse is measured against the run that actually
+# produced the report, so small daily drifts add up and eventually re-trigger.
+ANALYSIS_STORE_PATH = os.getenv("ANALYSIS_STORE_PATH", "./results/analyses.sqlite")
+BARS_WINDOW = 5  # Trailing bars hashed into the fingerprint
+
+DEFAULT_RULES = {
+    "max_atr_move": 0.5,              # |close - close at analysis| in ATR-14 units
+    "max_new_headlines": 0,           # Finnhub articles not seen by the reused analysis
+    "max_age_days": 5,                # Calendar days before a report is redone regardless
+    "rerun_on_macro_change": False,   # The macro report is regenerated daily, so its digest nearly always differs
+}
+
+
+def digest(text: str) -> str:
+    return hashlib.sha256(str(text).encode("utf-8")).hexdigest()[:16]
+
+
+def fingerprint_symbols(symbols: list[str], start_date: str, end_date: str, macro_context: str) -> dict[str, dict]:
+    """Input fingerprint for every symbol as of end_date: bars, ATR, news IDs and macro digest."""
+    warmup_start = (datetime.datetime.strptime(start_date, "%Y-%m-%d")
+                    - datetime.timedelta(days=INDICATOR_WARMUP_DAYS)).strftime("%Y-%m-%d")
+    frames = {symbol: load_bars(symbol, warmup_start, end_date) for symbol in symbols}
+    _, high, low, close = bars_to_panel(frames)
+    values = indicator_arrays(compute_indicators(symbols, high, low, close))
+    macro_digest = digest(macro_context)
+
+    fingerprints = {}
+    for row, symbol in enumerate(symbols):
+        tail = frames[symbol].tail(BARS_WINDOW)
+        try:
+            # Same query as the news tool, so a prefetched response is read from the memo
+            news_ids = sorted({str(item.get("id")) for item in company_news(symbol, start_date, clamp_end_date(end_date))})
+        except Exception:
+            news_ids = None  # Unknown news means we can not prove nothing changed
+        atr = values["atr_14"][row]
+        fingerprints[symbol] = {
+            "last_bar": str(tail.index[-1].date()) if not tail.empty else None,
+            "bars_digest": digest(tail.round(4).to_json()) if not tail.empty else None,
+            "close": float(values["close"][row]) if np.isfinite(values["close"][row]) else None,
+            "atr_14": float(atr) if np.isfinite(atr) else None,
+            "news_ids": news_ids,
+            "news_digest": digest(",".join(news_ids)) if news_ids is not None else None,
+            "macro_digest": macro_digest,
+        }
+    return fingerprints
+
+
+def dirty_reasons(previous: dict | None, current: dict, trade_date: str, rules: dict | None = None) -> list[str]:
+    """Why the stored analysis can not be reused; an empty list means it can."""
+    rules = {**DEFAULT_RULES, **(rules or {})}
+    if previous is None:
+        return ["no_previous"]
+    before = previous["fingerprint"]
+    if current["close"] is None or before.get("close") is None or not before.get("atr_14"):
+        return ["no_data"]
+
+    reasons = []
+    age = (datetime.date.fromisoformat(trade_date) - datetime.date.fromisoformat(previous["analyzed_on"])).days
+    if age > rules["max_age_days"]:
+        reasons.append("stale")
+    if abs(current["close"] - before["close"]) / before["atr_14"] > rules["max_atr_move"]:
+        reasons.append("price_move")
+    if current["news_ids"] is None or before.get("news_ids") is None:
+        reasons.append("news_unknown")
+    elif len(set(current["news_ids"]) - set(before["news_ids"])) > rules["max_new_headlines"]:
+        reasons.append("new_headlines")
+    if rules["rerun_on_macro_change"] and current["macro_digest"] != before.get("macro_digest"):
+        reasons.append("macro_change")
+    return reasons
+
+
+class AnalysisStore:
+    """Per (symbol, trade_date) analysis reports with the input fingerprint they were made from."""
+
+    def __init__(self, path: str = ANALYSIS_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            " symbol TEXT NOT NULL, trade_date TEXT NOT NULL, analyzed_on TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL, report TEXT NOT NULL, recorded_at REAL NOT NULL,"
+            " PRIMARY KEY (symbol, trade_date))")
+        self._conn.commit()
+
+    def previous(self, symbol: str, trade_date: str) -> dict | None:
+        """Latest analysis strictly before trade_date, so backtests never reuse a later day's report."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT trade_date, analyzed_on, fingerprint, report FROM analyses"
+                " WHERE symbol = ? AND trade_date < ? ORDER BY trade_date DESC LIMIT 1",
+                (symbol.upper(), trade_date)).fetchone()
+        if row is None:
+            return None
+        return {"trade_date": row[0], "analyzed_on": row[1], "fingerprint": json.loads(row[2]), "report": row[3]}
+
+    def record(self, symbol: str, trade_date: str, report: str, fingerprint: dict,
+               analyzed_on: str | None = None) -> None:
+        """Store a report for trade_date; analyzed_on is the date of the crew run it came from."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (symbol, trade_date, analyzed_on, fingerprint, report, recorded_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (symbol.upper(), trade_date, analyzed_on or trade_date, json.dumps(fingerprint), str(report),
+                 time.time()))
+            self._conn.commit()
+
+
+def plan_incremental(store: AnalysisStore, fingerprints: dict[str, dict], trade_date: str,
+                     rules: dict | None = None) -> tuple[dict[str, dict], dict[str, list[str]]]:
+    """Split fingerprinted symbols into reusable previous analyses and dirty symbols with their reasons."""
+    reusable, dirty = {}, {}
+    for symbol, fingerprint in fingerprints.items():
+        previous = store.previous(symbol, trade_date)
+        reasons = dirty_reasons(previous, fingerprint, trade_date, rules)
+        if reasons:
+            dirty[symbol] = reasons
+        else:
+            reusable[symbol] = previous
+    return reusable, dirty
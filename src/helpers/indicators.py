@@ -0,0 +1,248 @@
+import datetime
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import iter_bars, load_bars
+
+# Batch indicator engine over a (symbols x dates) panel. Every indicator is a
+# recurrence over a small per-symbol state (EMAs, Wilder averages, running sums
+# over a 200-bar ring buffer), so a full history and a single new bar go through
+# the same `_step` and appending a bar never recomputes the history.
+RING_SIZE = 200
+# Calendar days of extra history loaded so SMA-200 is defined at start_date
+INDICATOR_WARMUP_DAYS = 300
+# Bars of price history the agent tools return, whatever the window length
+SUMMARY_LAST_N = 20
+
+_ALPHA_12 = 2.0 / 13.0
+_ALPHA_26 = 2.0 / 27.0
+_ALPHA_9 = 2.0 / 10.0
+
+
+@dataclass
+class IndicatorState:
+    """Rolling indicator state for a fixed list of symbols (one row per symbol)."""
+    symbols: list[str]
+    count: np.ndarray = field(default=None)
+    ring: np.ndarray = field(default=None)
+    sum_20: np.ndarray = field(default=None)
+    sumsq_20: np.ndarray = field(default=None)
+    sum_50: np.ndarray = field(default=None)
+    sum_200: np.ndarray = field(default=None)
+    ema_12: np.ndarray = field(default=None)
+    ema_26: np.ndarray = field(default=None)
+    macd_signal: np.ndarray = field(default=None)
+    avg_gain: np.ndarray = field(default=None)
+    avg_loss: np.ndarray = field(default=None)
+    atr: np.ndarray = field(default=None)
+    last_close: np.ndarray = field(default=None)
+
+    def __post_init__(self):
+        n = len(self.symbols)
+        if self.count is None:
+            self.count = np.zeros(n, dtype=np.int64)
+        if self.ring is None:
+            self.ring = np.zeros((n, RING_SIZE), dtype=np.float64)
+        for name in ("sum_20", "sumsq_20", "sum_50", "sum_200", "ema_12", "ema_26", "macd_signal",
+                     "avg_gain", "avg_loss", "atr", "last_close"):
+            if getattr(self, name) is None:
+                setattr(self, name, np.zeros(n, dtype=np.float64))
+
+
+def _leaving(state: IndicatorState, window: int, rows: np.ndarray) -> np.ndarray:
+    """Value dropping out of a `window`-bar sum when the next bar is added."""
+    out = np.zeros(len(state.symbols))
+    full = state.count >= window
+    idx = np.flatnonzero(full)
+    out[idx] = state.ring[rows[idx], (state.count[idx] - window) % RING_SIZE]
+    return out
+
+
+def _step(state: IndicatorState, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> None:
+    """Advance every symbol by one bar; symbols with a NaN close keep their state."""
+    valid = ~np.isnan(close)
+    if not valid.any():
+        return
+    rows = np.arange(len(state.symbols))
+    seen = state.count
+    first = valid & (seen == 0)
+    later = valid & (seen > 0)
+    close0 = np.where(valid, close, 0.0)
+    high0 = np.where(np.isnan(high), close0, high)
+    low0 = np.where(np.isnan(low), close0, low)
+    prev = state.last_close
+
+    # Simple moving averages and Bollinger from running sums over the ring buffer
+    leave_20, leave_50, leave_200 = (_leaving(state, w, rows) for w in (20, 50, 200))
+    state.sum_20 = np.where(valid, state.sum_20 + close0 - leave_20, state.sum_20)
+    state.sumsq_20 = np.where(valid, state.sumsq_20 + close0 ** 2 - leave_20 ** 2, state.sumsq_20)
+    state.sum_50 = np.where(valid, state.sum_50 + close0 - leave_50, state.sum_50)
+    state.sum_200 = np.where(valid, state.sum_200 + close0 - leave_200, state.sum_200)
+    idx = np.flatnonzero(valid)
+    state.ring[idx, seen[idx] % RING_SIZE] = close0[idx]
+
+    # MACD (12/26 EMA, 9 EMA signal), seeded with the first close
+    state.ema_12 = np.where(first, close0, np.where(later, state.ema_12 + _ALPHA_12 * (close0 - state.ema_12), state.ema_12))
+    state.ema_26 = np.where(first, close0, np.where(later, state.ema_26 + _ALPHA_26 * (close0 - state.ema_26), state.ema_26))
+    macd = state.ema_12 - state.ema_26
+    state.macd_signal = np.where(first, macd, np.where(later, state.macd_signal + _ALPHA_9 * (macd - state.macd_signal), state.macd_signal))
+
+    # Wilder smoothing, warmed up with a running mean over the first 14 values
+    delta = np.where(later, close0 - prev, 0.0)
+    rsi_div = np.minimum(np.maximum(seen, 1), 14)
+    state.avg_gain = np.where(later, state.avg_gain + (np.maximum(delta, 0.0) - state.avg_gain) / rsi_div, state.avg_gain)
+    state.avg_loss = np.where(later, state.avg_loss + (np.maximum(-delta, 0.0) - state.avg_loss) / rsi_div, state.avg_loss)
+
+    true_range = np.where(later,
+                          np.maximum(high0 - low0, np.maximum(np.abs(high0 - prev), np.abs(low0 - prev))),
+                          high0 - low0)
+    atr_div = np.minimum(seen + 1, 14)
+    state.atr = np.where(valid, state.atr + (true_range - state.atr) / atr_div, state.atr)
+
+    state.last_close = np.where(valid, close0, state.last_close)
+    state.count = seen + valid
+
+
+def compute_indicators(symbols: list[str], high: np.ndarray, low: np.ndarray, close: np.ndarray) -> IndicatorState:
+    """Run the whole (symbols x dates) panel through the engine; NaN marks a missing bar."""
+    state = IndicatorState(symbols=list(symbols))
+    close = np.asarray(close, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    for t in range(close.shape[1]):
+        _step(state, high[:, t], low[:, t], close[:, t])
+    return state
+
+
+def update_indicators(state: IndicatorState, high, low, close) -> IndicatorState:
+    """Append one bar per symbol (NaN to skip a symbol) without touching the history."""
+    _step(state,
+          np.asarray(high, dtype=np.float64).reshape(-1),
+          np.asarray(low, dtype=np.float64).reshape(-1),
+          np.asarray(close, dtype=np.float64).reshape(-1))
+    return state
+
+
+def indicator_arrays(state: IndicatorState) -> dict[str, np.ndarray]:
+    """Latest indicator values per symbol as arrays, NaN until each window has enough bars."""
+    count = state.count
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = state.avg_gain / state.avg_loss
+        rsi = np.where(state.avg_loss == 0, np.where(state.avg_gain == 0, 50.0, 100.0), 100.0 - 100.0 / (1.0 + rs))
+        boll_mid = state.sum_20 / 20.0
+        # Sample standard deviation, as in pandas rolling().std()
+        boll_std = np.sqrt(np.maximum(state.sumsq_20 / 20.0 - boll_mid ** 2, 0.0) * 20.0 / 19.0)
+    macd = state.ema_12 - state.ema_26
+
+    def ready(values, bars):
+        return np.where(count >= bars, values, np.nan)
+
+    return {
+        "close": ready(state.last_close, 1),
+        "rsi_14": ready(rsi, 15),
+        "macd": ready(macd, 26),
+        "macd_signal": ready(state.macd_signal, 26),
+        "macd_hist": ready(macd - state.macd_signal, 26),
+        "boll_mid": ready(boll_mid, 20),
+        "boll_upper": ready(boll_mid + 2.0 * boll_std, 20),
+        "boll_lower": ready(boll_mid - 2.0 * boll_std, 20),
+        "sma_50": ready(state.sum_50 / 50.0, 50),
+        "sma_200": ready(state.sum_200 / 200.0, 200),
+        "atr_14": ready(state.atr, 14),
+    }
+
+
+def latest_records(state: IndicatorState) -> dict[str, dict[str, float | None]]:
+    """Compact per-symbol records of the latest values (None where not yet defined)."""
+    arrays = indicator_arrays(state)
+    records = {}
+    for i, symbol in enumerate(state.symbols):
+        if state.count[i] == 0:
+            continue
+        records[symbol] = {name: (None if np.isnan(values[i]) else round(float(values[i]), 4))
+                           for name, values in arrays.items()}
+    return records
+
+
+def bars_to_panel(frames: dict[str, pd.DataFrame]) -> tuple[pd.DatetimeIndex, np.ndarray, np.ndarray, np.ndarray]:
+    """Align per-symbol OHLCV frames on the union of their dates into High/Low/Close arrays."""
+    symbols = list(frames)
+    dates = pd.DatetimeIndex(sorted(set().union(*(frame.index for frame in frames.values())))) if frames else pd.DatetimeIndex([])
+    shape = (len(symbols), len(dates))
+    high, low, close = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+    for i, symbol in enumerate(symbols):
+        frame = frames[symbol]
+        if frame.empty:
+            continue
+        pos = dates.get_indexer(frame.index)
+        high[i, pos] = frame["High"].to_numpy(dtype=np.float64)
+        low[i, pos] = frame["Low"].to_numpy(dtype=np.float64)
+        close[i, pos] = frame["Close"].to_numpy(dtype=np.float64)
+    return dates, high, low, close
+
+
+def latest_indicators(symbols: list[str], start_date: str, end_date: str) -> dict[str, dict[str, float | None]]:
+    """Latest indicator record as of end_date for every symbol, read from the bar store."""
+    warmup_start = (datetime.datetime.strptime(start_date, "%Y-%m-%d")
+                    - datetime.timedelta(days=INDICATOR_WARMUP_DAYS)).strftime("%Y-%m-%d")
+    frames = {symbol.upper(): load_bars(symbol, warmup_start, end_date) for symbol in symbols}
+    _, high, low, close = bars_to_panel(frames)
+    return latest_records(compute_indicators(list(frames), high, low, close))
+
+
+def bar_summary(symbol: str, start_date: str, end_date: str, last_n: int = SUMMARY_LAST_N) -> dict | None:
+    """Latest indicators plus the last `last_n` bars and window stats for one symbol, streamed from the store.
+
+    Bars are read in fixed-size chunks and folded into the indicator state as they arrive; only a
+    float32 tail of `last_n` bars is kept, so memory does not grow with the length of the window.
+    """
+    symbol = symbol.upper()
+    warmup_start = (datetime.datetime.strptime(start_date, "%Y-%m-%d")
+                    - datetime.timedelta(days=INDICATOR_WARMUP_DAYS)).strftime("%Y-%m-%d")
+    first_day = np.datetime64(start_date, "D")
+    state = IndicatorState(symbols=[symbol])
+    tail_dates = np.empty(0, dtype="datetime64[D]")
+    tail = np.empty((3, 0), dtype=np.float32)  # High, Low, Close
+    bars, first_close, period_high, period_low = 0, np.nan, -np.inf, np.inf
+
+    for chunk in iter_bars(symbol, warmup_start, end_date):
+        high, low, close = chunk["High"], chunk["Low"], chunk["Close"]
+        for t in range(len(close)):
+            _step(state, high[t:t + 1], low[t:t + 1], close[t:t + 1])
+        # Warm-up bars feed the indicators only, the tail and stats cover [start_date, end_date]
+        in_window = chunk["Date"] >= first_day
+        if not in_window.any():
+            continue
+        if bars == 0:
+            first_close = close[in_window][0]
+        bars += int(in_window.sum())
+        period_high = max(period_high, float(np.nanmax(high[in_window])))
+        period_low = min(period_low, float(np.nanmin(low[in_window])))
+        tail_dates = np.concatenate([tail_dates, chunk["Date"][in_window]])[-last_n:]
+        tail = np.concatenate([tail, np.stack([high[in_window], low[in_window], close[in_window]])
+                              .astype(np.float32)], axis=1)[:, -last_n:]
+
+    if bars == 0:
+        return None
+
+    def prices(values: np.ndarray) -> list[float]:
+        return np.round(values.astype(np.float64), 2).tolist()
+
+    return {
+        "indicators": latest_records(state).get(symbol, {}),
+        "window": {
+            "bars": bars,
+            "first_close": round(float(first_close), 2),
+            "period_high": round(period_high, 2),
+            "period_low": round(period_low, 2),
+            "change_pct": round(float(tail[2, -1] / first_close - 1.0) * 100, 2),
+        },
+        "last_bars": {
+            "dates": np.datetime_as_string(tail_dates, unit="D").tolist(),
+            "highs": prices(tail[0]),
+            "lows": prices(tail[1]),
+            "close_prices": prices(tail[2]),
+        },
+    }
@@ -0,0 +1,142 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .checkpoint import check_cancelled
+from .fixtures import through_fixtures
+
+# Lightweight in-process tracer. Spans record wall time plus free-form counters
+# (tokens_in/out, cache_hit, bytes fetched, output_bytes, ...) and can be
+# annotated from deeper layers through annotate(), which targets the innermost
+# open span of the calling thread. A run ends with a JSON-lines trace, a Chrome trace-event file (open it
+# in chrome://tracing or Perfetto) and a per-stage summary table.
+
+
+class Tracer:
+    """Thread-safe collector of timed spans."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.events: list[dict] = []
+        self.origin = time.perf_counter()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.events = []
+            self.origin = time.perf_counter()
+
+    def _stack(self) -> list[dict]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, category: str, **attrs):
+        attrs = dict(attrs)
+        stack = self._stack()
+        stack.append(attrs)
+        started = time.perf_counter()
+        try:
+            yield attrs
+        except Exception as e:
+            attrs["error"] = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            stack.pop()
+            thread = threading.current_thread()
+            with self._lock:
+                self.events.append({
+                    "name": name,
+                    "category": category,
+                    "start": started - self.origin,
+                    "duration": duration,
+                    "thread": thread.name,
+                    "tid": thread.ident,
+                    "attrs": attrs,
+                })
+
+    def annotate(self, **attrs) -> None:
+        """Add counters to the innermost open span of this thread (numbers are summed)."""
+        stack = self._stack()
+        if not stack:
+            return
+        current = stack[-1]
+        for key, value in attrs.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and key in current:
+                current[key] += value
+            else:
+                current[key] = value
+
+    def summary(self) -> list[dict]:
+        """One row per (category, name) with call counts, wall time and summed counters."""
+        rows: dict[tuple, dict] = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            row = rows.setdefault((event["category"], event["name"]), {
+                "category": event["category"], "name": event["name"], "calls": 0, "total_s": 0.0,
+                "max_s": 0.0, "tokens_in": 0, "tokens_out": 0, "cache_hits": 0, "bytes": 0, "output_bytes": 0,
+                "errors": 0})
+            row["calls"] += 1
+            row["total_s"] += event["duration"]
+            row["max_s"] = max(row["max_s"], event["duration"])
+            attrs = event["attrs"]
+            row["tokens_in"] += int(attrs.get("tokens_in", 0))
+            row["tokens_out"] += int(attrs.get("tokens_out", 0))
+            row["cache_hits"] += int(bool(attrs.get("cache_hit")))
+            row["bytes"] += int(attrs.get("bytes", 0))
+            row["output_bytes"] += int(attrs.get("output_bytes", 0))
+            row["errors"] += int("error" in attrs)
+        for row in rows.values():
+            row["mean_s"] = row["total_s"] / row["calls"]
+        return sorted(rows.values(), key=lambda row: (row["category"], -row["total_s"]))
+
+    def format_summary(self) -> str:
+        header = f"{'category':<10} {'name':<32} {'calls':>6} {'total_s':>9} {'mean_s':>8} {'max_s':>8} " \
+                 f"{'tok_in':>8} {'tok_out':>8} {'hits':>5} {'fetched':>10} {'output':>10}"
+        lines = [header, "-" * len(header)]
+        for row in self.summary():
+            lines.append(f"{row['category']:<10} {row['name'][:32]:<32} {row['calls']:>6} {row['total_s']:>9.2f} "
+                         f"{row['mean_s']:>8.3f} {row['max_s']:>8.2f} {row['tokens_in']:>8} "
+                         f"{row['tokens_out']:>8} {row['cache_hits']:>5} {row['bytes']:>10} {row['output_bytes']:>10}")
+        return "\n".join(lines)
+
+    def write(self, out_dir: str) -> Path:
+        """Write trace.jsonl, trace.chrome.json and summary.txt into out_dir."""
+        path = Path(out_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            events = list(self.events)
+        with open(path / "trace.jsonl", "w") as f:
+            for event in events:
+                f.write(json.dumps(event, default=str) + "\n")
+        pid = os.getpid()
+        chrome = [{"name": event["name"], "cat": event["category"], "ph": "X", "pid": pid, "tid": event["tid"],
+                   "ts": round(event["start"] * 1e6), "dur": round(event["duration"] * 1e6),
+                   "args": event["attrs"]} for event in events]
+        (path / "trace.chrome.json").write_text(json.dumps({"traceEvents": chrome}, default=str))
+        (path / "summary.txt").write_text(self.format_summary() + "\n")
+        return path
+
+
+TRACER = Tracer()
+span = TRACER.span
+annotate = TRACER.annotate
+
+
+def traced_tool(func):
+    """Decorator for tool functions: one span per call with the size of the returned payload."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        check_cancelled()
+        with span(func.__name__, "tool") as attrs:
+            result = through_fixtures("tool", (func.__name__, args, kwargs), lambda: func(*args, **kwargs))
+            attrs["output_bytes"] = len(result if isinstance(result, str) else json.dumps(result, default=str))
+            return result
+    return wrapper
@@ -0,0 +1,108 @@
+import threading
+
+from crewai import LLM
+
+from .checkpoint import check_cancelled
+from .fixtures import active as active_fixtures
+from .instrumentation import span
+from .llm_cache import cache_key, get_llm_cache
+
+
+class CachedLLM(LLM):
+    """LLM that replays completions from the opt-in response cache (LLM_CACHE=1) or a fixture bundle."""
+
+    def call(self, messages, tools=None, *args, **kwargs):
+        check_cancelled()
+        with span("llm.call", "llm", model=self.model) as attrs:
+            response_model = kwargs.get("response_model")
+            key = cache_key(self.model, messages,
+                            temperature=self.temperature,
+                            stop=getattr(self, "stop", None),
+                            tools=tools,
+                            response_model=getattr(response_model, "__name__", response_model))
+
+            bundle = active_fixtures()
+            if bundle is not None and bundle.mode == "replay":
+                found, recorded = bundle.lookup("llm", key)
+                attrs["fixture_hit"] = found
+                if found:
+                    return recorded
+                # Unrecorded step, let it reach the stub Ollama server
+
+            cache = get_llm_cache()
+            if cache is not None:
+                cached = cache.get(key)
+                attrs["cache_hit"] = cached is not None
+                if cached is not None:
+                    return cached
+
+            result = self._complete(attrs, messages, tools, *args, **kwargs)
+
+            # Only plain completions are replayable, structured objects are left uncached
+            if isinstance(result, str) and result:
+                if cache is not None:
+                    cache.put(key, result, model=self.model)
+                if bundle is not None and bundle.mode == "record":
+                    bundle.record("llm", key, result)
+            return result
+
+    def _complete(self, attrs: dict, messages, tools, *args, **kwargs):
+        return self._complete_on(self, attrs, messages, tools, *args, **kwargs)
+
+    @staticmethod
+    def _complete_on(client: "CachedLLM", attrs: dict, messages, tools, *args, **kwargs):
+        """The uncached completion on `client`, with its token usage recorded on the span."""
+        usage_before = dict(getattr(client, "_token_usage", None) or {})
+        result = super(CachedLLM, client).call(messages, tools, *args, **kwargs)
+        _record_tokens(attrs, messages, result, usage_before, getattr(client, "_token_usage", None))
+        return result
+
+
+class RoutedLLM(CachedLLM):
+    """CachedLLM whose completions are spread over several Ollama-compatible endpoints.
+
+    Caching, fixtures and tracing happen once here; each endpoint gets its own client replica
+    per set of stop words, so concurrent calls never mutate a client another thread is using.
+    """
+
+    def __init__(self, *args, endpoints: list[str], **kwargs):
+        from .llm_pool import EndpointPool
+
+        pool = EndpointPool(endpoints)
+        super().__init__(*args, base_url=pool.urls[0], **kwargs)
+        self.pool = pool
+        self._replica_args = (args, kwargs)
+        self._replicas: dict[tuple, CachedLLM] = {}
+        self._replicas_lock = threading.Lock()
+
+    def _replica(self, url: str, stop) -> "CachedLLM":
+        key = (url, tuple(stop) if stop else None)
+        with self._replicas_lock:
+            replica = self._replicas.get(key)
+            if replica is None:
+                args, kwargs = self._replica_args
+                replica = CachedLLM(*args, base_url=url, **kwargs)
+                replica.stop = list(stop) if stop else stop  # Set before any other thread can see it
+                self._replicas[key] = replica
+            return replica
+
+    def _complete(self, attrs: dict, messages, tools, *args, **kwargs):
+        # crewai sets stop words on the agent's LLM, the replicas have to follow
+        stop = getattr(self, "stop", None)
+
+        def on_endpoint(url: str):
+            replica = self._replica(url, stop)
+            attrs["endpoint"] = url
+            return self._complete_on(replica, attrs, messages, tools, *args, **kwargs)
+
+        return self.pool.run(on_endpoint)
+
+
+def _record_tokens(attrs: dict, messages, result, before: dict, after: dict | None) -> None:
+    """Token counts from the client's usage counters, or a chars/4 estimate when it has none."""
+    if after and after.get("prompt_tokens", 0) > before.get("prompt_tokens", 0):
+        attrs["tokens_in"] = after["prompt_tokens"] - before.get("prompt_tokens", 0)
+        attrs["tokens_out"] = after.get("completion_tokens", 0) - before.get("completion_tokens", 0)
+    else:
+        attrs["tokens_in"] = len(str(messages)) // 4
+        attrs["tokens_out"] = len(str(result)) // 4
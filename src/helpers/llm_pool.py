@@ -0,0 +1,93 @@
+import itertools
+import os
+import threading
+import time
+from typing import Callable
+
+import requests
+
+# Least-loaded dispatch over several Ollama-compatible servers. Each request
+# goes to the healthy endpoint with the fewest requests in flight (ties go to
+# the one that has served the fewest so far). A connection failure takes the
+# endpoint out for HEALTH_COOLDOWN_SECONDS and the request moves on to the next
+# one; after the cooldown a /api/tags probe decides whether it comes back.
+# Probes run outside the pool lock, a slow one never stalls dispatch to the
+# other endpoints, and whoever claims an expired cooldown probes it alone.
+HEALTH_COOLDOWN_SECONDS = float(os.getenv("LLM_HEALTH_COOLDOWN_SECONDS", 30))
+HEALTH_TIMEOUT_SECONDS = 2.0
+_CONNECTION_ERRORS = {"APIConnectionError", "ServiceUnavailableError", "InternalServerError", "Timeout",
+                      "ConnectionError", "ConnectTimeout", "ReadTimeout", "ConnectionRefusedError"}
+
+
+def is_connection_error(error: Exception) -> bool:
+    """Errors that say the server is unreachable or overloaded, as opposed to a bad request."""
+    return any(type(e).__name__ in _CONNECTION_ERRORS for e in (error, error.__cause__, error.__context__) if e)
+
+
+def probe(url: str) -> bool:
+    try:
+        return requests.get(f"{url.rstrip('/')}/api/tags", timeout=HEALTH_TIMEOUT_SECONDS).ok
+    except requests.RequestException:
+        return False
+
+
+class EndpointPool:
+    """In-flight counters and health state for a fixed list of endpoint URLs."""
+
+    def __init__(self, urls: list[str]):
+        if not urls:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.urls = list(dict.fromkeys(url.rstrip("/") for url in urls))
+        self._lock = threading.Lock()
+        self._in_flight = dict.fromkeys(self.urls, 0)
+        self._served = dict.fromkeys(self.urls, 0)
+        self._down_until = dict.fromkeys(self.urls, 0.0)
+        self._order = itertools.count()
+
+    def _pick(self, exclude: set[str]) -> str:
+        with self._lock:
+            now = time.monotonic()
+            due = [url for url in self.urls if url not in exclude and 0.0 < self._down_until[url] <= now]
+            for url in due:
+                # Claim the probe by extending the cooldown, it is lifted below if the endpoint is back
+                self._down_until[url] = now + HEALTH_COOLDOWN_SECONDS
+        revived = [url for url in due if probe(url)]
+
+        with self._lock:
+            for url in revived:
+                self._down_until[url] = 0.0
+            candidates = [url for url in self.urls if url not in exclude and self._down_until[url] == 0.0]
+            if not candidates:
+                # Everything looks down, try whichever comes back first rather than failing outright
+                candidates = sorted((url for url in self.urls if url not in exclude),
+                                    key=lambda url: self._down_until[url])[:1] or self.urls[:1]
+            url = min(candidates, key=lambda url: (self._in_flight[url], self._served[url]))
+            self._in_flight[url] += 1
+            self._served[url] += 1
+            return url
+
+    def mark_down(self, url: str) -> None:
+        with self._lock:
+            self._down_until[url] = time.monotonic() + HEALTH_COOLDOWN_SECONDS
+
+    def run(self, fn: Callable[[str], object]):
+        """fn(url) on the least-loaded healthy endpoint, failing over on connection errors."""
+        tried: set[str] = set()
+        while True:
+            url = self._pick(tried)
+            try:
+                return fn(url)
+            except Exception as e:
+                tried.add(url)
+                if not is_connection_error(e) or len(tried) >= len(self.urls):
+                    raise
+                self.mark_down(url)
+            finally:
+                with self._lock:
+                    self._in_flight[url] -= 1
+
+    def stats(self) -> list[dict]:
+        with self._lock:
+            now = time.monotonic()
+            return [{"url": url, "in_flight": self._in_flight[url], "served": self._served[url],
+                     "healthy": self._down_until[url] <= now} for url in self.urls]
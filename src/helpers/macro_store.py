@@ -0,0 +1,60 @@
+import fcntl
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable
+
+# Macro context shared across watchlists, runs and processes. Each
+# (trade_date, start_date, end_date, model) key is a JSON file guarded by an
+# flock'ed sidecar lock: the first caller computes while concurrent callers
+# block on the lock and then read the finished file (single-flight).
+MACRO_STORE_DIR = os.getenv("MACRO_STORE_DIR", "./cache/macro")
+
+
+def macro_key(trade_date: str, start_date: str, end_date: str, model: str) -> str:
+    raw = json.dumps([trade_date, start_date, end_date, model])
+    return f"{trade_date}_{hashlib.sha256(raw.encode()).hexdigest()[:16]}"
+
+
+def _read(path: Path) -> str | None:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())["macro_context"]
+
+
+def get_or_compute(trade_date: str, start_date: str, end_date: str, model: str,
+                   compute: Callable[[], str]) -> str:
+    """Return the stored macro context for this key, running compute() exactly once across processes."""
+    base = Path(MACRO_STORE_DIR)
+    base.mkdir(parents=True, exist_ok=True)
+    key = macro_key(trade_date, start_date, end_date, model)
+    path = base / f"{key}.json"
+
+    cached = _read(path)
+    if cached is not None:
+        return cached
+
+    with open(base / f"{key}.lock", "a+") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            # Another process may have finished while we waited for the lock
+            cached = _read(path)
+            if cached is not None:
+                return cached
+
+            macro_context = compute()
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps({
+                "trade_date": trade_date,
+                "start_date": start_date,
+                "end_date": end_date,
+                "model": model,
+                "created_at": time.time(),
+                "macro_context": macro_context,
+            }))
+            os.replace(tmp_path, path)
+            return macro_context
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Local index of every news article and search hit the tools have fetched,
+# shared across symbols, runs and days. Articles are keyed by provider id or
+# normalized URL and store their compact summary and a 64-bit SimHash over the
+# words of headline + summary, both computed once per article, and a whole
+# tool response is looked up and indexed in one transaction. Each response
+# collapses its own near-duplicates (syndicated copies land around 2-7 bits
+# apart, unrelated stories above 18) with collapse(), so the output depends
+# only on what that call fetched, never on which symbol or day happened to
+# fetch an article first.
+SIMHASH_BITS = 64
+MAX_DISTANCE = int(os.getenv("NEWS_SIMHASH_DISTANCE", 7))
+SUMMARY_CHARS = int(os.getenv("NEWS_SUMMARY_CHARS", 400))
+_WORD = re.compile(r"[a-z0-9]+")
+_TRACKING = re.compile(r"[?#].*$")
+
+
+def article_key(item_id=None, url: str | None = None, headline: str = "") -> str:
+    """Provider id when there is one, else the URL without scheme, query or fragment."""
+    if item_id not in (None, ""):
+        return f"id:{item_id}"
+    if url:
+        return "url:" + _TRACKING.sub("", re.sub(r"^https?://(www\.)?", "", url.strip().lower())).rstrip("/")
+    return "text:" + hashlib.sha256(headline.strip().lower().encode()).hexdigest()[:24]
+
+
+def compact_summary(text: str, limit: int = SUMMARY_CHARS) -> str:
+    """Whitespace-collapsed text cut at the last sentence end that fits in `limit` chars."""
+    text = re.sub(r"\s+", " ", text or "").strip()
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    return cut[:end + 1] if end > limit // 2 else cut.rsplit(" ", 1)[0] + " ..."
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash with one feature per word (repeats add weight)."""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return 0
+    hashes = np.array([int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+                       for word in words], dtype=np.uint64)
+    bits = (hashes[:, None] >> np.arange(SIMHASH_BITS, dtype=np.uint64)) & np.uint64(1)
+    votes = (bits.astype(np.int64) * 2 - 1).sum(axis=0)
+    return int(sum(1 << i for i in np.flatnonzero(votes > 0)))
+
+
+def _signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def collapse(records: list[dict]) -> list[tuple[dict, int]]:
+    """Keep the first of each group of same-key or near-duplicate records, in order, with its copy count."""
+    kept: list[list] = []
+    for record in records:
+        for group in kept:
+            first = group[0]
+            if first["key"] == record["key"] or \
+                    bin(first["simhash"] ^ record["simhash"]).count("1") <= MAX_DISTANCE:
+                group[1] += 1
+                break
+        else:
+            kept.append([record, 0])
+    return [(record, copies) for record, copies in kept]
+
+
+class NewsIndex:
+    """SQLite store of seen articles with their compact summary and SimHash."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT UNIQUE NOT NULL,"
+            " headline TEXT, summary TEXT, url TEXT, published TEXT, simhash INTEGER NOT NULL,"
+            " created_at REAL NOT NULL)")
+        self._conn.commit()
+
+    def lookup_many(self, articles: list[dict]) -> list[dict]:
+        """The stored record for each article (item_id, url, headline, summary, published), in order.
+
+        Unseen articles are indexed, all in one transaction. Each record has "key", "headline",
+        the compact "summary" and its "simhash".
+        """
+        keys = [article_key(article.get("item_id"), article.get("url"), article.get("headline", ""))
+                for article in articles]
+        with self._lock:
+            stored = {}
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), 500):  # Stay under SQLite's bound-parameter limit
+                chunk = unique[i:i + 500]
+                stored.update((row[0], {"key": row[0], "headline": row[1], "summary": row[2],
+                                        "simhash": row[3] & ((1 << 64) - 1)})
+                              for row in self._conn.execute(
+                                  "SELECT key, headline, summary, simhash FROM articles"
+                                  f" WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+            self.hits += sum(key in stored for key in keys)
+
+            new_rows = []
+            for key, article in zip(keys, articles):
+                if key in stored:
+                    continue
+                headline = article.get("headline", "")
+                fingerprint = simhash(f"{headline} {article.get('summary', '')}")
+                compact = compact_summary(article.get("summary", ""))
+                stored[key] = {"key": key, "headline": headline, "summary": compact, "simhash": fingerprint}
+                new_rows.append((key, headline, compact, article.get("url"), article.get("published"),
+                                 _signed(fingerprint), time.time()))
+            if new_rows:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO articles (key, headline, summary, url, published, simhash, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)", new_rows)
+                self._conn.commit()
+            self.misses += len(new_rows)
+        return [dict(stored[key]) for key in keys]
+
+    def lookup(self, item_id=None, url: str | None = None, headline: str = "", summary: str = "",
+               published: str | None = None) -> dict:
+        """lookup_many() for a single article."""
+        return self.lookup_many([{"item_id": item_id, "url": url, "headline": headline, "summary": summary,
+                                  "published": published}])[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            articles = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "articles": articles}
+
+
+_index: NewsIndex | None = None
+_index_guard = threading.Lock()
+
+
+def get_news_index() -> NewsIndex | None:
+    """Process-wide news index, or None unless NEWS_DEDUP=1 opted in."""
+    global _index
+    if os.getenv("NEWS_DEDUP", "0") != "1":
+        return None
+    with _index_guard:
+        if _index is None:
+            _index = NewsIndex(path=os.getenv("NEWS_INDEX_PATH", "./cache/news_index.sqlite"))
+        return _index
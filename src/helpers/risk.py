@@ -0,0 +1,116 @@
+import datetime
+
+import numpy as np
+
+from .bar_store import load_bars
+from .indicators import bars_to_panel
+from .trade_signals import PortfolioResponse, PositionSizing
+
+# Deterministic sizing and portfolio risk for the StrategyCrew's signals. The
+# LLM picks direction, levels and a win probability; everything numeric after
+# that (1R, R-multiple, expectancy, shares, total risk) is computed here for
+# all signals at once. Trades are then admitted in expectancy order under a
+# total-risk cap and a per-bucket cap, where buckets are groups of symbols
+# whose daily returns are correlated above a threshold.
+DEFAULT_LIMITS = {
+    "max_total_risk": 0.06,           # Sum of open 1R risk as a fraction of equity
+    "max_bucket_risk": 0.03,          # Same, per correlation bucket
+    "correlation_threshold": 0.7,     # Pairs above this share a bucket
+    "correlation_lookback_days": 120,
+    "max_position_pct": 0.25,         # Notional cap per position
+    "min_expectancy": 0.0,            # E below this is turned into a HOLD
+}
+_DIRECTION = {"BUY": 1.0, "SELL": -1.0}
+
+
+def correlation_buckets(symbols: list[str], end_date: str, lookback_days: int, threshold: float) -> np.ndarray:
+    """Bucket id per symbol: connected components of the |corr| >= threshold graph of daily log returns."""
+    n = len(symbols)
+    if n < 2:
+        return np.arange(n)
+    start = (datetime.datetime.strptime(end_date, "%Y-%m-%d")
+             - datetime.timedelta(days=lookback_days)).strftime("%Y-%m-%d")
+    _, _, _, close = bars_to_panel({symbol: load_bars(symbol, start, end_date) for symbol in symbols})
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(close), axis=1)
+    returns = returns[:, np.isfinite(returns).all(axis=0)]
+    if returns.shape[1] < 20:
+        return np.arange(n)  # Not enough shared history to call anything correlated
+    with np.errstate(divide="ignore", invalid="ignore"):
+        linked = np.abs(np.nan_to_num(np.corrcoef(returns))) >= threshold
+
+    buckets = np.arange(n)
+    # Label propagation: every symbol takes the smallest id among its neighbours until stable
+    while True:
+        merged = np.where(linked, buckets[None, :], n).min(axis=1)
+        if np.array_equal(merged, buckets):
+            return buckets
+        buckets = merged
+
+
+def size_portfolio(portfolio: PortfolioResponse, equity: float, risk: float, end_date: str,
+                   limits: dict | None = None) -> PortfolioResponse:
+    """Recompute every numeric field of the portfolio and enforce the risk caps.
+
+    Signals with unusable levels or too low an expectancy become HOLD with zero shares.
+    """
+    limits = {**DEFAULT_LIMITS, **(limits or {})}
+    trades = [trade.model_copy(deep=True) for trade in portfolio.trades]
+    if not trades:
+        return PortfolioResponse(trades=[], total_portfolio_risk_percent=0.0)
+
+    def column(values) -> np.ndarray:
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+    direction = np.array([_DIRECTION.get(trade.signal.upper(), 0.0) for trade in trades])
+    entry = column(trade.trade_setup.entry_price for trade in trades)
+    stop = column(trade.trade_setup.stop_loss for trade in trades)
+    target = column(trade.trade_setup.profit_target for trade in trades)
+    win_probability = np.clip(column(trade.expectancy_scorecard.win_probability for trade in trades), 0.0, 1.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        risk_per_share = direction * (entry - stop)           # 1R, positive when the stop is on the right side
+        r_ratio = direction * (target - entry) / risk_per_share
+        expectancy = win_probability * r_ratio - (1.0 - win_probability)
+        shares = np.floor(np.minimum(equity * risk / risk_per_share,
+                                     limits["max_position_pct"] * equity / entry))
+    valid = ((direction != 0) & (risk_per_share > 0) & (r_ratio > 0) & (entry > 0)
+             & np.isfinite(expectancy) & (expectancy >= limits["min_expectancy"]) & (shares >= 1))
+    shares = np.where(valid, shares, 0.0)
+    position_risk = np.where(valid, shares * np.nan_to_num(risk_per_share) / equity, 0.0)
+
+    # Admit trades best expectancy first under the total and per-bucket caps
+    buckets = np.zeros(len(trades), dtype=np.int64)
+    active = np.flatnonzero(valid)
+    if len(active) > 1:
+        buckets[active] = correlation_buckets([trades[i].symbol.upper() for i in active], end_date,
+                                              limits["correlation_lookback_days"],
+                                              limits["correlation_threshold"])
+    total, per_bucket = 0.0, {}
+    for i in active[np.argsort(-expectancy[active], kind="stable")]:
+        room = min(limits["max_total_risk"] - total,
+                   limits["max_bucket_risk"] - per_bucket.get(buckets[i], 0.0))
+        if position_risk[i] > room:
+            # Shrink to what is left rather than dropping the trade outright
+            shares[i] = np.floor(max(room, 0.0) * equity / risk_per_share[i])
+            position_risk[i] = shares[i] * risk_per_share[i] / equity
+        if shares[i] < 1:
+            valid[i], shares[i], position_risk[i] = False, 0.0, 0.0
+            continue
+        total += position_risk[i]
+        per_bucket[buckets[i]] = per_bucket.get(buckets[i], 0.0) + position_risk[i]
+
+    for i, trade in enumerate(trades):
+        if direction[i] != 0 and not valid[i]:
+            trade.signal = "HOLD"
+        setup, scorecard = trade.trade_setup, trade.expectancy_scorecard
+        if np.isfinite(r_ratio[i]) and r_ratio[i] > 0:
+            setup.r_multiple_target = round(float(r_ratio[i]), 2)
+            scorecard.r_ratio = round(float(r_ratio[i]), 2)
+            scorecard.expectancy_value = round(float(expectancy[i]), 3)
+        trade.position_sizing = PositionSizing(shares=int(shares[i]), risk_per_trade=round(float(position_risk[i]), 5),
+                                               total_account_value=float(equity))
+
+    order = np.lexsort((-np.nan_to_num(expectancy, nan=-np.inf), ~valid))
+    return PortfolioResponse(trades=[trades[i] for i in order],
+                             total_portfolio_risk_percent=round(float(position_risk.sum()) * 100, 3))
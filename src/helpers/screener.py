@@ -0,0 +1,108 @@
+import datetime
+
+import numpy as np
+
+from .bar_store import load_bars
+from .indicators import INDICATOR_WARMUP_DAYS, bars_to_panel, compute_indicators, indicator_arrays
+
+# Deterministic pre-LLM screen. Every rule is a vectorized mask over the
+# (symbols x dates) panel from the bar store, so scoring a few hundred symbols
+# costs milliseconds once their bars are cached, and only the top-N survivors
+# are sent through the AnalysisCrew.
+DEFAULT_RULES = {
+    "top_n": 20,
+    "regime_symbol": "SPY",           # Bear regime when it closes below its SMA-200
+    "require_above_sma_200": False,   # Trend filter in every regime, not only in a bear one
+    "rsi_min": 30.0,
+    "rsi_max": 75.0,
+    "atr_stop_multiple": 2.0,         # Stop distance used for the R-multiple feasibility check
+    "min_atr_pct": 0.01,              # Too quiet to reach a 2R target in a swing horizon
+    "max_atr_pct": 0.10,
+    "max_position_pct": 0.5,          # 1R sizing must not need more than this share of equity
+    "liquidity_days": 20,
+    "min_avg_dollar_volume": 5_000_000.0,
+}
+
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    finite = np.isfinite(values)
+    if finite.sum() < 2:
+        return np.where(finite, 0.0, np.nan)
+    std = values[finite].std()
+    return (values - values[finite].mean()) / std if std > 0 else np.where(finite, 0.0, np.nan)
+
+
+def _avg_dollar_volume(frames: dict, days: int) -> np.ndarray:
+    return np.array([
+        float((frame["Close"] * frame["Volume"]).tail(days).mean()) if not frame.empty else np.nan
+        for frame in frames.values()
+    ])
+
+
+def screen_universe(symbols: list[str], start_date: str, end_date: str, equity: float, risk: float,
+                    rules: dict | None = None) -> list[dict]:
+    """Score every symbol as of end_date and return all of them ranked, survivors first.
+
+    Each record has the symbol, its score, whether it passed and the rules it failed.
+    """
+    rules = {**DEFAULT_RULES, **(rules or {})}
+    warmup_start = (datetime.datetime.strptime(start_date, "%Y-%m-%d")
+                    - datetime.timedelta(days=INDICATOR_WARMUP_DAYS)).strftime("%Y-%m-%d")
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    regime_symbol = rules["regime_symbol"]
+    frames = {symbol: load_bars(symbol, warmup_start, end_date)
+              for symbol in dict.fromkeys(symbols + ([regime_symbol] if regime_symbol else []))}
+
+    _, high, low, close = bars_to_panel(frames)
+    values = indicator_arrays(compute_indicators(list(frames), high, low, close))
+    keys = list(frames)
+    rows = np.array([keys.index(symbol) for symbol in symbols], dtype=np.int64)
+
+    bear = False
+    if regime_symbol:
+        regime_row = keys.index(regime_symbol)
+        bear = bool(values["close"][regime_row] < values["sma_200"][regime_row])
+
+    last_close = values["close"][rows]
+    sma_50, sma_200 = values["sma_50"][rows], values["sma_200"][rows]
+    rsi, atr, macd_hist = values["rsi_14"][rows], values["atr_14"][rows], values["macd_hist"][rows]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        atr_pct = atr / last_close
+        shares = np.floor(equity * risk / (atr * rules["atr_stop_multiple"]))
+        position_value = shares * last_close
+    dollar_volume = _avg_dollar_volume({symbol: frames[symbol] for symbol in symbols}, rules["liquidity_days"])
+
+    # NaN compares as False, so a symbol without enough history fails the rules that need it
+    checks = {
+        "no_data": np.isfinite(last_close) & np.isfinite(atr),
+        "trend": (last_close > sma_200) if (bear or rules["require_above_sma_200"]) else np.ones(len(rows), bool),
+        "rsi_band": (rsi >= rules["rsi_min"]) & (rsi <= rules["rsi_max"]),
+        "atr_range": (atr_pct >= rules["min_atr_pct"]) & (atr_pct <= rules["max_atr_pct"]),
+        "r_feasibility": (shares >= 1) & (position_value <= rules["max_position_pct"] * equity),
+        "liquidity": dollar_volume >= rules["min_avg_dollar_volume"],
+    }
+    passed = np.logical_and.reduce(list(checks.values()))
+
+    # Trend strength and momentum, with a penalty for RSI far from a healthy 55
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = (np.nan_to_num(_zscore(last_close / sma_200 - 1.0))
+                 + np.nan_to_num(_zscore(last_close / sma_50 - 1.0))
+                 + np.nan_to_num(_zscore(macd_hist / atr))
+                 - np.nan_to_num(np.abs(rsi - 55.0) / 15.0, nan=3.0))
+
+    order = np.lexsort((-score, ~passed))
+    return [{
+        "symbol": symbols[i],
+        "score": round(float(score[i]), 4),
+        "passed": bool(passed[i]),
+        "failed": [name for name, mask in checks.items() if not mask[i]],
+        "regime": "bear" if bear else "bull",
+    } for i in order]
+
+
+def shortlist(symbols: list[str], start_date: str, end_date: str, equity: float, risk: float,
+              rules: dict | None = None) -> tuple[list[str], list[dict]]:
+    """Top-N passing symbols (in score order) plus the full ranked screen."""
+    top_n = {**DEFAULT_RULES, **(rules or {})}["top_n"]
+    ranked = screen_universe(symbols, start_date, end_date, equity, risk, rules)
+    return [record["symbol"] for record in ranked if record["passed"]][:top_n], ranked
@@ -0,0 +1,103 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .trade_signals import TradeSignal
+
+# SQLite table of every validated TradeSignal, indexed on (trade_date,
+# symbol, signal) so months of history can be filtered without re-parsing
+# report files. Each write is a batch (one run's portfolio) that replaces
+# everything the same source stored for its trade dates, so reruns never
+# stack duplicates or keep symbols the rerun dropped, and several legs per
+# symbol survive. The full signal is kept as JSON in `payload`.
+SIGNAL_STORE_PATH = os.getenv("SIGNAL_STORE_PATH", "./results/signals.sqlite")
+
+_COLUMNS = ["trade_date", "symbol", "signal", "market_type", "entry_price", "stop_loss", "profit_target",
+            "r_multiple_target", "win_probability", "r_ratio", "expectancy_value", "shares", "source",
+            "payload", "recorded_at"]
+
+
+class SignalStore:
+    """Store of TradeSignals, replaced per (trade_date, source) batch, with simple filtered queries."""
+
+    def __init__(self, path: str = SIGNAL_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signals ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " trade_date TEXT NOT NULL, symbol TEXT NOT NULL, signal TEXT NOT NULL, market_type TEXT,"
+            " entry_price REAL, stop_loss REAL, profit_target REAL, r_multiple_target REAL,"
+            " win_probability REAL, r_ratio REAL, expectancy_value REAL, shares INTEGER,"
+            " source TEXT, payload TEXT NOT NULL, recorded_at REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS signals_date_symbol_signal ON signals (trade_date, symbol, signal)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS signals_signal_expectancy ON signals (signal, expectancy_value)")
+        self._conn.commit()
+
+    def append(self, signals: list[TradeSignal], source: str = "strategy",
+               trade_dates: list[str] | None = None) -> int:
+        """Write one batch of validated signals in one transaction; returns how many were written.
+
+        Earlier rows of `source` for the batch's trade dates (the signals' own dates, plus
+        `trade_dates` so an empty portfolio can clear a date) are deleted first.
+        """
+        now = time.time()
+        rows = [(
+            s.trade_date, s.symbol.upper(), s.signal.upper(), s.market_type,
+            s.trade_setup.entry_price, s.trade_setup.stop_loss, s.trade_setup.profit_target,
+            s.trade_setup.r_multiple_target, s.expectancy_scorecard.win_probability,
+            s.expectancy_scorecard.r_ratio, s.expectancy_scorecard.expectancy_value,
+            s.position_sizing.shares, source, s.model_dump_json(), now,
+        ) for s in signals]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("DELETE FROM signals WHERE trade_date = ? AND source = ?",
+                                       [(date, source) for date in dict.fromkeys([*(trade_dates or []),
+                                                                                  *(row[0] for row in rows)])])
+                self._conn.executemany(
+                    f"INSERT INTO signals ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})", rows)
+        return len(rows)
+
+    def query(self, signal: str | None = None, min_expectancy: float | None = None,
+              start_date: str | None = None, end_date: str | None = None,
+              symbols: list[str] | None = None) -> list[dict]:
+        """Rows matching every given filter, e.g. query(signal="BUY", min_expectancy=0.3)."""
+        clauses, params = [], []
+        if start_date:
+            clauses.append("trade_date >= ?")
+            params.append(start_date)
+        if end_date:
+            clauses.append("trade_date <= ?")
+            params.append(end_date)
+        if symbols:
+            clauses.append(f"symbol IN ({', '.join('?' * len(symbols))})")
+            params.extend(symbol.upper() for symbol in symbols)
+        if signal:
+            clauses.append("signal = ?")
+            params.append(signal.upper())
+        if min_expectancy is not None:
+            clauses.append("expectancy_value > ?")
+            params.append(min_expectancy)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM signals{where} ORDER BY trade_date, symbol, id", params)
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def to_frame(self, **filters):
+        """Same as query() but as a DataFrame, without the raw JSON payload column."""
+        import pandas as pd
+
+        frame = pd.DataFrame.from_records(self.query(**filters), columns=_COLUMNS)
+        return frame.drop(columns=["payload"])
+
+    def signals(self, **filters) -> list[TradeSignal]:
+        """Same as query() but rebuilt into TradeSignal models."""
+        return [TradeSignal.model_validate(json.loads(row["payload"])) for row in self.query(**filters)]
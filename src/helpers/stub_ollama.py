@@ -0,0 +1,109 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Minimal Ollama look-alike for offline replays. Embeddings come from the
+# fixture bundle when recorded, otherwise from a deterministic hash-seeded
+# vector; chat/generate calls that were not already answered from the bundle
+# by CachedLLM get a canned, parseable final answer. Misses are counted on the
+# bundle so a replay report shows how faithful it was.
+EMBEDDING_DIMENSIONS = 768  # nomic-embed-text
+CANNED_PORTFOLIO = json.dumps({"trades": [], "total_portfolio_risk_percent": 0.0})
+
+
+def hashed_vector(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> list[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions)
+    return (vector / np.linalg.norm(vector)).round(6).tolist()
+
+
+def canned_completion(prompt: str) -> str:
+    answer = CANNED_PORTFOLIO if "total_portfolio_risk_percent" in prompt else "No recorded completion (offline stub)."
+    return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+
+class StubOllamaServer:
+    """Threaded HTTP server on 127.0.0.1 answering /api/embed, /api/embeddings, /api/chat and /api/generate."""
+
+    def __init__(self, bundle=None, host: str = "127.0.0.1", port: int = 0):
+        self.bundle = bundle
+        recorded = bundle.values("embed") if bundle is not None else {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, payload: dict, status: int = 200) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _embed(self, model: str, text: str) -> list[float]:
+                # Imported here, embeddings reads OLLAMA_BASE_URL and its cache path once the session set them
+                from .embeddings import text_key
+
+                vector = recorded.get(text_key(model, text))
+                server._count("stub.embed", "hits" if vector is not None else "misses")
+                return vector if vector is not None else hashed_vector(text)
+
+            def do_GET(self):
+                if self.path.startswith("/api/tags"):
+                    return self._reply({"models": []})
+                self._reply({"status": "ok"})
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                model = request.get("model", "")
+                now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                if self.path.startswith("/api/embeddings"):
+                    return self._reply({"embedding": self._embed(model, request.get("prompt", ""))})
+                if self.path.startswith("/api/embed"):
+                    texts = request.get("input", [])
+                    texts = [texts] if isinstance(texts, str) else texts
+                    return self._reply({"model": model, "embeddings": [self._embed(model, t) for t in texts]})
+                if self.path.startswith("/api/chat"):
+                    prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+                    server._count("stub.llm", "misses")
+                    return self._reply({"model": model, "created_at": now, "done": True,
+                                        "message": {"role": "assistant", "content": canned_completion(prompt)},
+                                        "prompt_eval_count": len(prompt) // 4, "eval_count": 16})
+                if self.path.startswith("/api/generate"):
+                    prompt = str(request.get("prompt", ""))
+                    server._count("stub.llm", "misses")
+                    return self._reply({"model": model, "created_at": now, "done": True,
+                                        "response": canned_completion(prompt),
+                                        "prompt_eval_count": len(prompt) // 4, "eval_count": 16})
+                if self.path.startswith("/api/show"):
+                    return self._reply({"model_info": {}, "details": {}, "template": ""})
+                self._reply({"error": f"unsupported path {self.path}"}, status=404)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    def _count(self, kind: str, outcome: str) -> None:
+        if self.bundle is not None:
+            with self.bundle._lock:
+                self.bundle._count(kind, outcome)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
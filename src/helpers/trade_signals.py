@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Dict, Optional
+import json
 import os
 
 def get_float_env(key: str, default: float) -> float:
@@ -16,15 +17,16 @@ class TradeSetup(BaseModel):
     entry_price: Optional[float] = Field(description="The price at which to enter the trade. Optional if the signal is HOLD or SELL.")
     stop_loss: Optional[float] = Field(description="The price at which to exit the trade to limit losses. Optional if the signal is HOLD or SELL.")
     profit_target: Optional[float] = Field(description="The price at which to exit the trade to take profits. Optional if the signal is HOLD or SELL.")
-    r_multiple_target: Optional[float] = Field(description="Target Reward divided by Initial Risk (1R). Optional if the signal is HOLD or SELL.")
+    r_multiple_target: Optional[float] = Field(default=None, description="Target Reward divided by Initial Risk (1R). Optional if the signal is HOLD or SELL.")
 
 class ExpectancyScorecard(BaseModel):
     win_probability: float = Field(description="Probability of a winning trade (0.0 to 1.0)")
-    r_ratio: float = Field(description="The Reward-to-Risk ratio (e.g., 3.0 for 3:1)")
-    expectancy_value: float = Field(description="The E-value: (Pw * Reward) - (Pl * Risk)")
+    # Both are recomputed from the levels by risk.size_portfolio
+    r_ratio: float = Field(default=0.0, description="The Reward-to-Risk ratio (e.g., 3.0 for 3:1)")
+    expectancy_value: float = Field(default=0.0, description="The E-value: (Pw * Reward) - (Pl * Risk)")
 
 class PositionSizing(BaseModel):
-    shares: int
+    shares: int = 0  # Filled in by risk.size_portfolio, not by the LLM
     risk_per_trade: float = Field(default_factory=lambda: get_float_env("RISK_PER_TRADE", 0.01))
     total_account_value: float = Field(default_factory=lambda: get_float_env("EQUITY", 10000.0))
 
@@ -35,10 +37,33 @@ class TradeSignal(BaseModel):
     market_type: str = Field(description="e.g., Bull Quiet, Bear Volatile")
     trade_setup: TradeSetup
     expectancy_scorecard: ExpectancyScorecard
-    position_sizing: PositionSizing
+    position_sizing: PositionSizing = Field(default_factory=PositionSizing)
     rationale: Dict[str, Optional[str]] = Field(description="Keys: bull_case, bear_case (Steel-Man debate). Values may be null.")
 
 class PortfolioResponse(BaseModel):
     """The final output sent to the application"""
     trades: List[TradeSignal] = Field(description="A list of trade signals ranked by Expectancy.")
-    total_portfolio_risk_percent: float = Field(default=0.0, description="Sum of 1% risk for all BUY signals.")
\ No newline at end of file
+    total_portfolio_risk_percent: float = Field(default=0.0, description="Sum of the open 1R risk of all sized trades, in percent of equity.")
+
+def parse_portfolio(output) -> Optional[PortfolioResponse]:
+    """Validate a StrategyCrew result (CrewOutput, dict or raw JSON text) into a PortfolioResponse."""
+    if output is None:
+        return None
+    if isinstance(output, PortfolioResponse):
+        return output
+    data = getattr(output, "json_dict", None) or output
+    if not isinstance(data, (dict, list)):
+        raw = str(getattr(data, "raw", data)).strip()
+        start, end = raw.find("{"), raw.rfind("}")
+        if start < 0 or end <= start:
+            return None
+        try:
+            data = json.loads(raw[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+    if isinstance(data, list):
+        data = {"trades": data}
+    try:
+        return PortfolioResponse.model_validate(data)
+    except ValidationError:
+        return None
@@ -1,6 +1,8 @@
-from crewai import LLM
+import datetime
 import pathlib
 import os
+import re
+import threading
 
 
 CONFIG_BASE_DIR = str(pathlib.Path(__file__).parent / "config")
@@ -18,47 +20,203 @@ CONFIG_BASE_DIR = str(pathlib.Path(__file__).parent / "config")
 CONFIG = {
     "results_dir": "./results",
     "llm_provider": "ollama",
-    "deep_think_llm": "llama3:8b", #"deepseek-r1:8b",  # Local model
-    "quick_think_llm": "llama3:8b",  #"gemma3:4b",  # Same for simplicity
-    "ollama_base_url": "http://localhost:11434",
+    "deep_think_llm": os.getenv("DEEP_THINK_LLM", "llama3:8b"), #"deepseek-r1:8b",  # Local model
+    "quick_think_llm": os.getenv("QUICK_THINK_LLM", "llama3:8b"),  #"gemma3:4b",  # Small, fast model for cheap steps
+    "ollama_base_url": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+    # Extra Ollama-compatible servers, comma separated; requests go to the least loaded healthy one
+    "ollama_endpoints": [url.strip() for url in os.getenv("OLLAMA_ENDPOINTS", "").split(",") if url.strip()],
+    # Which tier each stage runs on: summarizing tools and per-symbol triage is quick, the strategy is deep
+    "llm_tiers": {
+        "macro": os.getenv("MACRO_LLM_TIER", "quick"),
+        "analysis": os.getenv("ANALYSIS_LLM_TIER", "quick"),
+        "strategy": os.getenv("STRATEGY_LLM_TIER", "deep"),
+        "tool_calls": os.getenv("TOOL_CALLS_LLM_TIER", "quick"),
+    },
     "max_debate_rounds": 2,
     "max_risk_discuss_rounds": 1,
     "max_recur_limit": 100,
     "llm_temperature": 0.0,
     "online_tools": True,
     "swing_evaluation_days": 21,  # For ground_truth (swing trading horizon)
+    "analysis_workers": int(os.getenv("ANALYSIS_WORKERS", 4)),  # Symbols analyzed concurrently
+    "checkpoints_enabled": os.getenv("CHECKPOINTS", "1") == "1",  # Save flow state after each stage and symbol
+    "symbol_timeout_seconds": float(os.getenv("SYMBOL_TIMEOUT_SECONDS", 900)),  # Per attempt, 0 disables
+    "symbol_retries": int(os.getenv("SYMBOL_RETRIES", 1)),
+    "symbol_retry_backoff_seconds": float(os.getenv("SYMBOL_RETRY_BACKOFF_SECONDS", 10)),
+    # How long a timed-out attempt gets to notice its cancellation before the symbol is failed, not retried
+    "symbol_cancel_grace_seconds": float(os.getenv("SYMBOL_CANCEL_GRACE_SECONDS", 120)),
+    "skip_failed_symbols": os.getenv("SKIP_FAILED_SYMBOLS", "0") == "1",  # Else the run stops before the strategy
+    "screener_enabled": os.getenv("SCREENER_ENABLED", "0") == "1",  # Quantitative screen before the LLM, for large universes
+    "screener_rules": {"top_n": int(os.getenv("SCREENER_TOP_N", 20))},  # Overrides screener.DEFAULT_RULES
+    "incremental_enabled": os.getenv("INCREMENTAL", "0") == "1",  # Reuse analyses whose inputs barely changed
+    "incremental_rules": {  # Overrides incremental.DEFAULT_RULES
+        "max_atr_move": float(os.getenv("INCREMENTAL_MAX_ATR_MOVE", 0.5)),
+        "max_new_headlines": int(os.getenv("INCREMENTAL_MAX_NEW_HEADLINES", 0)),
+        "max_age_days": int(os.getenv("INCREMENTAL_MAX_AGE_DAYS", 5)),
+    },
+    "risk_limits": {  # Overrides risk.DEFAULT_LIMITS
+        "max_total_risk": float(os.getenv("MAX_TOTAL_RISK", 0.06)),
+        "max_bucket_risk": float(os.getenv("MAX_BUCKET_RISK", 0.03)),
+        "correlation_threshold": float(os.getenv("CORRELATION_THRESHOLD", 0.7)),
+        "min_expectancy": float(os.getenv("MIN_EXPECTANCY", 0.0)),
+    },
+    "strategy_compaction": os.getenv("STRATEGY_COMPACTION", "1") == "1",  # Structured records instead of raw reports
+    "strategy_budget": {  # Overrides compaction.DEFAULT_BUDGET
+        "tokens": int(os.getenv("STRATEGY_TOKEN_BUDGET", 3000)),
+        "macro_tokens": int(os.getenv("STRATEGY_MACRO_TOKEN_BUDGET", 800)),
+    },
 }
 
 
-local_llm_deep = LLM(
-        api_key=os.getenv("OPENAI_API_KEY", "FAKE"),
-        model=f"""{CONFIG["llm_provider"]}/{CONFIG["deep_think_llm"]}""",
-        base_url=CONFIG["ollama_base_url"],
-        temperature=CONFIG["llm_temperature"],
-        max_debate_rounds=CONFIG["max_debate_rounds"],
-        max_risk_discuss_rounds=CONFIG["max_risk_discuss_rounds"],
-        max_recur_limit=CONFIG["max_recur_limit"],
-    )
+_lazy: dict[str, object] = {}
+_lazy_guard = threading.Lock()
 
 
+def get_llm(tier: str = "deep"):
+    """Shared LLM client for a tier, built on first use so importing this module stays cheap."""
+    with _lazy_guard:
+        if tier not in _lazy:
+            from .llm import CachedLLM, RoutedLLM
 
-local_embedder = {
-    "provider": "ollama",
-    "config": {
-        "model_name": "nomic-embed-text",
-        "base_url": CONFIG["ollama_base_url"],
-        "api_key": ""
+            params = dict(
+                api_key=os.getenv("OPENAI_API_KEY", "FAKE"),
+                model=f"""{CONFIG["llm_provider"]}/{CONFIG[f"{tier}_think_llm"]}""",
+                temperature=CONFIG["llm_temperature"],
+                max_debate_rounds=CONFIG["max_debate_rounds"],
+                max_risk_discuss_rounds=CONFIG["max_risk_discuss_rounds"],
+                max_recur_limit=CONFIG["max_recur_limit"],
+            )
+            endpoints = list(dict.fromkeys([CONFIG["ollama_base_url"], *CONFIG["ollama_endpoints"]]))
+            if len(endpoints) > 1:
+                _lazy[tier] = RoutedLLM(endpoints=endpoints, **params)
+            else:
+                _lazy[tier] = CachedLLM(base_url=CONFIG["ollama_base_url"], **params)
+        return _lazy[tier]
+
+
+def stage_llm(stage: str):
+    """LLM for a pipeline stage ("macro", "analysis", "strategy", "tool_calls") per CONFIG["llm_tiers"]."""
+    return get_llm(CONFIG["llm_tiers"][stage])
+
+
+def stage_model(stage: str) -> str:
+    return CONFIG[f"""{CONFIG["llm_tiers"][stage]}_think_llm"""]
+
+
+def get_embedder() -> dict:
+    """Embedder config for crew memory; importing the embedding function pulls in chromadb."""
+    from .embeddings import OllamaEmbeddingFunction
+
+    return {
+        "provider": "custom",
+        "config": {
+            # Same Ollama nomic-embed-text model, through our traced client
+            "embedding_callable": OllamaEmbeddingFunction,
+        }
     }
-}
 
 
-#
-# local_llm_quick = LLM(
-#         api_key=CONFIG.get("llm_api_key", "dummy"),
-#         model=f"""{CONFIG["llm_provider"]}/{CONFIG["quick_think_llm"]}""",
-#         base_url=CONFIG["ollama_base_url"],
-#         emperature=CONFIG["llm_temperature"],
-#         max_debate_rounds=CONFIG["max_debate_rounds"],
-#         max_risk_discuss_rounds=CONFIG["max_risk_discuss_rounds"],
-#         max_recur_limit=CONFIG["max_recur_limit"],
-#     )
\ No newline at end of file
+def __getattr__(name: str):
+    # `from ..helpers.utils import local_llm_deep, local_embedder` keeps working, lazily
+    if name == "local_llm_deep":
+        return get_llm("deep")
+    if name == "local_llm_quick":
+        return get_llm("quick")
+    if name == "local_embedder":
+        return get_embedder()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def memory_dir(*parts: str) -> str:
+    """Storage path for one crew's memory under MEMORY_DB_BASE_DIR."""
+    return os.path.join(os.getenv("MEMORY_DB_BASE_DIR", "./memory"), *parts)
+
+
+def run_memory_dir(trade_date: str, *parts: str) -> str:
+    """Crew memory for a run on trade_date.
+
+    Live runs (trade_date today or later) share one store and keep learning across days. A run
+    on a past date (backtests, replays, reruns) gets a store of its own under as_of/<trade_date>,
+    so its crews never recall what a crew working on a later date wrote, whatever order the
+    backtest workers run the dates in.
+    """
+    if trade_date and str(trade_date) < datetime.date.today().isoformat():
+        return memory_dir("as_of", str(trade_date), *parts)
+    return memory_dir(*parts)
+
+
+_storages: dict[tuple[str, str, str], object] = {}
+_storages_guard = threading.Lock()
+_vector_dirs: dict[str, str] = {}
+_vector_locks: list = []  # Open lock files, held until the process exits
+
+
+def _memory_root(storage_dir: str) -> str:
+    """memory_dir() for live crews, memory_dir("as_of", <date>) for a past-dated run's crews."""
+    parts = os.path.relpath(storage_dir, memory_dir()).split(os.sep)
+    return memory_dir(*parts[:2]) if parts[0] == "as_of" and len(parts) > 2 else memory_dir()
+
+
+def _vector_dir(root: str) -> str:
+    """The Chroma directory under root, owned by one process at a time (call under _storages_guard).
+
+    Chroma's sqlite store is not safe for writers in several processes. The first process to lock
+    root/vectors keeps it for its lifetime; another one (a CLI run next to the server) gets a
+    private temporary store instead, so its short-term and entity memory just do not persist.
+    """
+    import fcntl
+    import tempfile
+
+    if root not in _vector_dirs:
+        path = os.path.join(root, "vectors")
+        os.makedirs(path, exist_ok=True)
+        lock_file = open(os.path.join(root, "vectors.lock"), "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            _vector_locks.append(lock_file)
+        except BlockingIOError:
+            lock_file.close()
+            path = tempfile.mkdtemp(prefix="vectors-")
+            print(f"--- {root}/vectors is in use by another process, vector memory goes to {path} ---")
+        _vector_dirs[root] = path
+    return _vector_dirs[root]
+
+
+def _vector_storage(kind: str, storage_dir: str):
+    """One RAGStorage per (kind, crew), sharing one Chroma store per memory root.
+
+    Every crew used to open its own Chroma client and sqlite file; now the crews of a root share
+    one client and differ only by collection name, and repeat kickoffs reuse the open handle.
+    Past-dated runs have a root (and Chroma directory) per trade_date, so backtest worker
+    processes, one per date, never write to the same store.
+    """
+    from crewai.memory.storage.rag_storage import RAGStorage
+
+    root = _memory_root(storage_dir)
+    namespace = re.sub(r"[^A-Za-z0-9]+", "_", os.path.relpath(storage_dir, root)).strip("_")
+    key = (root, kind, namespace or "default")
+    with _storages_guard:
+        if key not in _storages:
+            _storages[key] = RAGStorage(type=f"{kind}_{key[2]}", embedder_config=get_embedder(),
+                                        path=_vector_dir(root))
+        return _storages[key]
+
+
+def crew_memory(storage_dir: str | None) -> dict:
+    """Memory stores rooted at storage_dir, passed to Crew explicitly instead of via CREWAI_STORAGE_DIR.
+
+    Mutating the process-wide env var is not safe once several crews run in parallel threads.
+    """
+    if not storage_dir:
+        return {}
+    from crewai.memory import EntityMemory, LongTermMemory, ShortTermMemory
+    from crewai.memory.storage.ltm_sqlite_storage import LTMSQLiteStorage
+
+    os.makedirs(storage_dir, exist_ok=True)
+    return {
+        "short_term_memory": ShortTermMemory(storage=_vector_storage("short_term", storage_dir)),
+        "entity_memory": EntityMemory(storage=_vector_storage("entities", storage_dir)),
+        "long_term_memory": LongTermMemory(
+            storage=LTMSQLiteStorage(db_path=os.path.join(storage_dir, "long_term_memory_storage.db"))),
+    }
+
@@ -1,6 +1,7 @@
-import pandas as pd
 from dotenv import load_dotenv
 from getpass import getpass
+import argparse
+import datetime
 import os
 import sys
 
@@ -13,177 +14,110 @@ def _set_env(var: str):
 
 load_dotenv()
 
-
-# Suppress the exact prompt
-def no_prompt(*args, **kwargs):
-    return "n"  # auto-answer "no"
-
-try:
-    from crewai.utilities import tracing
-    if hasattr(tracing, "ask_to_view_traces"):
-        tracing.ask_to_view_traces = no_prompt
-    if hasattr(tracing, "prompt_for_traces"):
-        tracing.prompt_for_traces = no_prompt
-except ImportError:
-    pass  # tracing module moved in some versions
-
-import os
-import warnings
-import sys
-from pathlib import Path
-
-from crewai.flow.flow import Flow, listen, start
-from pydantic import BaseModel
-from .crews.macro_crew import MacroCrew
-from .crews.analysis_crew import AnalysisCrew
-from .crews.strategy_crew import StrategyCrew
-import datetime
-
-# Silence only this exact family of pydantic serialization warnings
-warnings.filterwarnings(
-    "ignore",
-    category=UserWarning,
-    message="Pydantic serializer warnings:",
-    module="pydantic.main",  # or "pydantic" to be broader
-)
-
-# from crewai.utilities.paths import db_storage_path
-# import os
-#
-# print("CREWAI_STORAGE_DIR env var:", os.getenv("CREWAI_STORAGE_DIR"))
-# print("Actual CrewAI base storage path:", db_storage_path())
-#
-# # Optional: list contents to see subdirs
-# base = db_storage_path()
-# if os.path.exists(base):
-#     print("Contents:")
-#     for item in os.listdir(base):
-#         print("  ", item)
-#
-# sys.exit(0)
-class TradingState(BaseModel):
-    symbol: str = ""
-    trade_date: str = str(datetime.date.today())
-    start_date: str = str(datetime.date.today() - datetime.timedelta(days=20))
-    end_date: str = str(datetime.date.today() - datetime.timedelta(days=1))
-    macro_context: str = ""
-    ticker_data: str = ""
-    watchlist: list[str] = []
-    ticker_analysis_results: dict[str, str] = {}
-    equity: int = os.getenv("EQUITY", 10000)
-    risk: float = os.getenv("RISK_PER_TRADE", 0.01)  # How much percentage of the total equity to risk on single position
-
-class SwingSentryFlow(Flow[TradingState]):
-    def __init__(self):
-        super().__init__()
-        # Force tracing off at the object level
-        self.tracing = False
-
-    @start()
-    def get_global_macro(self):
-        """Runs once per trade_date, shared by all symbols."""
-        print(f"--- Running Global Macro for {self.state.trade_date} ---")
-
-        os.environ["CREWAI_STORAGE_DIR"] = f"{os.getenv('MEMORY_DB_BASE_DIR')}/global_macro"
-
-        # 1. Run the crew once
-        result = MacroCrew().crew().kickoff(inputs={
-            "trade_date": self.state.trade_date,
-            "start_date": self.state.start_date,
-            "end_date": self.state.end_date,
-        })
-
-        # 2. Store in state so it persists for all listeners
-        self.state.macro_context = result.raw
-        # return result.raw
-
-    @listen(get_global_macro)
-    def analyze_all_symbols(self):
-        """Triggers for each symbol using the pre-calculated macro."""
-
-        for symbol in self.state.watchlist:
-            print(f"--- Analyzing {symbol} using Global Macro context ---")
-            #     # ISOLATION: Dynamic path based on symbol prevents memory bleed
-            os.environ["CREWAI_STORAGE_DIR"] = f"{os.getenv('MEMORY_DB_BASE_DIR')}/analyze/tickers/{symbol}/"
-
-            # 3. Pass the stored macro_context into the symbol-specific crew
-            result = AnalysisCrew().crew().kickoff(inputs={
-                "symbol": symbol,
-                "trade_date": self.state.trade_date,
-                "start_date": self.state.start_date,
-                "end_date": self.state.end_date,
-                "macro_context": self.state.macro_context,
-                "equity": self.state.equity,
-                "risk": str(float(self.state.risk) * 100),
-            })
-
-            self.state.ticker_analysis_results[symbol] = result.raw
-
-    # @listen(analyze_all_symbols)
-    # def finalize_plan(self):
-    #     """Triggers for each symbol using the pre-calculated macro."""
-    #
-    #     all_plans = {}
-    #
-    #     for symbol in self.state.watchlist:
-    #         print(f"--- Analyzing {symbol} using Global Macro context ---")
-    #         #     # ISOLATION: Dynamic path based on symbol prevents memory bleed
-    #         os.environ["CREWAI_STORAGE_DIR"] = f"{os.getenv('MEMORY_DB_BASE_DIR')}/strategy/tickers/{symbol}/"
-    #
-    #         result = StrategyCrew().crew().kickoff(inputs={
-    #                     "symbol": symbol,
-    #                     "trade_date": self.state.trade_date,
-    #                     "start_date": self.state.start_date,
-    #                     "end_date": self.state.end_date,
-    #                     "macro_report": self.state.macro_context,
-    #                     "analyst_dossier": self.state.ticker_analysis_results[symbol],
-    #                    "equity": self.state.equity,
-    #                    "risk": str(float(self.state.risk) * 100),
-    #                 })
-    #
-    #         all_plans[symbol] = result
-    #
-    #     return all_plans
-
-    @listen(analyze_all_symbols)
-    def finalize_plan(self):
-        """Triggers for each symbol using the pre-calculated macro."""
-
-        os.environ["CREWAI_STORAGE_DIR"] = f"{os.getenv('MEMORY_DB_BASE_DIR')}/strategy/"
-
-        # for symbol in self.state.watchlist:
-        #     print(f"--- Analyzing {symbol} using Global Macro context ---")
-        #     #     # ISOLATION: Dynamic path based on symbol prevents memory bleed
-
-
-        result = StrategyCrew().crew().kickoff(inputs={
-                # "symbol": symbol,
-                "trade_date": self.state.trade_date,
-                "start_date": self.state.start_date,
-                "end_date": self.state.end_date,
-                "macro_report": self.state.macro_context,
-                "all_symbol_reports": "\n---\n".join(self.state.ticker_analysis_results.values()),
-                "equity": self.state.equity,
-                "risk": str(float(self.state.risk) * 100),
-            })
-
-
-        return result
-
-
-# TODO make sure no future look
-# TODO teach to learn based on future look for swing trading both backtesting and daily runs
-
-
-def run():
+# Keep this module cheap to import: the entry points below pull in pandas,
+# crewai and the crews only once they actually run a flow, so `--help` and
+# no-op scheduler ticks do not pay for them.
+
+
+def _parse_run_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the swing trading flow for one trade date.")
+    parser.add_argument("--watchlist", default="AAPL", help="Comma separated symbols")
+    parser.add_argument("--trade-date", default="2025-01-07", help="Trade date (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=None, help="Symbols analyzed concurrently")
+    parser.add_argument("--incremental", action="store_true", default=None,
+                        help="Reuse previous analyses of symbols whose inputs barely changed")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue this watchlist and date from its checkpoint, skipping finished work")
+    fixtures = parser.add_mutually_exclusive_group()
+    fixtures.add_argument("--record-fixtures", metavar="DIR",
+                          help="Record every tool call, LLM completion, API response and bar into DIR")
+    fixtures.add_argument("--replay-fixtures", metavar="DIR",
+                          help="Replay a recorded bundle offline (watchlist, date and workers come from it)")
+    return parser.parse_args(argv)
+
+
+def run(argv=None):
     """Entry point for the crew - runs with default parameters"""
-    run_multi_symbol(watchlist=["AAPL"], trade_date="2025-01-07")
+    args = _parse_run_args(argv)
+    watchlist = [s.strip() for s in args.watchlist.split(",") if s.strip()]
+    if not (args.record_fixtures or args.replay_fixtures):
+        run_multi_symbol(watchlist=watchlist, trade_date=args.trade_date, workers=args.workers,
+                         incremental=args.incremental, resume=args.resume)
+        return
+
+    from .helpers.fixtures import fixture_session, load_manifest
+
+    if args.record_fixtures:
+        mode, bundle_dir = "record", args.record_fixtures
+        settings = {"watchlist": watchlist, "trade_date": args.trade_date, "workers": args.workers}
+    else:
+        mode, bundle_dir = "replay", args.replay_fixtures
+        manifest = load_manifest(bundle_dir)
+        settings = {name: manifest.get(name) for name in ("watchlist", "trade_date", "workers")}
+    # Incremental reuse would make the recorded calls depend on earlier runs
+    with fixture_session(bundle_dir, mode, **settings) as bundle:
+        run_multi_symbol(incremental=False, **settings)
+    print(f"Fixtures ({mode}, {bundle_dir}): {bundle.stats}")
+
+
+def replay():
+    """Entry point to resume an interrupted backtest from its checkpoint directory."""
+    from .backtest import replay_run
+
+    parser = argparse.ArgumentParser(description="Resume a backtest run from its checkpoint directory.")
+    parser.add_argument("run_dir", help="Directory holding the run's plan.json and progress.jsonl")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    replay_run(args.run_dir, processes=args.processes, analysis_workers=args.workers)
+
+
+def resume(argv=None):
+    """Entry point to continue an interrupted run from its flow checkpoint."""
+    from .helpers.checkpoint import list_checkpoints
+
+    parser = argparse.ArgumentParser(description="Resume an interrupted run from its checkpoint.")
+    parser.add_argument("run_id", nargs="?", help="Run to resume, default the latest unfinished one")
+    parser.add_argument("--list", action="store_true", help="Only list the stored checkpoints")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    runs = list_checkpoints()
+    if args.list:
+        for run in runs:
+            print(f"{run['run_id']}  {run['stage']:<16} {run['symbols_done']} symbols done"
+                  f"{'  failed: ' + ','.join(run['failed_symbols']) if run['failed_symbols'] else ''}")
+        return
+    candidates = [run for run in runs if run["run_id"] == args.run_id] if args.run_id else \
+        [run for run in runs if run["stage"] != "done"]
+    if not candidates:
+        print(f"No {'checkpoint ' + args.run_id if args.run_id else 'unfinished checkpoint'} found")
+        return
+    run = candidates[0]
+    if run["stage"] == "done":
+        print(f"{run['run_id']} already finished")
+        return
+    run_multi_symbol(watchlist=run["watchlist"], trade_date=run["trade_date"], workers=args.workers, resume=True)
+
+
+def run_multi_symbol(watchlist: list, trade_date: str, workers: int | None = None,
+                     incremental: bool | None = None, on_symbol=None, resume: bool = False):
+    from pathlib import Path
+    from .flow import SwingSentryFlow, TradingState, write_final_report
+    from .helpers.api_clients import release_pins
+    from .helpers.checkpoint import FlowCheckpoint, run_id
+    from .helpers.as_of import set_cutoff
+    from .helpers.instrumentation import TRACER, span
+    from .helpers.llm_cache import get_llm_cache
+    from .helpers.signal_store import SignalStore
+    from .helpers.utils import CONFIG
 
-
-def run_multi_symbol(watchlist: list, trade_date: str):
     start_date = (datetime.datetime.strptime(trade_date, "%Y-%m-%d") - datetime.timedelta(days=90)).strftime("%Y-%m-%d")
     end_date = (datetime.datetime.strptime(trade_date, "%Y-%m-%d") - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
 
+    # Tools never see data from trade_date onward, whatever dates the agents ask for
+    set_cutoff(trade_date)
+    TRACER.reset()
     flow = SwingSentryFlow()
 
     print(f"\n{'=' * 30}\nSTARTING ANALYSIS: {watchlist}\n{'=' * 30}")
@@ -191,36 +125,47 @@ def run_multi_symbol(watchlist: list, trade_date: str):
     flow.state.start_date = start_date
     flow.state.end_date = end_date
     flow.state.watchlist = watchlist
-    final_report = flow.kickoff()
-
-    # for symbol, final_report in final_report.items():
-    #     report_dir = Path(os.getenv("FINAL_REPORT_BASE_DIR")) / symbol
-    #     report_dir.mkdir(parents=True, exist_ok=True)
-    #     file_path = report_dir / f"{trade_date}_{symbol}_report.json"
-    #     with open(file_path, "w") as f:
-    #         f.write(str(final_report))
+    if workers:
+        flow.state.analysis_workers = workers
+    if incremental is not None:
+        flow.state.incremental = incremental
+    flow.on_symbol_done = on_symbol
+    if CONFIG["checkpoints_enabled"] or resume:
+        flow.checkpoint = FlowCheckpoint(run_id(trade_date, watchlist))
+        snapshot = flow.checkpoint.load() if resume else None
+        if snapshot is not None:
+            # Everything the run had finished, stages skip what the restored state already holds
+            for name, value in snapshot["state"].items():
+                if name in TradingState.model_fields and name not in ("analysis_workers", "incremental"):
+                    setattr(flow.state, name, value)
+            print(f"Resuming {flow.checkpoint.run_id} from stage '{snapshot['stage']}'")
+    # crewai silences memory queries with redirect_stdout; from parallel symbol threads the restores
+    # interleave and can leave a StringIO as sys.stdout, swallowing everything printed after the run
+    stdout, stderr = sys.stdout, sys.stderr
+    try:
+        with span("run", "flow", symbols=len(watchlist)):
+            final_report = flow.kickoff()
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+        release_pins(flow.news_pins)  # Prefetched news only had to outlive this run
 
-    for symbol, final_report in flow.state.ticker_analysis_results.items():
-        report_dir = Path(os.getenv("FINAL_REPORT_BASE_DIR")) / symbol
-        report_dir.mkdir(parents=True, exist_ok=True)
-        file_path = report_dir / f"{trade_date}_{symbol}_report.json"
-        with open(file_path, "w") as f:
-            f.write(str(final_report))
+    trace_dir = TRACER.write(Path(os.getenv("FINAL_REPORT_BASE_DIR", CONFIG["results_dir"])) / "traces" /
+                             f"{trade_date}_{datetime.datetime.now():%Y%m%dT%H%M%S}")
+    print(TRACER.format_summary())
+    print(f"Trace written to {trace_dir}")
 
-    report_dir = Path(os.getenv("FINAL_REPORT_BASE_DIR"))
-    report_dir.mkdir(parents=True, exist_ok=True)
-    file_path = report_dir / f"{trade_date}_final_report.json"
-    with open(file_path, "w") as f:
-        f.write(str(final_report))
+    llm_cache = get_llm_cache()
+    if llm_cache is not None:
+        print(f"LLM cache: {llm_cache.stats()}")
 
+    write_final_report(trade_date, final_report)
 
+    report_df = SignalStore().to_frame(start_date=trade_date, end_date=trade_date, symbols=watchlist)
+    if not report_df.empty:
+        print(report_df[["symbol", "signal", "entry_price", "stop_loss", "profit_target", "expectancy_value"]])
 
-    # TODO add simple extract information from the report as dataframe (symbol, signal, stop loss, take profit etc.)
-    try:
-        report_df = pd.DataFrame.from_records(final_report)
-    except Exception as e:
-        print(e)
+    return final_report
 
 
 if __name__ == "__main__":
-    run_multi_symbol(watchlist=["AAPL"], trade_date="2025-01-07")
\ No newline at end of file
+    run_multi_symbol(watchlist=["AAPL"], trade_date="2025-01-07")
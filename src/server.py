@@ -0,0 +1,240 @@
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from dataclasses import dataclass, field
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+# Resident service mode. One process keeps the LLM clients, the embedding
+# service, pooled Chroma stores, bar memo and news clients warm, takes
+# analysis jobs over a local HTTP API, runs them one at a time on a worker
+# thread (the as-of cutoff and the tracer are process-wide), streams each
+# symbol's report over Server-Sent Events as soon as it is ready, and
+# enqueues the daily watchlist run on a cron schedule.
+SERVER_WATCHLIST = os.getenv("SERVER_WATCHLIST", "AAPL")
+SERVER_DAILY_CRON = os.getenv("SERVER_DAILY_CRON", "30 8 * * mon-fri")  # Empty disables the daily run
+SERVER_MAX_JOBS = int(os.getenv("SERVER_MAX_JOBS", 200))  # Finished jobs kept for polling
+
+
+class JobRequest(BaseModel):
+    watchlist: list[str]
+    trade_date: str | None = None  # Defaults to today
+    workers: int | None = None
+    incremental: bool | None = None  # Defaults to CONFIG["incremental_enabled"]
+
+
+@dataclass
+class Job:
+    request: JobRequest
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: str = "queued"  # queued -> running -> done | failed
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    events: list[dict] = field(default_factory=list)
+    result: dict | None = None
+    error: str | None = None
+    changed: threading.Condition = field(default_factory=threading.Condition)
+
+    def emit(self, event: str, **data) -> None:
+        with self.changed:
+            self.events.append({"event": event, "at": time.time(), **data})
+            self.changed.notify_all()
+
+    def finish(self, status: str) -> None:
+        # Final event and finished_at change together, so a stream never stops before the last event
+        with self.changed:
+            self.status = status
+            self.finished_at = time.time()
+            self.events.append({"event": status, "at": self.finished_at, "result": self.result, "error": self.error})
+            self.changed.notify_all()
+
+    def wait_for_events(self, seen: int, timeout: float) -> list[dict]:
+        with self.changed:
+            self.changed.wait_for(lambda: len(self.events) > seen or self.finished_at is not None, timeout)
+            return self.events[seen:]
+
+    def summary(self) -> dict:
+        return {"id": self.id, "status": self.status, "request": self.request.model_dump(),
+                "created_at": self.created_at, "finished_at": self.finished_at,
+                "symbols_done": sum(event["event"] == "symbol" for event in self.events),
+                "result": self.result, "error": self.error}
+
+
+class JobRunner:
+    """FIFO job queue drained by a single worker thread."""
+
+    def __init__(self):
+        self.jobs: dict[str, Job] = {}
+        self._queue: queue.Queue[Job] = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="job-runner", daemon=True)
+
+    def start(self) -> None:
+        self._worker.start()
+
+    def submit(self, request: JobRequest) -> Job:
+        job = Job(request=request)
+        with self._lock:
+            self.jobs[job.id] = job
+            finished = [j for j in self.jobs.values() if j.finished_at is not None]
+            for old in sorted(finished, key=lambda j: j.finished_at)[:max(0, len(self.jobs) - SERVER_MAX_JOBS)]:
+                self.jobs.pop(old.id, None)
+        self._queue.put(job)
+        return job
+
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        from .helpers.trade_signals import parse_portfolio
+        from .main import run_multi_symbol
+
+        while True:
+            job = self._queue.get()
+            request = job.request
+            job.status = "running"
+            job.emit("started", watchlist=request.watchlist)
+            status = "failed"
+            try:
+                final_report = run_multi_symbol(
+                    watchlist=[symbol.upper() for symbol in request.watchlist],
+                    trade_date=request.trade_date or str(datetime.date.today()),
+                    workers=request.workers, incremental=request.incremental,
+                    on_symbol=lambda symbol, report, reused: job.emit(
+                        "symbol", symbol=symbol, reused=reused, report=str(report)))
+                portfolio = parse_portfolio(final_report)
+                job.result = (portfolio.model_dump() if portfolio is not None
+                              else {"raw": str(getattr(final_report, "raw", final_report))})
+                status = "done"
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                traceback.print_exc()
+            job.finish(status)
+
+
+def warm_up() -> None:
+    """Build the long-lived clients once, before the first job pays for them.
+
+    Crews and agents are not cached: every job builds its own. Past-dated jobs keep their memory
+    under as_of/<trade_date>, live ones share the one live store (see utils.run_memory_dir). The
+    flow module itself is imported by run_multi_symbol on the first job.
+    """
+    from .helpers.embeddings import get_embedding_service
+    from .helpers.utils import CONFIG, get_embedder, get_llm
+
+    for tier in dict.fromkeys(CONFIG["llm_tiers"].values()):
+        get_llm(tier)
+    get_embedder()
+    get_embedding_service()
+
+
+def _schedule_daily(runner: JobRunner):
+    if not SERVER_DAILY_CRON.strip():
+        return None
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.cron import CronTrigger
+
+    watchlist = [symbol.strip() for symbol in SERVER_WATCHLIST.split(",") if symbol.strip()]
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(lambda: runner.submit(JobRequest(watchlist=watchlist)),
+                      CronTrigger.from_crontab(SERVER_DAILY_CRON), id="daily-run", coalesce=True,
+                      max_instances=1)
+    scheduler.start()
+    return scheduler
+
+
+def create_app(schedule: bool = True) -> FastAPI:
+    runner = JobRunner()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await asyncio.to_thread(warm_up)
+        runner.start()
+        scheduler = _schedule_daily(runner) if schedule else None
+        yield
+        if scheduler is not None:
+            scheduler.shutdown(wait=False)
+
+    app = FastAPI(title="swing_trader", lifespan=lifespan)
+    app.state.runner = runner
+
+    @app.get("/health")
+    def health():
+        from .helpers.utils import CONFIG, get_llm
+
+        pools = {}
+        for tier in dict.fromkeys(CONFIG["llm_tiers"].values()):
+            llm = get_llm(tier)
+            if hasattr(llm, "pool"):
+                pools[tier] = llm.pool.stats()
+        return {"status": "ok", "queued": runner.queued(), "endpoints": pools}
+
+    @app.post("/jobs", status_code=202)
+    def submit(request: JobRequest):
+        if not request.watchlist:
+            raise HTTPException(status_code=422, detail="watchlist is empty")
+        return runner.submit(request).summary()
+
+    @app.get("/jobs")
+    def jobs():
+        return [job.summary() for job in list(runner.jobs.values())]
+
+    def _job(job_id: str) -> Job:
+        job = runner.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"unknown job {job_id}")
+        return job
+
+    @app.get("/jobs/{job_id}")
+    def job_status(job_id: str):
+        return _job(job_id).summary()
+
+    @app.get("/jobs/{job_id}/events")
+    async def job_events(job_id: str):
+        job = _job(job_id)
+
+        async def stream():
+            seen = 0
+            while True:
+                events = await asyncio.to_thread(job.wait_for_events, seen, 15.0)
+                for event in events:
+                    yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+                seen += len(events)
+                if job.finished_at is not None and seen >= len(job.events):
+                    return
+                if not events:
+                    yield ": keep-alive\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def main(argv=None):
+    """Entry point for the resident HTTP service."""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run swing_trader as a resident service.")
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVER_PORT", 8000)))
+    parser.add_argument("--no-schedule", action="store_true", help="Do not enqueue the daily run")
+    args = parser.parse_args(argv)
+    uvicorn.run(create_app(schedule=not args.no_schedule), host=args.host, port=args.port, workers=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,102 +1,142 @@
 from crewai.tools import tool
-import yfinance as yf
-import finnhub
-from langchain_tavily import TavilySearch
 # import pandas as pd
 from datetime import datetime#, timedelta
-from stockstats import wrap as stockstats_wrap
-import os
+from ..helpers.api_clients import company_news, run_batch, tavily_search
+from ..helpers.as_of import clamp_end_date
+from ..helpers.indicators import bar_summary
+from ..helpers.instrumentation import traced_tool
+from ..helpers.news_index import collapse, get_news_index
+
+# Distinct stories per news tool call, with syndicated copies folded into one
+NEWS_ITEMS = 7
+NEWS_SCAN_LIMIT = 30
 
 
 # Now define your tools using the correct @tool decorator
 @tool("get_yfinance_data", max_usage_count=1)
+@traced_tool
 def get_yfinance_data(symbol: str, start_date: str, end_date: str) -> dict:
     """Retrieve the stock price data for a given ticker symbol from Yahoo Finance."""
     try:
-        ticker = yf.Ticker(symbol.upper())
-        data = ticker.history(start=start_date, end=end_date).reset_index(drop=False)
-        if data.empty:
+        # Last SUMMARY_LAST_N bars plus high/low/change over the whole window, streamed from the bar store
+        summary = bar_summary(symbol, start_date, clamp_end_date(end_date))
+        if summary is None:
             return { "status": "no_data"} # f"No data found for symbol '{symbol}' between {start_date} and {end_date}"
-        # return data.to_csv()
-        return {
-            "close_prices": data["Close"].tolist(),
-            "highs": data["High"].tolist(),
-            "lows": data["Low"].tolist(),
-            "dates": data["Date"].dt.strftime('%Y-%m-%d').tolist()
-        }
+        return {**summary["last_bars"], **summary["window"]}
     except Exception as e:
         return { "status": "no_data"} #f"Error fetching Yahoo Finance data: {e}"
 
 @tool("get_technical_indicators", max_usage_count=1)
+@traced_tool
 def get_technical_indicators(symbol: str, start_date: str, end_date: str) -> dict:
     """Retrieve key technical indicators for swing trading."""
     try:
-        df = yf.download(symbol, start=start_date, end=end_date, progress=False)
-        if df.empty:
+        # Latest values as of end_date: rsi_14, macd, boll_upper/lower, sma_50/200, atr_14
+        summary = bar_summary(symbol, start_date, clamp_end_date(end_date))
+        if not summary or not summary["indicators"]:
             return { "status": "no_data"}
-
-        stock_df = stockstats_wrap(df)
-
-        return {
-            "rsi_14": float(stock_df["rsi_14"].tolist()),
-            "macd": float(stock_df["macd"].tolist()),
-            "boll_upper": float(stock_df["boll_ub"].tolist()),
-            "boll_lower": float(stock_df["boll_lb"].tolist()),
-            "sma_50": float(stock_df["close_50_sma"].tolist()),
-            "sma_200": float(stock_df["close_200_sma"].tolist()),
-            "atr_14": float(stock_df["atr_14"].tolist())
-        }
-
-        # return {
-        #     "rsi_14": float(stock_df["rsi_14"].iloc[-1]),
-        #     "macd": float(stock_df["macd"].iloc[-1]),
-        #     "boll_upper": float(stock_df["boll_ub"].iloc[-1]),
-        #     "boll_lower": float(stock_df["boll_lb"].iloc[-1]),
-        #     "sma_50": float(stock_df["close_50_sma"].iloc[-1]),
-        #     "sma_200": float(stock_df["close_200_sma"].iloc[-1]),
-        #     "atr_14": float(stock_df["atr_14"].iloc[-1])
-        # }
-        #
+        return summary["indicators"]
 
     except Exception:
         return { "status": "no_data"}
 
 
+def _also(copies: int) -> str:
+    return f" (+{copies} similar report{'s' if copies > 1 else ''})" if copies else ""
+
+
+def dedup_search(response: dict) -> dict:
+    """Tavily response with compact summaries and near-duplicate hits folded into one."""
+    index = get_news_index()
+    if index is None or not isinstance(response, dict):
+        return response
+    hits = response.get("results", [])
+    records = index.lookup_many([{"url": hit.get("url"), "headline": hit.get("title", ""),
+                                  "summary": hit.get("content", "")} for hit in hits])
+    urls = {record["key"]: hit.get("url") for record, hit in zip(records, hits)}
+    deduped = {key: value for key, value in response.items() if key not in ("results", "images")}
+    deduped["results"] = [{"title": record["headline"] + _also(copies), "url": urls[record["key"]],
+                           "content": record["summary"]} for record, copies in collapse(records)]
+    return deduped
+
+
+def social_sentiment_query(symbol: str, end_date: str) -> str:
+    return f"{symbol} stock sentiment OR discussion OR reddit OR stocktwits swing trading before:{clamp_end_date(end_date)}"
+
+
+def fundamental_query(symbol: str, end_date: str) -> str:
+    return f"{symbol} fundamental analysis OR earnings OR valuation OR price target before:{clamp_end_date(end_date)}"
+
+
+def macro_query(end_date: str) -> str:
+    return f"macroeconomic news OR Fed OR inflation OR jobs OR GDP OR interest rates before {clamp_end_date(end_date)}"
+
+
 @tool("get_finnhub_news", max_usage_count=1)
+@traced_tool
 def get_finnhub_news(symbol: str, start_date: str, end_date: str) -> str:
     """Get company-specific news from Finnhub."""
     try:
-        finnhub_client = finnhub.Client(api_key=os.environ["FINNHUB_API_KEY"])
-        news_list = finnhub_client.company_news(symbol, _from=start_date, to=end_date)
-        news_items = []
-        for news in news_list[:7]:
-            dt = datetime.fromtimestamp(news['datetime'])
-            news_items.append(f"Date: {dt.strftime('%Y-%m-%d')}\nHeadline: {news['headline']}\nSummary: {news['summary']}\n")
+        news_list = company_news(symbol, start_date, clamp_end_date(end_date))
+        index = get_news_index()
+        if index is None:
+            news_items = []
+            for news in news_list[:NEWS_ITEMS]:
+                dt = datetime.fromtimestamp(news['datetime'])
+                news_items.append(f"Date: {dt.strftime('%Y-%m-%d')}\nHeadline: {news['headline']}\nSummary: {news['summary']}\n")
+            return "\n---\n".join(news_items) if news_items else "No recent news found."
+
+        days = [datetime.fromtimestamp(news['datetime']).strftime('%Y-%m-%d') for news in news_list[:NEWS_SCAN_LIMIT]]
+        records = index.lookup_many([{"item_id": news.get('id'), "url": news.get('url'), "headline": news.get('headline', ''),
+                                      "summary": news.get('summary', ''), "published": day}
+                                     for news, day in zip(news_list, days)])
+        records = [{**record, "day": day} for record, day in zip(records, days)]
+        news_items = [f"Date: {record['day']}\nHeadline: {record['headline']}{_also(copies)}\nSummary: {record['summary']}\n"
+                      for record, copies in collapse(records)[:NEWS_ITEMS]]
         return "\n---\n".join(news_items) if news_items else "No recent news found."
     except Exception as e:
         return f"Error fetching news: {e}"
 
 @tool("get_social_media_sentiment", max_usage_count=1)
+@traced_tool
 def get_social_media_sentiment(symbol: str, end_date: str) -> str:
     """Search web for recent social sentiment relevant to swing trading."""
-    tavily = TavilySearch(max_results=5)
-    query = f"{symbol} stock sentiment OR discussion OR reddit OR stocktwits swing trading before:{end_date}"
-    return tavily.invoke({"query": query})
+    return dedup_search(tavily_search(social_sentiment_query(symbol, end_date), max_results=5))
 
 # TODO Depper check on the input and output logic to make sure the Agent can decide on the company strength.
 @tool("get_fundamental_analysis", max_usage_count=1)
+@traced_tool
 def get_fundamental_analysis(symbol: str, end_date: str) -> str:
     """Search for recent fundamental analysis reports suitable for swing trading."""
-    tavily = TavilySearch(max_results=7)
-    query = f"{symbol} fundamental analysis OR earnings OR valuation OR price target before:{end_date}"
-    return tavily.invoke({"query": query})
+    return dedup_search(tavily_search(fundamental_query(symbol, end_date), max_results=7))
 
 @tool("get_macroeconomic_news", max_usage_count=1)
+@traced_tool
 def get_macroeconomic_news(end_date: str) -> str:
     """Search for macroeconomic events impacting markets around the trade date."""
-    tavily = TavilySearch(max_results=15)
-    query = f"macroeconomic news OR Fed OR inflation OR jobs OR GDP OR interest rates before {end_date}"
-    return tavily.invoke({"query": query})
+    return dedup_search(tavily_search(macro_query(end_date), max_results=15))
+
+
+def prefetch_news(watchlist: list[str], start_date: str, end_date: str,
+                  company: bool = True, searches: bool = True, pins: set | None = None) -> None:
+    """Warm the shared news responses for a whole watchlist concurrently before the crews start.
+
+    `company` covers the Finnhub company news, `searches` the two Tavily searches per symbol. With
+    `pins` the responses stay memoized past their TTL until api_clients.release_pins(pins).
+    """
+    calls = []
+    for symbol in watchlist:
+        if company:
+            calls.append(lambda symbol=symbol: company_news(symbol, start_date, clamp_end_date(end_date), pins=pins))
+        if searches:
+            calls.append(lambda symbol=symbol: tavily_search(social_sentiment_query(symbol, end_date), max_results=5,
+                                                             pins=pins))
+            calls.append(lambda symbol=symbol: tavily_search(fundamental_query(symbol, end_date), max_results=7,
+                                                             pins=pins))
+    failures = [result for result in run_batch(calls) if isinstance(result, Exception)]
+    if failures:
+        # The tools fetch (and report) again on their own, prefetch is best effort
+        print(f"--- News prefetch: {len(failures)}/{len(calls)} requests failed ({failures[0]}) ---")
 
 # Export list of tools
 TOOLS = {
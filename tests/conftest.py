@@ -0,0 +1,40 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.helpers import bar_store
+
+
+@pytest.fixture
+def bars(tmp_path, monkeypatch):
+    """Point the bar store at tmp_path; returns write(symbol, frame) to seed it, fully covered, offline."""
+    monkeypatch.setattr(bar_store, "BAR_STORE_DIR", str(tmp_path / "bars"))
+    bar_store._memo.clear()
+
+    def write(symbol: str, frame: pd.DataFrame) -> pd.DataFrame:
+        data_path, meta_path = bar_store._paths(symbol)
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        frame = frame[bar_store.BAR_COLUMNS].astype("float64")
+        frame.index = pd.DatetimeIndex(frame.index, name="Date")
+        frame.to_parquet(data_path, row_group_size=bar_store.BAR_ROW_GROUP_SIZE)
+        meta_path.write_text(json.dumps({"start": "2000-01-01", "end": "2024-12-31"}))
+        return frame
+
+    yield write
+    bar_store._memo.clear()
+
+
+@pytest.fixture
+def walk():
+    return random_walk
+
+
+def random_walk(days: int, start: str = "2024-01-02", seed: int = 1, drift: float = 0.0) -> pd.DataFrame:
+    """Daily OHLCV frame on business days, a random walk around 100."""
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(drift, 0.015, days)))
+    spread = np.abs(rng.normal(0.0, 0.01, days)) * close
+    return pd.DataFrame({"Open": np.r_[close[0], close[:-1]], "High": close + spread, "Low": close - spread,
+                         "Close": close, "Volume": 1e6}, index=pd.bdate_range(start, periods=days))
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+from src.helpers.evaluation import label_signals, summarize
+
+
+def _bars(*rows, days: int = 10) -> pd.DataFrame:
+    """(open, high, low, close) rows from Monday 2024-03-04, padded with quiet bars at the last close."""
+    last = rows[-1][3]
+    rows = list(rows) + [(last, last + 0.5, last - 0.5, last)] * (days - len(rows))
+    return pd.DataFrame(rows, columns=["Open", "High", "Low", "Close"],
+                        index=pd.bdate_range("2024-03-04", periods=days)).assign(Volume=1e6)
+
+
+def _signal(symbol, signal="BUY", entry=100.0, stop=95.0, target=110.0, trade_date="2024-03-04"):
+    return {"symbol": symbol, "trade_date": trade_date, "signal": signal, "market_type": "Bull Quiet",
+            "trade_setup": {"entry_price": entry, "stop_loss": stop, "profit_target": target}}
+
+
+@pytest.fixture
+def labeled(bars):
+    bars("TGT", _bars((100, 101, 99, 100), (102, 111, 101, 109)))
+    bars("FILLBAR", _bars((100, 112, 99, 105), (105, 106, 104, 105)))
+    bars("GAP", _bars((100, 101, 99, 100), (90, 91, 88, 89)))
+    bars("SAMEBAR", _bars((100, 101, 94, 96)))
+    bars("NOFILL", _bars((103, 105, 102, 104), (104, 106, 103, 105)))
+    bars("SHORT", _bars((100, 101, 99, 100), (108, 109, 107, 108)))
+    bars("LATE", _bars((97, 98, 96, 97), (99, 101, 98, 100), (100, 111, 100, 110)))
+    signals = [_signal(symbol) for symbol in ("TGT", "FILLBAR", "GAP", "SAMEBAR", "NOFILL", "LATE")]
+    signals += [_signal("SHORT", "SELL", entry=100.0, stop=105.0, target=90.0),
+                _signal("TGT", "HOLD"), _signal("TGT", trade_date="someday"), _signal("TGT", stop=101.0)]
+    frame, skipped = label_signals(signals, horizon=3)
+    return frame.set_index("symbol"), skipped
+
+
+@pytest.mark.parametrize("symbol, outcome, exit_price, realized_r, bars_held", [
+    ("TGT", "target", 110.0, 2.0, 2),
+    ("FILLBAR", "time", 105.0, 1.0, 3),      # The fill bar cannot also reach the target
+    ("GAP", "stop", 90.0, -2.0, 2),          # Gapped through the stop, filled at the open
+    ("SAMEBAR", "stop", 95.0, -1.0, 1),
+    ("SHORT", "stop", 108.0, -1.6, 2),
+    ("LATE", "target", 110.0, 2.0, 2),       # Filled on the second bar, counted from there
+])
+def test_outcomes(labeled, symbol, outcome, exit_price, realized_r, bars_held):
+    row = labeled[0].loc[symbol]
+    assert row["outcome"] == outcome
+    assert row["exit_price"] == pytest.approx(exit_price)
+    assert row["realized_r"] == pytest.approx(realized_r)
+    assert row["bars_held"] == bars_held
+    assert row["complete"]
+
+
+def test_unfilled_and_skipped(labeled):
+    frame, skipped = labeled
+    assert frame.loc["NOFILL", "outcome"] == "unfilled"
+    assert frame.loc["NOFILL", "bars_held"] == 0
+    assert skipped == {"hold": 1, "bad_trade_date": 1, "bad_levels": 1, "duplicate": 0, "no_bars": 0}
+
+
+def test_summary_leaves_unfilled_orders_out(labeled):
+    summary = summarize(labeled[0].reset_index())
+    assert summary["unfilled"] == 1
+    assert summary["overall"]["trades"] == 6
+    assert summary["overall"]["outcomes"] == {"target": 2, "stop": 3, "time": 1}
+    assert summary["overall"]["expectancy_r"] == pytest.approx((2.0 + 1.0 - 2.0 - 1.0 - 1.6 + 2.0) / 6, abs=1e-4)
+    assert summary["open"]["trades"] == 0
+
+
+def test_open_trades_are_not_final(bars):
+    bars("OPEN", _bars((100, 101, 99, 100), (100, 102, 99, 101), days=2))
+    frame, _ = label_signals([_signal("OPEN")], horizon=5)
+    assert frame.iloc[0]["outcome"] == "time"
+    assert not frame.iloc[0]["complete"]
+    assert summarize(frame)["open"]["trades"] == 1
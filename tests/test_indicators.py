@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.helpers.indicators import compute_indicators, indicator_arrays, latest_indicators, update_indicators
+
+
+def _wilder(values: pd.Series, period: int = 14) -> float:
+    """Wilder smoothing seeded with the mean of the first `period` values."""
+    seeded = pd.concat([pd.Series([values.iloc[:period].mean()]), values.iloc[period:]], ignore_index=True)
+    return seeded.ewm(alpha=1.0 / period, adjust=False).mean().iloc[-1]
+
+
+def _reference(frame: pd.DataFrame) -> dict[str, float]:
+    """The same indicators computed the plain pandas way."""
+    close, high, low = frame["Close"], frame["High"], frame["Low"]
+    ema_12 = close.ewm(span=12, adjust=False).mean()
+    ema_26 = close.ewm(span=26, adjust=False).mean()
+    macd = ema_12 - ema_26
+    signal = macd.ewm(span=9, adjust=False).mean()
+    delta = close.diff().iloc[1:]
+    avg_gain, avg_loss = _wilder(delta.clip(lower=0)), _wilder((-delta).clip(lower=0))
+    true_range = pd.concat([high - low, (high - close.shift()).abs(), (low - close.shift()).abs()], axis=1).max(axis=1)
+    mid, std = close.rolling(20).mean().iloc[-1], close.rolling(20).std().iloc[-1]
+    return {
+        "close": close.iloc[-1],
+        "rsi_14": 100.0 - 100.0 / (1.0 + avg_gain / avg_loss),
+        "macd": macd.iloc[-1],
+        "macd_signal": signal.iloc[-1],
+        "macd_hist": (macd - signal).iloc[-1],
+        "boll_mid": mid,
+        "boll_upper": mid + 2.0 * std,
+        "boll_lower": mid - 2.0 * std,
+        "sma_50": close.rolling(50).mean().iloc[-1],
+        "sma_200": close.rolling(200).mean().iloc[-1],
+        "atr_14": _wilder(true_range),
+    }
+
+
+def _panel(frames: list[pd.DataFrame]):
+    return tuple(np.vstack([frame[column].to_numpy() for frame in frames]) for column in ("High", "Low", "Close"))
+
+
+def test_indicators_match_pandas(walk):
+    frames = [walk(260, seed=seed, drift=drift) for seed, drift in ((1, 0.001), (2, -0.001), (3, 0.0))]
+    arrays = indicator_arrays(compute_indicators(["A", "B", "C"], *_panel(frames)))
+    for i, frame in enumerate(frames):
+        for name, expected in _reference(frame).items():
+            assert arrays[name][i] == pytest.approx(expected, rel=1e-9, abs=1e-9), name
+
+
+def test_update_matches_full_recompute(walk):
+    frames = [walk(230, seed=seed) for seed in (4, 5)]
+    high, low, close = _panel(frames)
+    state = compute_indicators(["A", "B"], high[:, :-3], low[:, :-3], close[:, :-3])
+    for t in range(-3, 0):
+        update_indicators(state, high[:, t], low[:, t], close[:, t])
+    incremental = indicator_arrays(state)
+    full = indicator_arrays(compute_indicators(["A", "B"], high, low, close))
+    for name in full:
+        np.testing.assert_allclose(incremental[name], full[name], rtol=1e-9, equal_nan=True)
+
+
+def test_missing_bars_are_skipped(walk):
+    frame = walk(120, seed=6)
+    high, low, close = _panel([frame, frame])
+    # Second symbol has a NaN day; it must end up where the first would without that day
+    high[1, 60], low[1, 60], close[1, 60] = np.nan, np.nan, np.nan
+    arrays = indicator_arrays(compute_indicators(["A", "B"], high, low, close))
+    expected = _reference(frame.drop(frame.index[60]))
+    assert arrays["sma_50"][1] == pytest.approx(expected["sma_50"])
+    assert arrays["macd"][1] == pytest.approx(expected["macd"])
+    assert np.isnan(arrays["sma_200"]).all()
+
+
+def test_latest_indicators_reads_the_store(bars, walk):
+    frame = bars("AAPL", walk(300, start="2023-10-02", seed=8))
+    records = latest_indicators(["aapl"], "2024-09-02", "2024-11-29")
+    window = frame.loc[:"2024-11-29"]
+    assert records["AAPL"]["close"] == pytest.approx(round(window["Close"].iloc[-1], 4))
+    assert records["AAPL"]["sma_50"] == pytest.approx(round(window["Close"].rolling(50).mean().iloc[-1], 4))
@@ -0,0 +1,43 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from src.benchmarks import PROJECT_ROOT, REPLAY_FIXTURE
+
+pytest.importorskip("crewai")
+
+# In a fresh interpreter: the stores read their paths from the environment when first imported
+_SNIPPET = """
+import json, os, sys
+sys.stdin = open(os.devnull)
+from src.helpers.fixtures import fixture_session, load_manifest
+settings = {{name: load_manifest({bundle!r})[name] for name in ("watchlist", "trade_date", "workers")}}
+with fixture_session({bundle!r}, "replay", work_dir={work_dir!r}) as bundle:
+    from src.main import run_multi_symbol
+    run_multi_symbol(incremental=False, **settings)
+print("__STATS__" + json.dumps(bundle.stats))
+"""
+
+
+def test_replay_runs_offline_from_the_bundle(tmp_path):
+    completed = subprocess.run(
+        [sys.executable, "-c", _SNIPPET.format(bundle=str(REPLAY_FIXTURE), work_dir=str(tmp_path))],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=600)
+    assert completed.returncode == 0, completed.stderr[-3000:]
+    line = next(line for line in completed.stdout.splitlines() if line.startswith("__STATS__"))
+    stats = json.loads(line[len("__STATS__"):])
+
+    # Every LLM completion, API response and embedding came from the recording
+    for kind in ("llm", "finnhub", "tavily"):
+        assert stats[kind]["hits"] > 0 and stats[kind]["misses"] == 0, (kind, stats)
+    assert stats.get("stub.llm", {}).get("misses", 0) == 0, stats
+    assert stats["stub.embed"]["misses"] == 0, stats
+
+    from src.helpers.signal_store import SignalStore
+
+    rows = SignalStore(str(tmp_path / "signals.sqlite")).query(start_date="2024-11-29", end_date="2024-11-29")
+    assert [(row["symbol"], row["signal"]) for row in rows] == [("AAPL", "BUY")]
+    assert rows[0]["shares"] > 0 and rows[0]["expectancy_value"] > 0
+    assert (tmp_path / "results" / "traces").is_dir()
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from src.helpers.risk import correlation_buckets, size_portfolio
+from src.helpers.trade_signals import PortfolioResponse
+
+
+def _trade(symbol, signal="BUY", entry=100.0, stop=95.0, target=110.0, win=0.5):
+    return {
+        "symbol": symbol, "trade_date": "2024-11-29", "signal": signal, "market_type": "Bull Quiet",
+        "trade_setup": {"entry_price": entry, "stop_loss": stop, "profit_target": target},
+        "expectancy_scorecard": {"win_probability": win},
+        "rationale": {"bull_case": None, "bear_case": None},
+    }
+
+
+def _portfolio(*trades) -> PortfolioResponse:
+    return PortfolioResponse.model_validate({"trades": list(trades)})
+
+
+def test_single_trade_is_sized_from_its_levels():
+    sized = size_portfolio(_portfolio(_trade("AAPL")), equity=10_000, risk=0.01, end_date="2024-11-29")
+    trade = sized.trades[0]
+    assert trade.signal == "BUY"
+    assert trade.trade_setup.r_multiple_target == 2.0
+    assert trade.expectancy_scorecard.expectancy_value == pytest.approx(0.5 * 2.0 - 0.5)
+    assert trade.position_sizing.shares == 20  # 1% of 10k over a 5.0 stop
+    assert sized.total_portfolio_risk_percent == pytest.approx(1.0)
+
+
+def test_short_and_notional_cap():
+    # A 0.5 stop on a 100 entry would allow 200 shares; 25% of equity caps it at 25
+    sized = size_portfolio(_portfolio(_trade("TSLA", "SELL", entry=100.0, stop=100.5, target=98.0)),
+                           equity=10_000, risk=0.01, end_date="2024-11-29")
+    assert sized.trades[0].signal == "SELL"
+    assert sized.trades[0].position_sizing.shares == 25
+    assert sized.trades[0].expectancy_scorecard.r_ratio == 4.0
+
+
+@pytest.mark.parametrize("levels", [
+    {"stop": 105.0},                 # Stop on the wrong side
+    {"target": 90.0},                # Target on the wrong side
+    {"win": 0.2},                    # Negative expectancy
+    {"stop": None},                  # Missing level
+])
+def test_unusable_trades_become_hold(levels):
+    sized = size_portfolio(_portfolio(_trade("AAPL", **levels)), equity=10_000, risk=0.01, end_date="2024-11-29")
+    assert sized.trades[0].signal == "HOLD"
+    assert sized.trades[0].position_sizing.shares == 0
+    assert sized.total_portfolio_risk_percent == 0.0
+
+
+def test_total_risk_cap_admits_best_expectancy_first(bars, walk):
+    for seed, symbol in enumerate(("AAA", "BBB", "CCC")):
+        bars(symbol, walk(250, seed=10 + seed))  # Independent walks, one bucket each
+    portfolio = _portfolio(_trade("AAA", win=0.4), _trade("BBB", win=0.6), _trade("CCC", win=0.5))
+    sized = size_portfolio(portfolio, equity=10_000, risk=0.01, end_date="2024-11-29",
+                           limits={"max_total_risk": 0.025, "max_bucket_risk": 0.02})
+    shares = {trade.symbol: trade.position_sizing.shares for trade in sized.trades}
+    assert shares == {"BBB": 20, "CCC": 20, "AAA": 10}  # The last one in is shrunk to the room left
+    assert [trade.symbol for trade in sized.trades] == ["BBB", "CCC", "AAA"]
+    assert sized.total_portfolio_risk_percent == pytest.approx(2.5)
+
+    sized = size_portfolio(portfolio, equity=10_000, risk=0.01, end_date="2024-11-29",
+                           limits={"max_total_risk": 0.02})
+    assert [(trade.symbol, trade.signal) for trade in sized.trades] == [("BBB", "BUY"), ("CCC", "BUY"), ("AAA", "HOLD")]
+
+
+def test_correlated_symbols_share_a_bucket(bars, walk):
+    base = walk(250, seed=20)
+    bars("AAA", base)
+    bars("BBB", base.assign(Close=base["Close"] * 1.5, High=base["High"] * 1.5, Low=base["Low"] * 1.5))
+    bars("CCC", walk(250, seed=21))
+    buckets = correlation_buckets(["AAA", "BBB", "CCC"], "2024-11-29", 120, 0.7)
+    assert buckets[0] == buckets[1] != buckets[2]
+
+    sized = size_portfolio(_portfolio(_trade("AAA", win=0.6), _trade("BBB"), _trade("CCC")),
+                           equity=10_000, risk=0.01, end_date="2024-11-29", limits={"max_bucket_risk": 0.01})
+    shares = {trade.symbol: trade.position_sizing.shares for trade in sized.trades}
+    assert shares == {"AAA": 20, "CCC": 20, "BBB": 0}
+    assert np.isclose(sized.total_portfolio_risk_percent, 2.0)
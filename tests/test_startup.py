@@ -0,0 +1,13 @@
+import pytest
+
+from src.benchmarks import STARTUP_BUDGET_SECONDS, STARTUP_TARGETS, measure_startup
+
+
+@pytest.mark.parametrize("target", list(STARTUP_TARGETS))
+def test_startup_within_budget(target, monkeypatch):
+    # Only this target, each round in a fresh interpreter
+    monkeypatch.setattr("src.benchmarks.STARTUP_TARGETS", {target: STARTUP_TARGETS[target]})
+    result = measure_startup(rounds=3)[target]
+    slowest = ", ".join(f"{module} {seconds:.3f}s" for module, seconds in result["slowest_imports"][:5])
+    assert result["median"] <= STARTUP_BUDGET_SECONDS, (
+        f"{target} took {result['median']:.3f}s (budget {STARTUP_BUDGET_SECONDS:.3f}s), slowest imports: {slowest}")
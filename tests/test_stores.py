@@ -0,0 +1,90 @@
+import time
+
+from src.helpers.incremental import AnalysisStore
+from src.helpers.llm_cache import LLMCache, cache_key
+from src.helpers.news_index import NewsIndex, collapse
+from src.helpers.signal_store import SignalStore
+from src.helpers.trade_signals import TradeSignal
+
+
+def _signal(symbol, trade_date="2024-11-29", signal="BUY", entry=100.0, expectancy=0.5):
+    return TradeSignal.model_validate({
+        "symbol": symbol, "trade_date": trade_date, "signal": signal, "market_type": "Bull Quiet",
+        "trade_setup": {"entry_price": entry, "stop_loss": entry - 5, "profit_target": entry + 10},
+        "expectancy_scorecard": {"win_probability": 0.5, "expectancy_value": expectancy},
+        "rationale": {"bull_case": "b", "bear_case": None},
+    })
+
+
+def test_signal_store_replaces_a_batch(tmp_path):
+    store = SignalStore(str(tmp_path / "signals.sqlite"))
+    store.append([_signal("AAPL"), _signal("MSFT"), _signal("AAPL", "2024-11-28")])
+    # Rerun of 11-29: two AAPL legs, MSFT dropped, the earlier date untouched
+    assert store.append([_signal("aapl", entry=100.0), _signal("AAPL", entry=90.0)]) == 2
+    rows = store.query(start_date="2024-11-29")
+    assert [(row["symbol"], row["entry_price"]) for row in rows] == [("AAPL", 100.0), ("AAPL", 90.0)]
+    assert len(store.query(end_date="2024-11-28")) == 1
+
+    # An empty portfolio still clears its date, other sources are left alone
+    store.append([_signal("NVDA")], source="manual")
+    store.append([], trade_dates=["2024-11-29"])
+    assert [row["symbol"] for row in store.query(start_date="2024-11-29")] == ["NVDA"]
+
+
+def test_signal_store_filters(tmp_path):
+    store = SignalStore(str(tmp_path / "signals.sqlite"))
+    store.append([_signal("AAPL", expectancy=0.2), _signal("MSFT", signal="SELL", expectancy=0.6),
+                  _signal("NVDA", expectancy=0.9)])
+    assert [row["symbol"] for row in store.query(signal="buy", min_expectancy=0.3)] == ["NVDA"]
+    assert [row["symbol"] for row in store.query(symbols=["msft", "aapl"])] == ["AAPL", "MSFT"]
+    assert store.signals(symbols=["MSFT"])[0] == _signal("MSFT", signal="SELL", expectancy=0.6)
+    assert "payload" not in store.to_frame().columns
+
+
+def test_analysis_store_never_returns_the_same_or_a_later_day(tmp_path):
+    store = AnalysisStore(str(tmp_path / "analyses.sqlite"))
+    store.record("aapl", "2024-11-27", "old", {"close": 1.0})
+    store.record("AAPL", "2024-11-29", "new", {"close": 2.0}, analyzed_on="2024-11-27")
+    assert store.previous("AAPL", "2024-11-27") is None
+    assert store.previous("AAPL", "2024-11-29")["report"] == "old"
+    previous = store.previous("AAPL", "2024-12-02")
+    assert previous == {"trade_date": "2024-11-29", "analyzed_on": "2024-11-27",
+                        "fingerprint": {"close": 2.0}, "report": "new"}
+
+
+def test_news_index_dedups_in_one_pass(tmp_path):
+    index = NewsIndex(str(tmp_path / "news.sqlite"))
+    articles = [
+        {"item_id": 1, "headline": "Apple beats estimates on services growth", "summary": "Revenue rose."},
+        {"url": "https://example.com/a", "headline": "Apple beats estimates on services growth!",
+         "summary": "Revenue rose."},
+        {"item_id": 1, "headline": "Apple beats estimates on services growth", "summary": "Revenue rose."},
+        {"item_id": 2, "headline": "Fed holds rates steady as inflation cools", "summary": "No change."},
+    ]
+    records = index.lookup_many(articles)
+    assert records[0]["key"] == records[2]["key"] != records[1]["key"]
+    assert index.stats() == {"hits": 0, "misses": 3, "articles": 3}
+    assert [(record["headline"], copies) for record, copies in collapse(records)] == [
+        ("Apple beats estimates on services growth", 2), ("Fed holds rates steady as inflation cools", 0)]
+
+    again = NewsIndex(str(tmp_path / "news.sqlite")).lookup(item_id=2, headline="ignored")
+    assert again["headline"] == "Fed holds rates steady as inflation cools"
+
+
+def test_llm_cache_lru_and_ttl(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), max_entries=2)
+    keys = [cache_key("m", [{"role": "user", "content": text}], temperature=0) for text in "abc"]
+    assert len(set(keys)) == 3
+    cache.put(keys[0], "A")
+    time.sleep(0.01)
+    cache.put(keys[1], "B")
+    time.sleep(0.01)
+    assert cache.get(keys[0]) == "A"  # Touch A so B is the least recently used
+    cache.put(keys[2], "C")
+    assert cache.get(keys[1]) is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "evictions": 1, "entries": 2}
+
+    expiring = LLMCache(str(tmp_path / "ttl.sqlite"), ttl_seconds=0.01)
+    expiring.put(keys[0], "A")
+    time.sleep(0.05)
+    assert expiring.get(keys[0]) is None